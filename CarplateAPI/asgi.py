@@ -0,0 +1,24 @@
+"""
+ASGI config for CarplateAPI project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Plate lookups, detail and list reads are served asynchronously, see api.asgi.AsyncReadHandler,
+all other requests by the WSGI application.
+
+Usage:
+    uvicorn CarplateAPI.asgi:application
+    gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker CarplateAPI.asgi:application
+"""
+
+import os
+
+from asgiref.wsgi import WsgiToAsgi
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'CarplateAPI.settings')
+
+wsgi_application = get_wsgi_application()
+
+from api.asgi import AsyncReadHandler  # noqa: E402 Django has to be set up first
+
+application = AsyncReadHandler(WsgiToAsgi(wsgi_application))
@@ -2,9 +2,10 @@
 
 from django.db import models
 
-from Models.CaseInsensitiveFieldMixin import CaseInsensitiveFieldMixin
+from Models.UpperCaseFieldMixin import UpperCaseFieldMixin
 
 
-# Custom Case-Insensitive model field
-class CICharField(CaseInsensitiveFieldMixin, models.CharField):
+# Custom Case-Insensitive model field.
+# Values are stored upper-cased, so lookups can use plain index instead of UPPER() expression
+class CICharField(UpperCaseFieldMixin, models.CharField):
     pass
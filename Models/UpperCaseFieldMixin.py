@@ -0,0 +1,50 @@
+from django.db.models.lookups import Contains, EndsWith, StartsWith
+
+
+class UpperCaseLookupMixin:
+    """
+    Lookup mixin which passes lookup value through field's get_prep_value(), so it gets upper-cased.
+    """
+    prepare_rhs = True
+
+
+class UpperCaseContains(UpperCaseLookupMixin, Contains):
+    pass
+
+
+class UpperCaseStartsWith(UpperCaseLookupMixin, StartsWith):
+    pass
+
+
+class UpperCaseEndsWith(UpperCaseLookupMixin, EndsWith):
+    pass
+
+
+class UpperCaseFieldMixin:
+    """
+    Field mixin that stores values upper-cased and normalizes lookup values the same way.
+
+    Case-insensitive lookups become plain comparisons against the stored value instead of
+    UPPER(column) expressions, so they can use ordinary btree index (and on Postgres
+    varchar_pattern_ops and trigram indexes) instead of scanning the whole table.
+    """
+    LOOKUP_CONVERSIONS = {
+        'iexact': 'exact',
+        'icontains': 'contains',
+        'istartswith': 'startswith',
+        'iendswith': 'endswith',
+        'regex': 'iregex',
+    }
+    NORMALIZED_LOOKUPS = {
+        'contains': UpperCaseContains,
+        'startswith': UpperCaseStartsWith,
+        'endswith': UpperCaseEndsWith,
+    }
+
+    def get_prep_value(self, value):
+        value = super().get_prep_value(value)
+        return value.upper() if isinstance(value, str) else value
+
+    def get_lookup(self, lookup_name):
+        converted = self.LOOKUP_CONVERSIONS.get(lookup_name, lookup_name)
+        return self.NORMALIZED_LOOKUPS.get(converted) or super().get_lookup(converted)
@@ -8,6 +8,7 @@ class AppConfig(BaseAppConfig):
     def ready(self):
         # Automatically import all receivers files
         autodiscover_modules('receivers')
+        from . import checks  # noqa: F401 Registers system checks
 
 
 default_app_config = 'api.AppConfig'
@@ -0,0 +1,217 @@
+# api/asgi.py
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import parse_qs
+
+from django.conf import settings
+from django.core import signals
+from django.core.handlers.base import BaseHandler
+from django.core.handlers.wsgi import WSGIRequest, get_script_name
+from django.core.signals import setting_changed
+from django.db import close_old_connections
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.urls import Resolver404, resolve, set_script_prefix
+
+from .cache import plate_cache
+from .plate_index import plate_index
+
+_executor = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Returns thread pool database work of async views is offloaded to. Every thread keeps its own
+    database connection, so CARPLATE_ASGI['DB_THREADS'] also limits connections of the process."""
+
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(settings.CARPLATE_ASGI['DB_THREADS'], thread_name_prefix='carplate-db')
+    return _executor
+
+
+@receiver(setting_changed)
+def reset_executor(setting, **kwargs):
+    global _executor
+    if setting == 'CARPLATE_ASGI' and _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
+
+
+def _in_request(function, *args, **kwargs):
+    # Threads of the pool outlive requests, so connections are recycled the way
+    # request_started / request_finished signals do it for WSGI requests
+    close_old_connections()
+    try:
+        return function(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_in_db_thread(function, *args, **kwargs):
+    """Runs blocking function, e.g. ORM query, in the database thread pool."""
+
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(get_executor(), lambda: _in_request(function, *args, **kwargs))
+
+
+class ReadHandler(BaseHandler):
+
+    """
+    Django request handler of natively served requests. They pass the same middleware chain and views,
+    and send the same request_started / request_finished signals (which recycle database connections)
+    as WSGI requests, so their responses match.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.load_middleware()
+
+    def handle(self, request) -> HttpResponse:
+        """Handles request and closes its response, which sends request_finished in the calling thread."""
+
+        set_script_prefix(get_script_name(request.META))
+        signals.request_started.send(sender=self.__class__, environ=request.META)
+        response = self.get_response(request)
+        response._handler_class = self.__class__
+        response.close()  # Body is rendered already, so it can be sent afterwards
+        return response
+
+
+def build_request(scope: dict) -> WSGIRequest:
+    """Builds Django request of ASGI HTTP scope without body, so that views, serializers and
+    ALLOWED_HOSTS validation work the same way as behind WSGI."""
+
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'].encode().decode('latin1'),  # WSGI carries raw bytes as latin1
+        'QUERY_STRING': scope['query_string'].decode('latin1'),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'SERVER_NAME': scope['server'][0] if scope.get('server') else 'localhost',
+        'SERVER_PORT': str(scope['server'][1]) if scope.get('server') else '80',
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': BytesIO(),
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin1').upper().replace('-', '_')
+        key = name if name in ('CONTENT_TYPE', 'CONTENT_LENGTH') else f'HTTP_{name}'
+        value = value.decode('latin1')
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return WSGIRequest(environ)
+
+
+async def send_response(send, response: HttpResponse) -> None:
+    headers = [(name.encode('latin1'), str(value).encode('latin1')) for name, value in response.items()]
+    await send({'type': 'http.response.start', 'status': response.status_code, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': response.content})
+
+
+def is_anonymous(request) -> bool:
+    """Returns whether request carries no credentials, so authentication does not query database."""
+
+    return settings.SESSION_COOKIE_NAME not in request.COOKIES and 'HTTP_AUTHORIZATION' not in request.META
+
+
+_loading = {}
+
+
+async def handle_in_db_thread(handler: ReadHandler, request, match) -> HttpResponse:
+    """Handles request in the database thread pool. Signals recycle database connection of the thread."""
+
+    return await asyncio.get_event_loop().run_in_executor(get_executor(), handler.handle, request)
+
+
+async def plate_lookup(handler: ReadHandler, request, match) -> HttpResponse:
+    """Anonymous lookups of plates in in-process plate cache are handled without leaving event loop,
+    as the view serves them without database. Only misses (and plate cache shared through backend)
+    wait for database thread. Concurrent misses of the same plate wait for single query,
+    which fills the cache for all of them."""
+
+    if plate_cache.backend is not None or not is_anonymous(request):
+        return await handle_in_db_thread(handler, request, match)
+
+    plate = plate_cache.normalize(match.kwargs['plate'])
+    if plate not in plate_cache and plate in _loading:
+        await asyncio.wait([_loading[plate]])
+    if plate in plate_cache:
+        return handler.handle(request)
+
+    loading = _loading[plate] = asyncio.ensure_future(handle_in_db_thread(handler, request, match))
+    try:
+        return await asyncio.shield(loading)
+    finally:
+        if _loading.get(plate) is loading:
+            del _loading[plate]
+
+
+class AsyncReadHandler:
+
+    """
+    ASGI application serving JSON GET requests of plate lookup, detail and list endpoints natively.
+    Blocking work is offloaded to bounded database thread pool, so one process keeps thousands of
+    lookups in flight while waiting for database, and cached plate lookups never leave event loop.
+    Requests pass the same middleware chain and views as WSGI ones (see ReadHandler), so their responses match.
+
+    Everything else (writes, browsable API, HTML application, streaming, docs) is passed to
+    Django WSGI application with full middleware stack.
+
+    Args:
+        fallback: ASGI application handling other requests, e.g. asgiref WsgiToAsgi(get_wsgi_application())
+    """
+
+    handlers = {
+        'registration-detail-find': plate_lookup,
+        'registration-detail': handle_in_db_thread,
+        'registration-list': handle_in_db_thread,
+    }
+
+    def __init__(self, fallback):
+        self.fallback = fallback
+        self.handler = ReadHandler()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+
+        match = self.match(scope) if scope['type'] == 'http' else None
+        if match is None:
+            return await self.fallback(scope, receive, send)
+
+        response = await self.handlers[match.url_name](self.handler, build_request(scope), match)
+        await send_response(send, response)
+
+    @staticmethod
+    def match(scope: dict):
+        """Returns URL match if request can be served natively: JSON GET of supported endpoint, not streamed."""
+
+        if scope['method'] != 'GET':
+            return None
+        headers = dict(scope.get('headers', []))
+        if b'text/html' in headers.get(b'accept', b''):
+            return None  # Browsable API
+        query = parse_qs(scope['query_string'].decode('latin1'))
+        if 'format' in query or 'stream' in query:
+            return None
+        try:
+            match = resolve(scope['path'])
+        except Resolver404:
+            return None
+        return match if match.url_name in AsyncReadHandler.handlers else None
+
+    @staticmethod
+    async def lifespan(receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                if settings.CARPLATE_PLATE_INDEX['ENABLED']:
+                    await run_in_db_thread(plate_index.build)
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if _executor is not None:
+                    _executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
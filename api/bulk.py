@@ -0,0 +1,225 @@
+# api/bulk.py
+
+import logging
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import BooleanField, Case, F, Q, Value, When
+from django.utils import timezone
+
+from . import plates
+from .cache import list_cache, plate_cache
+from .changes import record_changes
+from .models import Registration, RegistrationChange
+from .plate_index import plate_index
+from .tasks import retrieve_images_task
+from .utils import chunked
+
+logger = logging.getLogger(__name__)  # Get an instance of a logger
+
+IMPORT_FIELDS = ('plate', 'owner', 'car_model')
+
+
+def build_registration(row, plate_type: str = None) -> Registration:
+    """Validates single import row with the same rules as Registration model and normalizes it.
+
+    Args:
+        row: dictionary with plate, owner and car_model keys
+        plate_type: plate class if plate was already classified by plates.classify_many()
+
+    Returns:
+        Registration: unsaved and normalized model instance
+
+    Raises:
+        ValidationError: if row does not pass validation
+    """
+
+    if isinstance(row, Exception):
+        raise ValidationError(str(row))
+    if not isinstance(row, dict):
+        raise ValidationError("Row must be an object with plate, owner and car_model fields")
+
+    instance = Registration(**{field: str(row.get(field) or '').strip() for field in IMPORT_FIELDS})
+    # Plate which was classified already is valid, otherwise field validators report why it is not
+    instance.clean_fields(exclude=('image', 'retrieve_image', 'plate_type') + (('plate',) if plate_type else ()))
+    instance.normalize()
+    instance.plate_type = plate_type or plates.classify(instance.plate)
+    return instance
+
+
+def _record_created(instances):
+    if any(instance.pk is None for instance in instances):  # Only Postgres returns ids of inserted rows
+        rows = Registration.objects.filter(plate__in=[instance.plate for instance in instances]).values_list('pk',
+                                                                                                             'plate')
+    else:
+        rows = [(instance.pk, instance.plate) for instance in instances]
+    record_changes(RegistrationChange.UPSERT, rows)
+
+
+def _insert_chunk(rows, errors):
+    """Inserts chunk of (row number, instance) pairs with single statement. If concurrent insert
+    caused a conflict, falls back to row by row inserts so that only conflicting rows are rejected.
+    """
+
+    instances = [instance for _, instance in rows]
+    try:
+        with transaction.atomic():
+            Registration.objects.bulk_create(instances)
+            _record_created(instances)
+        return instances
+    except IntegrityError:
+        logger.info("Bulk insert conflicted, retrying %d rows one by one", len(instances))
+
+    created = []
+    for index, instance in rows:
+        try:
+            with transaction.atomic():
+                Registration.objects.bulk_create([instance])
+                _record_created([instance])
+            created.append(instance)
+        except IntegrityError:
+            errors.append({'row': index, 'errors': {'plate': ["Registration with this plate already exists."]}})
+    return created
+
+
+def import_registrations(rows) -> dict:
+    """Imports registrations in chunks using bulk inserts.
+    Image retrieval is queued once per distinct car model instead of once per row.
+
+    Args:
+        rows: iterable of dictionaries with plate, owner and car_model keys
+
+    Returns:
+        dict: number of created rows and list of per row errors
+    """
+
+    batch_size = settings.CARPLATE_BULK_BATCH_SIZE
+    created = 0
+    errors = []
+    car_models = set()
+
+    for offset, chunk in enumerate(chunked(rows, batch_size)):
+        valid = {}
+        plate_types = plates.classify_many(str(row.get('plate') or '') if isinstance(row, dict) else ''
+                                           for row in chunk)
+        for index, (row, plate_type) in enumerate(zip(chunk, plate_types), start=offset * batch_size + 1):
+            try:
+                instance = build_registration(row, plate_type)
+            except ValidationError as exc:
+                errors.append({'row': index, 'errors': exc.message_dict if hasattr(exc, 'error_dict') else
+                               {'non_field_errors': exc.messages}})
+                continue
+            if instance.plate in valid:
+                errors.append({'row': index, 'errors': {'plate': ["Duplicate plate in import."]}})
+                continue
+            valid[instance.plate] = (index, instance)
+
+        existing = Registration.objects.filter(plate__in=list(valid)).values_list('plate', flat=True)
+        for plate in existing:
+            index, _ = valid.pop(plate.upper())
+            errors.append({'row': index, 'errors': {'plate': ["Registration with this plate already exists."]}})
+
+        inserted = _insert_chunk(list(valid.values()), errors)
+        created += len(inserted)
+        car_models.update(instance.car_model for instance in inserted)
+        plate_index.add(*(instance.plate for instance in inserted))
+        logger.info("Imported chunk of %d registrations", len(inserted))
+
+    if created:
+        list_cache.bump()  # Bulk insert does not send post_save signal
+
+    for car_model in car_models:
+        logger.info("Registering new task to retrieve car image for %s car model", car_model)
+        retrieve_images_task.delay(car_model=car_model)
+
+    errors.sort(key=lambda error: error['row'])
+    return {'created': created, 'errors': errors}
+
+
+def normalize_values(values: dict) -> dict:
+    """Applies Registration.normalize() rules to field values, e.g. filter criteria or bulk changes."""
+
+    instance = Registration(plate=values.get('plate', ''), owner=values.get('owner', ''),
+                            car_model=values.get('car_model', ''))
+    instance.normalize()
+    return {field: getattr(instance, field) if field in IMPORT_FIELDS else value for field, value in values.items()}
+
+
+def select_registrations(ids: list = None, plates: list = None, filter: dict = None):  # noqa: A002
+    """Returns queryset of registrations matching all given criteria.
+
+    Args:
+        ids: registration ids
+        plates: plate numbers, case insensitive
+        filter: exact values of plate, owner, car_model or plate_type, normalized like save() does
+    """
+
+    queryset = Registration.objects.order_by()
+    if ids is not None:
+        queryset = queryset.filter(pk__in=ids)
+    if plates is not None:
+        queryset = queryset.filter(plate__in=[plate.strip().upper() for plate in plates])
+    if filter:
+        queryset = queryset.filter(**normalize_values(filter))
+    return queryset
+
+
+def update_registrations(queryset, changes: dict) -> dict:
+    """Updates owner and/or car model of all registrations in queryset with single UPDATE statement.
+    Image is retrieved again only for registrations whose car model actually changed, with single task.
+
+    Args:
+        queryset: registrations to update, e.g. from select_registrations()
+        changes: new values of owner and/or car_model
+
+    Returns:
+        dict: number of updated registrations and of registrations waiting for new image
+    """
+
+    changes = normalize_values(changes)
+    car_model = changes.get('car_model')
+    updates = {}
+    if car_model is not None:
+        # Listed first, as SET expressions have to see car model the row had before update
+        updates['retrieve_image'] = Case(When(~Q(car_model=car_model), then=Value(True)),
+                                         default=F('retrieve_image'), output_field=BooleanField())
+    updates.update(changes, modified=timezone.now())
+
+    with transaction.atomic():
+        # Rows are locked, so the update changes exactly the rows whose plates are invalidated below
+        rows = list(queryset.select_for_update().values_list('pk', 'plate', 'car_model'))
+        updated = queryset.update(**updates)
+        record_changes(RegistrationChange.UPSERT, ((pk, plate) for pk, plate, _ in rows))
+        requeued = sum(1 for *_, old_car_model in rows if car_model is not None and old_car_model != car_model)
+        if requeued:
+            transaction.on_commit(lambda: retrieve_images_task.delay(car_model=car_model))
+
+    plate_cache.invalidate(*(plate for _, plate, _ in rows))  # Queryset update does not send post_save signal
+    if updated:
+        list_cache.bump()
+    logger.info("Bulk updated %d registrations, %d wait for new image", updated, requeued)
+    return {'updated': updated, 'images_requeued': requeued}
+
+
+def delete_registrations(queryset) -> dict:
+    """Deletes all registrations in queryset with single DELETE statement.
+
+    Args:
+        queryset: registrations to delete, e.g. from select_registrations()
+
+    Returns:
+        dict: number of deleted registrations
+    """
+
+    with transaction.atomic():
+        rows = list(queryset.select_for_update().values_list('pk', 'plate'))
+        # QuerySet.delete() loads every row to send post_delete signals, nothing references registrations
+        deleted = queryset._raw_delete(queryset.db)
+        record_changes(RegistrationChange.DELETE, rows)
+
+    plate_cache.invalidate(*(plate for _, plate in rows))
+    if deleted:
+        list_cache.bump()
+    logger.info("Bulk deleted %d registrations", deleted)
+    return {'deleted': deleted}
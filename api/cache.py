@@ -0,0 +1,254 @@
+# api/cache.py
+
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+
+from . import metrics
+
+logger = logging.getLogger(__name__)  # Get an instance of a logger
+
+
+class PlateCache:
+
+    """
+    Read-through cache mapping plate number to serialized registration.
+
+    Entries are kept in in-process LRU with TTL. Optionally Django cache backend shared between processes
+    can be used instead, so that invalidations made by any process (or Celery worker) are seen by all of them.
+    In-process LRU is then bypassed, as it could serve entries already invalidated elsewhere.
+    Entries hold relative media URLs, see RegistrationSerializer.absolute_urls().
+
+    Args:
+        max_size: maximum number of entries kept in process. 0 disables the cache
+        ttl: number of seconds entry is considered fresh
+        backend: optional Django cache alias shared between processes
+    """
+
+    KEY_PREFIX = 'plate:'
+
+    def __init__(self, max_size: int = None, ttl: int = None, backend: str = None):
+        config = settings.CARPLATE_PLATE_CACHE
+        self.max_size = config['MAX_SIZE'] if max_size is None else max_size
+        self.ttl = config['TTL'] if ttl is None else ttl
+        self.backend = caches[backend or config['BACKEND']] if (backend or config['BACKEND']) else None
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(plate: str) -> str:
+        return plate.strip().upper()
+
+    def __contains__(self, plate: str) -> bool:
+        """Returns whether fresh entry of normalized plate is kept in process, without counting hit or miss."""
+
+        entry = self._entries.get(plate)
+        return entry is not None and entry[0] > time.monotonic()
+
+    def get(self, plate: str):
+        """Returns cached registration data or None if plate is not cached."""
+
+        plate = self.normalize(plate)
+        with self._lock:
+            entry = self._entries.get(plate)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(plate)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[plate]
+
+        data = self.backend.get(self.KEY_PREFIX + plate) if self.backend else None
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._store(plate, data)
+        return data
+
+    def set(self, plate: str, data) -> None:
+        """Stores registration data for plate."""
+
+        plate = self.normalize(plate)
+        if self.backend:
+            self.backend.set(self.KEY_PREFIX + plate, data, self.ttl)
+        with self._lock:
+            self._store(plate, data)
+
+    def get_many(self, plates) -> dict:
+        """Returns cached registration data of those plates which are cached, keyed by normalized plate.
+        Shared backend is asked with single request."""
+
+        found, missing = {}, []
+        now = time.monotonic()
+        with self._lock:
+            for plate in {self.normalize(plate) for plate in plates}:
+                entry = self._entries.get(plate)
+                if entry is not None and entry[0] > now:
+                    self._entries.move_to_end(plate)
+                    found[plate] = entry[1]
+                else:
+                    self._entries.pop(plate, None)
+                    missing.append(plate)
+
+        shared = self.backend.get_many([self.KEY_PREFIX + plate for plate in missing]) if self.backend and missing \
+            else {}
+        with self._lock:
+            for key, data in shared.items():
+                plate = key[len(self.KEY_PREFIX):]
+                found[plate] = data
+                self._store(plate, data)
+            self.hits += len(found)
+            self.misses += len(missing) - len(shared)
+        return found
+
+    def set_many(self, entries: dict) -> None:
+        """Stores registration data of many plates, keyed by plate."""
+
+        entries = {self.normalize(plate): data for plate, data in entries.items()}
+        if self.backend and entries:
+            self.backend.set_many({self.KEY_PREFIX + plate: data for plate, data in entries.items()}, self.ttl)
+        with self._lock:
+            for plate, data in entries.items():
+                self._store(plate, data)
+
+    def get_or_load(self, plate: str, loader):
+        """Returns cached registration data, calling loader and caching its result on miss.
+
+        Args:
+            plate: plate number
+            loader: callable returning serialized registration. Exceptions are propagated and nothing is cached
+        """
+
+        data = self.get(plate)
+        if data is None:
+            data = loader()
+            self.set(plate, data)
+        return data
+
+    def invalidate(self, *plates: str) -> None:
+        """Removes plates from cache."""
+
+        plates = [self.normalize(plate) for plate in plates if plate]
+        with self._lock:
+            for plate in plates:
+                self._entries.pop(plate, None)
+        if self.backend and plates:
+            self.backend.delete_many([self.KEY_PREFIX + plate for plate in plates])
+        logger.debug("Invalidated plate cache for %s", plates)
+
+    def clear(self) -> None:
+        """Removes all entries from in-process cache and resets counters."""
+
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+    def _store(self, plate, data):
+        if self.max_size <= 0 or self.backend:
+            return
+        self._entries[plate] = (time.monotonic() + self.ttl, data)
+        self._entries.move_to_end(plate)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
+plate_cache = PlateCache()
+
+
+@metrics.registry.collector
+def plate_cache_metrics() -> dict:
+    stats = plate_cache.stats()
+    return {
+        'carplate_plate_cache_hits_total': ('counter', "Plate cache hits", stats['hits']),
+        'carplate_plate_cache_misses_total': ('counter', "Plate cache misses", stats['misses']),
+        'carplate_plate_cache_entries': ('gauge', "Entries in plate cache of process", stats['size']),
+    }
+
+
+class FragmentCache:
+
+    """
+    Cache of rendered HTML list fragments.
+
+    Every key contains version number, which is bumped whenever registrations change,
+    so stale fragments are never served and simply expire. Backend should be shared between
+    processes, so that changes made by Celery workers invalidate pages rendered by web processes.
+    Settings are read on every call, TIMEOUT 0 disables the cache.
+    """
+
+    VERSION_KEY = 'registration-list:version'
+    KEY_PREFIX = 'registration-list:'
+
+    @property
+    def backend(self):
+        return caches[settings.CARPLATE_LIST_CACHE['BACKEND']]
+
+    def version(self) -> int:
+        version = self.backend.get(self.VERSION_KEY)
+        if version is None:
+            # Starting from current time keeps versions unique even if counter itself was evicted
+            self.backend.add(self.VERSION_KEY, int(time.time() * 1000), timeout=None)
+            version = self.backend.get(self.VERSION_KEY)
+        return version
+
+    def bump(self) -> None:
+        """Invalidates all cached fragments. Inside transaction fragments are invalidated once more after commit,
+        as pages rendered meanwhile by other processes still show old rows."""
+
+        self._increment()
+        hooks = connection.run_on_commit
+        if connection.in_atomic_block and not (hooks and hooks[-1][1] == self._increment):
+            transaction.on_commit(self._increment)
+
+    def _increment(self):
+        try:
+            self.backend.incr(self.VERSION_KEY)
+        except ValueError:  # Counter does not exist yet, so nothing could be cached under it
+            self.version()
+        logger.debug("Invalidated list fragment cache")
+
+    def key(self, params: dict) -> str:
+        digest = hashlib.md5(urlencode(sorted(params.items())).encode()).hexdigest()
+        return f"{self.KEY_PREFIX}{self.version()}:{digest}"
+
+    def get_or_render(self, params: dict, render) -> str:
+        """Returns cached fragment, calling render and caching its result on miss.
+
+        Args:
+            params: parameters fragment depends on, e.g. filters and page number
+            render: callable returning rendered fragment
+        """
+
+        timeout = settings.CARPLATE_LIST_CACHE['TIMEOUT']
+        if not timeout:
+            return render()
+
+        key = self.key(params)
+        fragment = self.backend.get(key)
+        if fragment is None:
+            metrics.list_cache_requests.inc(result='miss')
+            fragment = render()
+            self.backend.set(key, fragment, timeout)
+        else:
+            metrics.list_cache_requests.inc(result='hit')
+        return fragment
+
+
+list_cache = FragmentCache()
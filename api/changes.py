@@ -0,0 +1,155 @@
+# api/changes.py
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Max, Min
+from django.utils import timezone
+
+from .models import Registration, RegistrationChange
+from .serializers import RegistrationRowSerializer
+from .utils import chunked
+
+logger = logging.getLogger(__name__)  # Get an instance of a logger
+
+SEQUENCE_LOCK = 0x6361726c  # Key of Postgres advisory lock serializing sequence_changes()
+
+
+class CursorExpired(Exception):
+    """Changes following cursor were pruned, consumer has to sync full registration list again."""
+
+
+def record_changes(action: str, rows) -> None:
+    """Appends changes of registrations to change log, with single INSERT per batch.
+    Callers record changes in the transaction which makes them, so log never misses committed change.
+
+    Args:
+        action: RegistrationChange.UPSERT or RegistrationChange.DELETE
+        rows: iterable of (registration id, plate) pairs
+    """
+
+    now = timezone.now()
+    RegistrationChange.objects.bulk_create(
+        [RegistrationChange(registration_id=pk, plate=plate, action=action, recorded_at=now) for pk, plate in rows],
+        batch_size=settings.CARPLATE_BULK_BATCH_SIZE)
+
+
+def sequence_changes() -> None:
+    """Places committed changes which have no position yet at the end of the log.
+
+    Ids of changes are assigned when they are recorded, before commit, so change of long transaction may
+    become visible after changes with higher ids. Positions are assigned only to changes already visible,
+    by one transaction at a time, so change placed later never gets position lower than a change consumers
+    could read before. Pending changes keep their order by id, positions may leave gaps.
+    """
+
+    pending = RegistrationChange.objects.filter(position__isnull=True)
+    if not pending.exists():
+        return
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_xact_lock(%s)', [SEQUENCE_LOCK])
+        first = pending.aggregate(first=Min('id'))['first']
+        if first is None:
+            return  # Placed by other process meanwhile
+        last = RegistrationChange.objects.aggregate(last=Max('position'))['last'] or 0
+        # Changes of lower ids committed after reading the first one are placed by next call
+        pending.filter(id__gte=first).update(position=F('id') + (last - first + 1))
+
+
+def log_head() -> int:
+    """Returns position of the last change, changes placed later follow it, see sequence_changes()."""
+
+    sequence_changes()
+    return RegistrationChange.objects.aggregate(head=Max('position'))['head'] or 0
+
+
+def settled_changes(since: int, limit: int) -> tuple:
+    """Returns the last change of every registration and plate changed after cursor, ordered by position,
+    and cursor of the last change read. Registration which changed plate has tombstone of the previous plate
+    followed by change of the current one. Committed changes are placed in the log first, see sequence_changes().
+
+    Args:
+        since: cursor returned by previous call, 0 to read the log from its start
+        limit: maximum number of changes read from log
+
+    Returns:
+        tuple: dictionary of changes keyed by (registration id, plate) and cursor to pass to next call
+
+    Raises:
+        CursorExpired: if changes following cursor were already pruned
+    """
+
+    sequence_changes()
+    oldest = RegistrationChange.objects.aggregate(oldest=Min('position'))['oldest']
+    if since and oldest is not None and oldest > since + 1:  # Gap left by sequencing is reported expired too
+        raise CursorExpired(f"Changes after {since} were pruned, the oldest available change is {oldest}")
+
+    latest = {}
+    cursor = since
+    log = RegistrationChange.objects.filter(position__gt=since).order_by('position')[:limit]
+    for change in log.values('id', 'position', 'registration_id', 'plate', 'action'):
+        key = (change['registration_id'], change['plate'])
+        latest.pop(key, None)  # Keeps dictionary ordered by the last change
+        latest[key] = change
+        cursor = change['position']
+    return latest, cursor
+
+
+def changes_since(since: int, limit: int, context: dict = None) -> tuple:
+    """Returns changes recorded after cursor, oldest first, and cursor of the last one, see settled_changes().
+    Upserts carry current registration data, deletes (tombstones) only id and plate.
+
+    Args:
+        since: cursor returned by previous call, 0 to read the log from its start
+        limit: maximum number of changes read from log
+        context: serializer context, e.g. request for absolute media URLs
+
+    Returns:
+        tuple: list of changes and cursor to pass to next call
+
+    Raises:
+        CursorExpired: if changes following cursor were already pruned
+    """
+
+    latest, cursor = settled_changes(since, limit)
+    upserted = list({pk for (pk, _), change in latest.items() if change['action'] == RegistrationChange.UPSERT})
+    serializer = RegistrationRowSerializer(context=context)
+    data = {}
+    for batch in chunked(upserted, connection.ops.bulk_batch_size(['id'], upserted)):
+        rows = RegistrationRowSerializer.prepare(Registration.objects.filter(pk__in=batch).order_by())
+        data.update((row['id'], serializer.to_representation(row)) for row in rows)
+
+    changes = []
+    for (pk, plate), change in latest.items():
+        if change['action'] == RegistrationChange.UPSERT and pk not in data:
+            continue  # Deleted meanwhile, its tombstone follows
+        upsert = change['action'] == RegistrationChange.UPSERT
+        changes.append({'id': change['id'], 'action': change['action'], 'registration_id': pk,
+                        'plate': plate, 'data': data[pk] if upsert else None})
+    return changes, cursor
+
+
+def prune_changes(retention: int = None) -> int:
+    """Deletes changes older than retention. The last of them is kept, so cursors pointing before it are detected
+    as expired, see settled_changes().
+
+    Args:
+        retention: days changes are kept for, defaults to CARPLATE_CHANGE_FEED['RETENTION']
+
+    Returns:
+        int: number of deleted changes
+    """
+
+    retention = settings.CARPLATE_CHANGE_FEED['RETENTION'] if retention is None else retention
+    sequence_changes()
+    expired = RegistrationChange.objects.filter(recorded_at__lt=timezone.now() - timedelta(days=retention),
+                                                position__isnull=False)
+    last = expired.aggregate(last=Max('position'))['last']
+    expired = expired.filter(position__lt=last or 0)
+    deleted = expired._raw_delete(expired.db)  # Nothing references change log, so no need to load rows
+    logger.info("Pruned %d registration changes older than %d days", deleted, retention)
+    return deleted
@@ -0,0 +1,53 @@
+# api/checks.py
+
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+from django.db import connections
+
+DEFAULT_SECRET_KEY = '(z*mev0plmo7tp_it45!l9^f)@wakdxv@**9pvowah&goxcp8w'
+PROCESS_LOCAL_CACHES = ('django.core.cache.backends.locmem.LocMemCache',)
+SHARED_CACHE_SETTINGS = ('CARPLATE_LIST_CACHE', 'CARPLATE_PLATE_CACHE', 'CARPLATE_METRICS')  # Settings naming cache alias in BACKEND
+
+
+@register(Tags.security, deploy=True)
+def check_production_settings(app_configs, **kwargs):
+    """Verifies production serving profile, run by "manage.py check --deploy" when container starts.
+
+    Returns:
+        list: errors, which should stop the deployment, and warnings
+    """
+
+    messages = []
+    if settings.DEBUG:
+        messages.append(Error(
+            "DEBUG is enabled, every SQL query is kept in memory and error pages leak settings.",
+            hint="Set DJANGO_ENV=production or DJANGO_DEBUG=0.", id='api.E001'))
+    if settings.SECRET_KEY == DEFAULT_SECRET_KEY:
+        messages.append(Error(
+            "SECRET_KEY is the one committed to repository.", hint="Set DJANGO_SECRET_KEY.", id='api.E002'))
+    if not settings.ALLOWED_HOSTS:
+        messages.append(Error(
+            "ALLOWED_HOSTS is empty, every request will be rejected.",
+            hint="Set DJANGO_ALLOWED_HOSTS to comma separated host names.", id='api.E003'))
+    for alias in connections:
+        if not connections.databases[alias].get('CONN_MAX_AGE'):
+            messages.append(Warning(
+                f"Database '{alias}' is connected to on every request.",
+                hint="Set DJANGO_CONN_MAX_AGE to number of seconds connections are reused for.", id='api.W001'))
+    for name in SHARED_CACHE_SETTINGS:
+        alias = getattr(settings, name)['BACKEND']
+        if alias and settings.CACHES.get(alias, {}).get('BACKEND') in PROCESS_LOCAL_CACHES:
+            messages.append(Error(
+                f"{name}['BACKEND'] names cache '{alias}' local to process, "
+                f"changes made by other web and Celery processes are never seen.",
+                hint="Set DJANGO_MEMCACHED to memcached servers shared by all processes.", id='api.E004'))
+    if not settings.CARPLATE_PLATE_CACHE['BACKEND'] and settings.CARPLATE_PLATE_CACHE['MAX_SIZE']:
+        messages.append(Error(
+            "CARPLATE_PLATE_CACHE keeps plates in every process, changes made by other web and Celery processes "
+            "are served (and validated by ETag) until the entry expires.",
+            hint="Set DJANGO_MEMCACHED, or CARPLATE_PLATE_CACHE['BACKEND'] to cache shared by all processes.",
+            id='api.E005'))
+    if not settings.STATIC_ROOT:
+        messages.append(Warning(
+            "STATIC_ROOT is not set, static files can not be collected for web server.", id='api.W002'))
+    return messages
@@ -0,0 +1,51 @@
+# api/conditional.py
+
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+class ConditionalGetMixin:
+
+    """
+    Answers conditional GET requests (If-None-Match / If-Modified-Since) with 304 Not Modified
+    before anything is serialized. Validators of detail views are derived from modified timestamp
+    of the looked up row, list views override get_validators(), see api.views.RegistrationList.
+    """
+
+    def get_conditional_queryset(self):
+        """Returns queryset response depends on. Defaults to the object looked up by detail views."""
+
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        return self.get_queryset().filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+
+    def get_validators(self, request) -> tuple:
+        """Returns ETag and Last-Modified timestamp of response, or (None, None) if nothing matches."""
+
+        state = self.get_conditional_queryset().aggregate(count=Count('pk'), modified=Max('modified'))
+        if not state['count']:
+            return None, None
+        return self.make_validators(request.accepted_media_type, state['count'], state['modified'])
+
+    @staticmethod
+    def make_validators(media_type: str, version, modified) -> tuple:
+        """Returns ETag and Last-Modified timestamp of response of given media type and version
+        (e.g. number of rows it holds), latest modified at given time."""
+
+        version = f"{version}:{modified.isoformat()}:{media_type}"
+        return quote_etag(hashlib.md5(version.encode()).hexdigest()), int(modified.timestamp())
+
+    def get(self, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request)
+        if etag is None:
+            return super().get(request, *args, **kwargs)
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+        return response
@@ -0,0 +1,149 @@
+# api/download_engine.py
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)  # Get an instance of a logger
+
+
+class HostRateLimiter:
+
+    """
+    Spaces out requests to the same host, so that at most rate requests per second are started.
+
+    Args:
+        rate: requests per second per host. 0 disables the limit
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate else 0
+        self._next = {}
+
+    async def wait(self, host: str) -> None:
+        if not host or not self.interval:
+            return
+
+        now = time.monotonic()
+        start = max(now, self._next.get(host, now))
+        self._next[host] = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+class DownloadEngine:
+
+    """
+    Asyncio event loop running in background thread of worker process.
+    All image retrieval tasks of the process submit downloads to it, so one process can keep
+    many downloads in flight while concurrency, per host rate and retries are controlled in one place.
+
+    Providers implementing afetch() coroutine download without blocking any thread,
+    other providers are run in thread pool of max_concurrency size.
+
+    Args:
+        max_concurrency: maximum number of downloads in flight
+        rate_limit: requests per second started towards the same host
+        retries: number of retries after failed download
+        backoff: seconds to wait before first retry, doubled with every next one
+        timeout: seconds single download may take, including waiting for free slot
+    """
+
+    def __init__(self, max_concurrency: int = 100, rate_limit: float = 0, retries: int = 2,
+                 backoff: float = 1, timeout: float = 60):
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.rate_limiter = HostRateLimiter(rate_limit)
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='download')
+
+        self._loop = None
+        self._slots = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                loop.set_default_executor(self.executor)
+                threading.Thread(target=loop.run_forever, name='download-engine', daemon=True).start()
+                self._loop = loop
+        return self._loop
+
+    async def _download(self, provider, car_model):
+        if self._slots is None:  # Created inside the loop, so that it is bound to it
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+
+        async with self._slots:
+            for attempt in range(self.retries + 1):
+                await self.rate_limiter.wait(getattr(provider, 'host', None))
+                try:
+                    return await provider.afetch(car_model)
+                except Exception:  # pylint: disable=broad-except
+                    if attempt == self.retries:
+                        raise
+                    delay = self.backoff * 2 ** attempt
+                    logger.warning("Downloading %s image failed, retrying in %s seconds", car_model, delay,
+                                   exc_info=True)
+                    await asyncio.sleep(delay)
+
+    def submit(self, provider, car_model: str):
+        """Schedules download and returns concurrent.futures.Future resolving to image path or None."""
+
+        return asyncio.run_coroutine_threadsafe(self._download(provider, car_model), self._start())
+
+    def download(self, provider, car_model: str) -> str:
+        """Downloads image using provider and waits for the result.
+
+        Args:
+            provider: image provider
+            car_model (str): car model
+
+        Returns:
+            str: Path to downloaded image. If image is not found, function returns None
+        """
+
+        future = self.submit(provider, car_model)
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    def stop(self):
+        with self._lock:
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self.executor.shutdown(wait=False)
+                self._loop = None
+                self._slots = None
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> DownloadEngine:
+    """Returns download engine of current process configured by CARPLATE_DOWNLOAD_ENGINE setting.
+    Engine thread is started on first download, i.e. after Celery has forked worker processes."""
+
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = DownloadEngine(**settings.CARPLATE_DOWNLOAD_ENGINE['OPTIONS'])
+        return _engine
+
+
+@receiver(setting_changed)
+def reset_engine(setting, **kwargs):
+    global _engine
+    if setting == 'CARPLATE_DOWNLOAD_ENGINE' and _engine is not None:
+        _engine.stop()
+        _engine = None
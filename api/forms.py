@@ -1,8 +1,9 @@
 from re import match
 
-from django.forms import ModelForm, ValidationError
+from django.forms import CharField, Form, IntegerField, ModelForm, ValidationError
 
 from .models import Registration
+from .plates import classify
 
 
 class RegistrationForm(ModelForm):
@@ -37,8 +38,27 @@ class RegistrationForm(ModelForm):
     def clean_plate(self):
         plate = self.cleaned_data['plate']
 
-        if not match(Registration.car_plate_regex, plate):
+        if classify(plate) is None:
             raise ValidationError(
                 "Provided car plate does not match any approved models. Please refer to README file")
 
         return plate
+
+
+class RegistrationFilterForm(Form):
+    plate = CharField(required=False, max_length=6, label="Plate starts with")
+    owner = CharField(required=False, max_length=200)
+    car_model = CharField(required=False, max_length=200)
+    page = IntegerField(required=False, min_value=1)
+
+    def filter(self, queryset):
+        """Applies filters to queryset. Plate and car model are stored upper-cased,
+        so their lookups do not need UPPER() and can use index."""
+
+        if self.cleaned_data.get('plate'):
+            queryset = queryset.filter(plate__startswith=self.cleaned_data['plate'])
+        if self.cleaned_data.get('owner'):
+            queryset = queryset.filter(owner__icontains=self.cleaned_data['owner'])
+        if self.cleaned_data.get('car_model'):
+            queryset = queryset.filter(car_model__contains=self.cleaned_data['car_model'].upper())
+        return queryset
@@ -0,0 +1,228 @@
+# api/fuzzy.py
+
+import logging
+import threading
+import time
+from array import array
+from collections import Counter
+from functools import reduce
+from operator import add, or_
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.dispatch import receiver
+
+from . import plates
+from .changes import CursorExpired, log_head, settled_changes
+from .models import Registration, RegistrationChange
+
+logger = logging.getLogger(__name__)  # Get an instance of a logger
+
+NGRAM = 3  # Length of n-grams plates are indexed by, also the shortest query
+CONFUSION_COST = 0.25  # Cost of reading character as one it is confused with, e.g. 0 as O, other edits cost 1
+PARTIAL_COST = 0.1  # Cost of every plate character not covered by partial query
+
+
+def ngrams(folded: str) -> set:
+    """Returns n-grams of folded plate, see plates.fold()."""
+
+    return {folded[index:index + NGRAM] for index in range(len(folded) - NGRAM + 1)}
+
+
+def _distance(query: str, plate: str, partial: bool = False) -> float:
+    """Weighted edit distance of query and plate. Partial distance matches query anywhere within plate."""
+
+    query_folded, plate_folded = plates.fold(query), plates.fold(plate)
+    if not partial and query_folded == plate_folded:  # Only confused characters differ, the common misreading
+        return CONFUSION_COST * sum(character != plate_character for character, plate_character in zip(query, plate))
+    previous = [0.0] * (len(plate) + 1) if partial else [float(index) for index in range(len(plate) + 1)]
+    for row, (character, folded) in enumerate(zip(query, query_folded), start=1):
+        current = [float(row)]
+        for column, (plate_character, plate_folded_character) in enumerate(zip(plate, plate_folded), start=1):
+            cost = 0 if character == plate_character else \
+                CONFUSION_COST if folded == plate_folded_character else 1
+            current.append(min(previous[column] + 1, current[column - 1] + 1, previous[column - 1] + cost))
+        previous = current
+    return min(previous) if partial else previous[-1]
+
+
+def similarity(query: str, plate: str) -> float:
+    """Scores how likely plate is the one query was read from, from 0 to 1 for exact match.
+    Confused characters (see plates.CONFUSABLE_CHARACTERS) cost less than other misreadings,
+    and query may be just part of plate.
+
+    Args:
+        query: plate as read, or its part
+        plate: registered plate
+
+    Returns:
+        float: similarity rounded to 3 decimal places
+    """
+
+    query, plate = query.strip().upper(), plate.strip().upper()
+    if not query or not plate:
+        return 0.0
+    distance = _distance(query, plate) / max(len(query), len(plate))
+    if len(query) < len(plate):
+        partial = _distance(query, plate, partial=True) + PARTIAL_COST * (len(plate) - len(query))
+        distance = min(distance, partial / len(query))
+    return round(max(1 - distance, 0.0), 3)
+
+
+class DatabaseIndex:
+
+    """
+    Looks candidates up by n-grams of folded plates stored in plate_folded column.
+    On Postgres every n-gram is LIKE '%...%' lookup answered by trigram GIN index, candidates sharing most
+    n-grams with query are selected by the database. Other databases scan the table.
+    """
+
+    def candidates(self, folded: str, limit: int) -> list:
+        grams = sorted(ngrams(folded))
+        overlap = reduce(add, (Case(When(plate_folded__contains=gram, then=Value(1)), default=Value(0),
+                                    output_field=IntegerField()) for gram in grams))
+        queryset = Registration.objects.filter(reduce(or_, (Q(plate_folded__contains=gram) for gram in grams)))
+        queryset = queryset.annotate(overlap=overlap).order_by('-overlap', 'plate')[:limit]
+        return list(queryset.values_list('pk', 'plate'))
+
+
+class MemoryIndex:
+
+    """
+    Per-process inverted index of folded plate n-grams, for setups without trigram index, e.g. SQLite and tests.
+    Index is built by scanning the table on first search and follows registration change log afterwards, at most
+    every REFRESH_INTERVAL seconds. It is rebuilt every REBUILD_INTERVAL seconds, once half of its entries
+    belong to changed or deleted registrations, or if change log was pruned meanwhile.
+
+    Postings hold positions in plate list, positions of changed and deleted registrations are emptied.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._built_at = 0
+        self._refreshed_at = 0
+        self._reset()
+
+    def _reset(self):
+        self._plates = []
+        self._positions = {}
+        self._postings = {}
+        self._cursor = 0
+        self._removed = 0
+
+    @property
+    def config(self) -> dict:
+        return settings.CARPLATE_FUZZY_SEARCH
+
+    def candidates(self, folded: str, limit: int) -> list:
+        self.refresh()
+        counts = Counter()
+        for gram in ngrams(folded):
+            counts.update(self._postings.get(gram, ()))
+
+        # Ties are broken by plate, the same way database index orders candidates
+        ranked = sorted(((overlap, self._plates[position]) for position, overlap in counts.items()
+                         if self._plates[position] is not None), key=lambda item: (-item[0], item[1][1]))
+        return [entry for _, entry in ranked[:limit]]
+
+    def _add(self, pk: int, plate: str) -> None:
+        position = self._positions.get(pk)
+        if position is not None:
+            if self._plates[position][1] == plate:
+                return
+            self._remove(pk)
+
+        position = len(self._plates)
+        self._plates.append((pk, plate))
+        self._positions[pk] = position
+        for gram in ngrams(plates.fold(plate)):
+            self._postings.setdefault(gram, array('L')).append(position)
+
+    def _remove(self, pk: int, plate: str = None) -> None:
+        position = self._positions.get(pk)
+        if position is not None and plate in (None, self._plates[position][1]):  # Tombstone of previous plate
+            del self._positions[pk]
+            self._plates[position] = None
+            self._removed += 1
+
+    def refresh(self) -> None:
+        """Applies registration changes recorded since last refresh, rebuilding index when needed."""
+
+        if time.monotonic() - self._refreshed_at <= self.config['REFRESH_INTERVAL']:
+            return
+        with self._lock:
+            started = time.monotonic()
+            if started - self._refreshed_at <= self.config['REFRESH_INTERVAL']:
+                return  # Refreshed by other thread meanwhile
+            if not self._plates or self._removed * 2 > len(self._plates) or \
+                    started - self._built_at > self.config['REBUILD_INTERVAL']:
+                self._build()
+                return
+
+            try:
+                while True:
+                    changes, cursor = settled_changes(self._cursor, settings.CARPLATE_BULK_BATCH_SIZE)
+                    for (pk, plate), change in changes.items():
+                        if change['action'] == RegistrationChange.DELETE:
+                            self._remove(pk, plate)
+                        else:
+                            self._add(pk, plate)
+                    if cursor == self._cursor:
+                        break
+                    self._cursor = cursor
+            except CursorExpired:
+                logger.info("Registration changes were pruned, rebuilding fuzzy search index")
+                self._build()
+                return
+            self._refreshed_at = started
+
+    def _build(self):
+        started = time.monotonic()
+        self._reset()
+        # Changes recorded while scanning are applied once more by the next refresh, which is harmless
+        self._cursor = log_head()
+        rows = Registration.objects.order_by().values_list('pk', 'plate')
+        for pk, plate in rows.iterator(chunk_size=settings.CARPLATE_STREAM_CHUNK_SIZE):
+            self._add(pk, plate)
+        self._built_at = self._refreshed_at = started
+        logger.info("Built fuzzy search index of %d plates in %.2f seconds", len(self._plates),
+                    time.monotonic() - started)
+
+
+_indexes = {}
+
+
+def get_index():
+    """Returns index configured by CARPLATE_FUZZY_SEARCH['BACKEND'], 'database' or 'memory'."""
+
+    backend = settings.CARPLATE_FUZZY_SEARCH['BACKEND']
+    if backend not in _indexes:
+        _indexes[backend] = {'database': DatabaseIndex, 'memory': MemoryIndex}[backend]()
+    return _indexes[backend]
+
+
+@receiver(setting_changed)
+def reset_indexes(setting, **kwargs):
+    if setting == 'CARPLATE_FUZZY_SEARCH':
+        _indexes.clear()
+
+
+def search(query: str, limit: int, min_score: float = None) -> list:
+    """Finds registered plates query was most likely read from.
+    Candidates sharing most n-grams of folded plate with query are scored by similarity().
+
+    Args:
+        query: plate as read, or its part, at least NGRAM characters long
+        limit: maximum number of results
+        min_score: lowest similarity of returned plates, defaults to CARPLATE_FUZZY_SEARCH['MIN_SCORE']
+
+    Returns:
+        list: (registration id, plate, similarity) tuples, the most similar first
+    """
+
+    config = settings.CARPLATE_FUZZY_SEARCH
+    min_score = config['MIN_SCORE'] if min_score is None else min_score
+    candidates = get_index().candidates(plates.fold(query), config['CANDIDATES'])
+    scored = ((pk, plate, similarity(query, plate)) for pk, plate in candidates)
+    return sorted((result for result in scored if result[2] >= min_score), key=lambda item: (-item[2], item[1]))[:limit]
@@ -0,0 +1,156 @@
+# api/image_cache.py
+
+import hashlib
+import logging
+import os
+import tempfile
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from . import image_variants
+from .models import CachedImage, Registration
+from .utils import chunked
+
+logger = logging.getLogger(__name__)  # Get an instance of a logger
+
+CACHE_FOLDER = 'images'
+DEFAULT_IMAGE = 'images/404.jpg'  # Shown when image was not found, never evicted from disk
+
+
+def normalize_car_model(car_model: str) -> str:
+    """Returns cache key for car model: upper-cased with collapsed whitespace."""
+
+    return ' '.join(car_model.replace('_', ' ').split()).upper()
+
+
+def lookup(car_model: str) -> str:
+    """Returns name of cached image for car model or None. Uses single indexed query,
+    file system is never touched.
+
+    Args:
+        car_model (str): car model
+
+    Returns:
+        str: Image name relative to media root. If image is not cached, function returns None
+    """
+
+    entry = CachedImage.objects.filter(car_model=normalize_car_model(car_model)).first()
+    if entry is None:
+        return None
+
+    # Refresh LRU position only once in a while, so that hot entries do not cause write per lookup
+    now = timezone.now()
+    if entry.last_used < now - timedelta(seconds=settings.CARPLATE_IMAGE_CACHE['TOUCH_INTERVAL']):
+        CachedImage.objects.filter(pk=entry.pk).update(last_used=now)
+
+    return entry.image
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(64 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _write_atomic(source_path: str, name: str) -> None:
+    """Copies file into storage under temporary name and renames it, so other workers
+    never see partially written image."""
+
+    target = default_storage.path(name)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(target), prefix='.tmp-')
+    try:
+        with os.fdopen(descriptor, 'wb') as output, open(source_path, 'rb') as source:
+            for block in iter(lambda: source.read(64 * 1024), b''):
+                output.write(block)
+        os.chmod(temporary, settings.FILE_UPLOAD_PERMISSIONS or 0o644)  # mkstemp creates private file
+        os.replace(temporary, target)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def store(car_model: str, source_path: str) -> str:
+    """Stores image file in cache and indexes it for car model.
+    Files with the same content are stored only once.
+
+    Args:
+        car_model (str): car model
+        source_path (str): path to image file, e.g. freshly downloaded image
+
+    Returns:
+        str: Image name relative to media root
+    """
+
+    content_hash = _hash_file(source_path)
+    extension = os.path.splitext(source_path)[1].lower() or '.jpg'
+    existing = CachedImage.objects.filter(content_hash=content_hash).values_list('image', flat=True).first()
+    name = existing or f"{CACHE_FOLDER}/{content_hash}{extension}"
+
+    if existing is None:
+        _write_atomic(source_path, name)
+        logger.debug("Stored %s in image cache", name)
+
+    values = {'image': name, 'content_hash': content_hash, 'size': os.path.getsize(source_path),
+              'last_used': timezone.now()}
+    try:
+        with transaction.atomic():
+            CachedImage.objects.update_or_create(car_model=normalize_car_model(car_model), defaults=values)
+    except IntegrityError:  # Other worker indexed the same car model concurrently
+        CachedImage.objects.filter(car_model=normalize_car_model(car_model)).update(**values)
+
+    evict()
+    return name
+
+
+def evict(max_bytes: int = None) -> int:
+    """Removes least recently used entries until cache size fits into limit. Size of file shared by several
+    entries (see store()) is counted once and freed once the last of them is removed.
+    Image files and their variants are deleted only when no other entry or registration refers to them.
+
+    Args:
+        max_bytes (int): cache size limit. Defaults to CARPLATE_IMAGE_CACHE['MAX_BYTES']
+
+    Returns:
+        int: number of removed entries
+    """
+
+    max_bytes = settings.CARPLATE_IMAGE_CACHE['MAX_BYTES'] if max_bytes is None else max_bytes
+    files = CachedImage.objects.values('content_hash').annotate(size=Max('size'))
+    total = sum(files.values_list('size', flat=True))
+    if total <= max_bytes:
+        return 0
+
+    entries = CachedImage.objects.order_by('last_used').values_list('pk', 'image', 'content_hash', 'size')
+    sharing = Counter(CachedImage.objects.values_list('content_hash', flat=True))
+    removed, freed = [], set()
+    for pk, image, content_hash, size in entries.iterator():
+        if total <= max_bytes:
+            break
+        removed.append(pk)
+        sharing[content_hash] -= 1
+        if not sharing[content_hash]:
+            total -= size
+            freed.add(image)
+
+    for batch in chunked(removed, connection.ops.bulk_batch_size(['pk'], removed)):
+        CachedImage.objects.filter(pk__in=batch).delete()
+    freed.discard(DEFAULT_IMAGE)
+    # Referenced images are collected by single query (per backend parameter limit), image column is not indexed
+    for batch in chunked(list(freed), connection.ops.bulk_batch_size(['image'], freed)):
+        freed.difference_update(CachedImage.objects.filter(image__in=batch).values_list('image', flat=True))
+        freed.difference_update(Registration.objects.filter(image__in=batch).values_list('image', flat=True))
+    for image in freed:
+        default_storage.delete(image)
+        image_variants.delete(image)
+
+    logger.info("Evicted %d images from cache", len(removed))
+    return len(removed)
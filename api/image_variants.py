@@ -0,0 +1,135 @@
+# api/image_variants.py
+
+import logging
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from PIL import Image
+
+logger = logging.getLogger(__name__)  # Get an instance of a logger
+
+VARIANT_FOLDER = 'images/variants'
+EXTENSIONS = {'jpeg': 'jpg', 'webp': 'webp'}
+
+# Variants known to exist in this process. Variants are deleted only together with images no registration
+# refers to, so remembered names stay valid for as long as they are served
+_generated = set()
+
+
+def variant_name(image: str, variant: str, image_format: str) -> str:
+    """Returns name of resized variant of image. Cached images are named by their content hash,
+    so variants are named by it too and identical images are processed only once.
+
+    Args:
+        image (str): image name relative to media root
+        variant (str): variant name, key of CARPLATE_IMAGE_VARIANTS setting
+        image_format (str): one of CARPLATE_IMAGE_VARIANT_FORMATS
+
+    Returns:
+        str: Variant name relative to media root
+    """
+
+    stem = os.path.splitext(os.path.basename(image))[0]
+    return f"{VARIANT_FOLDER}/{stem}.{variant}.{EXTENSIONS[image_format]}"
+
+
+def variant_names(image: str) -> dict:
+    """Returns names of all variants of image keyed by variant and format, e.g. names['thumbnail']['webp']"""
+
+    return {variant: {image_format: variant_name(image, variant, image_format)
+                      for image_format in settings.CARPLATE_IMAGE_VARIANT_FORMATS}
+            for variant in settings.CARPLATE_IMAGE_VARIANTS}
+
+
+def served_names(image: str) -> dict:
+    """Returns names of all variants of image keyed by variant and format, with the original image in place
+    of variants which were not created, e.g. for images stored before variants were introduced
+    (see generate_image_variants command) or which could not be processed."""
+
+    names = variant_names(image)
+    for formats in names.values():
+        for image_format, name in formats.items():
+            if name in _generated:
+                continue
+            if default_storage.exists(name):
+                _generated.add(name)
+            else:
+                formats[image_format] = image
+    return names
+
+
+def variant_urls(image: str) -> dict:
+    """Returns URLs of all variants of image keyed by variant and format, see served_names()."""
+
+    if not image:
+        return {}
+    return {variant: {image_format: default_storage.url(name) for image_format, name in names.items()}
+            for variant, names in served_names(image).items()}
+
+
+def _save_atomic(picture: Image.Image, name: str, image_format: str, quality: int) -> None:
+    target = default_storage.path(name)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(target), prefix='.tmp-')
+    try:
+        with os.fdopen(descriptor, 'wb') as output:
+            if image_format == 'jpeg':
+                picture.save(output, 'JPEG', quality=quality, optimize=True, progressive=True)
+            else:
+                picture.save(output, 'WEBP', quality=quality, method=4)
+        os.chmod(temporary, settings.FILE_UPLOAD_PERMISSIONS or 0o644)  # mkstemp creates private file
+        os.replace(temporary, target)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def generate(image: str) -> dict:
+    """Creates missing resized variants of image. Existing variants are kept, so calling it again is cheap.
+
+    Args:
+        image (str): image name relative to media root
+
+    Returns:
+        dict: Variant names keyed by variant and format
+    """
+
+    names = variant_names(image)
+    missing = {variant: formats for variant, formats in names.items()
+               if not all(default_storage.exists(name) for name in formats.values())}
+    if not missing:
+        _generated.update(name for formats in names.values() for name in formats.values())
+        return names
+
+    with Image.open(default_storage.path(image)) as source:
+        original = source.convert('RGB')  # Drops alpha and palette, which JPEG can not store
+
+    for variant, formats in missing.items():
+        options = settings.CARPLATE_IMAGE_VARIANTS[variant]
+        picture = original.copy()
+        picture.thumbnail(options['SIZE'], Image.LANCZOS)  # Keeps aspect ratio, never enlarges
+        for image_format, name in formats.items():
+            _save_atomic(picture, name, image_format, options['QUALITY'])
+            _generated.add(name)
+        logger.debug("Created %s variant of %s", variant, image)
+
+    return names
+
+
+def delete(image: str) -> None:
+    """Deletes all variants of image, e.g. when image is evicted from cache."""
+
+    for formats in variant_names(image).values():
+        for name in formats.values():
+            _generated.discard(name)
+            default_storage.delete(name)
+
+
+@receiver(setting_changed)
+def reset_generated(setting, **kwargs):
+    if setting == 'MEDIA_ROOT':
+        _generated.clear()
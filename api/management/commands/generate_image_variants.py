@@ -0,0 +1,38 @@
+# api/management/commands/generate_image_variants.py
+
+import logging
+
+from django.core.management.base import BaseCommand
+
+from ... import image_variants
+from ...models import CachedImage, Registration
+
+logger = logging.getLogger(__name__)  # Get an instance of a logger
+
+
+class Command(BaseCommand):
+
+    """
+    Creates missing resized variants of every image registrations or image cache refer to, e.g. of images
+    stored before variants were introduced or after CARPLATE_IMAGE_VARIANTS changed. Until then API serves
+    the original image in place of missing variants. Existing variants are kept, so running it again is cheap.
+
+    Usage:
+        python manage.py generate_image_variants
+    """
+
+    help = "Creates missing resized variants of stored car images"
+
+    def handle(self, *args, **options):
+        images = set(Registration.objects.exclude(image='').values_list('image', flat=True).distinct())
+        images.update(CachedImage.objects.values_list('image', flat=True))
+
+        failed = 0
+        for image in sorted(images):
+            try:
+                image_variants.generate(image)
+            except (OSError, ValueError):
+                logger.warning("Failed to create resized variants of %s", image, exc_info=True)
+                failed += 1
+
+        self.stdout.write(f"Variants of {len(images) - failed} images are in place, {failed} images failed")
@@ -0,0 +1,295 @@
+# api/metrics.py
+
+import logging
+import os
+import random
+import socket
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from celery.signals import task_postrun, task_prerun
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)  # Get an instance of a logger
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class Metric:
+
+    """
+    Base class of metrics kept in process memory. Values are keyed by label values.
+
+    Args:
+        name: metric name, e.g. carplate_http_requests_total
+        documentation: help text
+        labelnames: names of labels every observation is made with
+    """
+
+    type = None
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            samples = [[list(key), value if not isinstance(value, list) else list(value)]
+                       for key, value in self._values.items()]
+        return {'type': self.type, 'help': self.documentation, 'labelnames': list(self.labelnames),
+                'samples': samples}
+
+
+class Counter(Metric):
+
+    type = 'counter'
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Histogram(Metric):
+
+    """
+    Histogram with fixed buckets. Observations are counted in the first bucket they fit into,
+    cumulative counts are computed only when metrics are rendered.
+    """
+
+    type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]  # Buckets, +Inf and sum
+            counts[index] += 1
+            counts[-1] += value
+
+    def snapshot(self) -> dict:
+        snapshot = super().snapshot()
+        snapshot['buckets'] = list(self.buckets)
+        return snapshot
+
+
+class Registry:
+
+    """
+    Metrics of current process. Snapshots of all processes (web and Celery workers) are published
+    to shared Django cache, so that /metrics endpoint served by any process reports all of them.
+
+    Every process publishes its snapshot under one of MAX_PROCESSES slot keys, claimed with atomic
+    cache add(), so processes never overwrite each other's entries and no shared index has to be
+    updated. Slots of stopped processes expire and are claimed again by new ones.
+    """
+
+    KEY_PREFIX = 'metrics:slot:'
+    MAX_PROCESSES = 256
+
+    def __init__(self):
+        self.metrics = {}
+        self.collectors = []
+        self._published = 0
+        self._slot = None
+
+    @property
+    def process(self) -> str:
+        return f"{socket.gethostname()}:{os.getpid()}"  # Evaluated every time, Celery forks worker processes
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple = (), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def collector(self, function):
+        """Registers function returning {metric name: (type, help, value)} of values read at collection time,
+        e.g. counters other modules keep anyway. Can be used as decorator."""
+
+        self.collectors.append(function)
+        return function
+
+    def snapshot(self) -> dict:
+        snapshot = {name: metric.snapshot() for name, metric in self.metrics.items()}
+        for collector in self.collectors:
+            for name, (metric_type, documentation, value) in collector().items():
+                snapshot[name] = {'type': metric_type, 'help': documentation, 'labelnames': [],
+                                  'samples': [[[], value]]}
+        return snapshot
+
+    @property
+    def backend(self):
+        return caches[settings.CARPLATE_METRICS['BACKEND']]
+
+    def publish(self, force: bool = False) -> None:
+        """Stores snapshot of this process in shared cache, at most once per PUBLISH_INTERVAL unless forced."""
+
+        interval = settings.CARPLATE_METRICS['PUBLISH_INTERVAL']
+        now = time.monotonic()
+        if not force and now - self._published < interval:
+            return
+        self._published = now
+
+        entry = (self.process, self.snapshot())
+        timeout = interval * 10  # Snapshots of stopped processes expire
+        if self._slot is not None:
+            # Slot left unpublished for longer than timeout may have been claimed by other process
+            key = self.KEY_PREFIX + str(self._slot)
+            claimed = self.backend.get(key)
+            if claimed is not None and claimed[0] == entry[0]:
+                self.backend.set(key, entry, timeout)
+                return
+        for slot in range(self.MAX_PROCESSES):
+            if self.backend.add(self.KEY_PREFIX + str(slot), entry, timeout):
+                self._slot = slot
+                return
+        logger.warning("All %d metrics slots are taken, metrics of %s are not published", self.MAX_PROCESSES,
+                       entry[0])
+
+    def collect(self) -> dict:
+        """Returns snapshots of all processes keyed by process name."""
+
+        self.publish(force=True)
+        entries = self.backend.get_many([self.KEY_PREFIX + str(slot) for slot in range(self.MAX_PROCESSES)])
+        return dict(entries.values())
+
+    def render(self) -> str:
+        """Renders metrics of all processes in Prometheus text format, each labelled by process."""
+
+        merged = {}
+        for process, snapshot in sorted(self.collect().items()):
+            for name, metric in snapshot.items():
+                merged.setdefault(name, (metric, []))[1].append((process, metric))
+
+        lines = []
+        for name, (first, metrics) in sorted(merged.items()):
+            lines.append(f"# HELP {name} {first['help']}")
+            lines.append(f"# TYPE {name} {first['type']}")
+            for process, metric in metrics:
+                for label_values, value in metric['samples']:
+                    labels = dict(zip(metric['labelnames'], label_values), process=process)
+                    if metric['type'] == 'histogram':
+                        lines.extend(_histogram_lines(name, labels, metric['buckets'], value))
+                    else:
+                        lines.append(f"{name}{_labels(labels)} {value}")
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels: dict) -> str:
+    escaped = (name + '="' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+               for name, value in labels.items())
+    return '{' + ','.join(escaped) + '}'
+
+
+def _histogram_lines(name, labels, buckets, counts):
+    cumulative = 0
+    for bound, count in zip(list(buckets) + ['+Inf'], counts):
+        cumulative += count
+        yield f"{name}_bucket{_labels(dict(labels, le=bound))} {cumulative}"
+    yield f"{name}_sum{_labels(labels)} {counts[-1]}"
+    yield f"{name}_count{_labels(labels)} {cumulative}"
+
+
+def sampled() -> bool:
+    """Decides whether current request or task is measured, according to CARPLATE_METRICS['SAMPLE_RATE']."""
+
+    config = settings.CARPLATE_METRICS
+    return config['ENABLED'] and random.random() < config['SAMPLE_RATE']
+
+
+_timing = threading.local()
+
+
+@contextmanager
+def measure_phases():
+    """Enables phase() timings in current thread, e.g. for single sampled task."""
+
+    _timing.enabled = True
+    try:
+        yield
+    finally:
+        _timing.enabled = False
+
+
+@contextmanager
+def phase(histogram: Histogram, **labels):
+    """Observes duration of the block if current request or task is sampled."""
+
+    if not getattr(_timing, 'enabled', False):
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - started, **labels)
+
+
+registry = Registry()
+
+http_requests = registry.counter(
+    'carplate_http_requests_total', "HTTP requests", ('endpoint', 'method', 'status'))
+http_latency = registry.histogram(
+    'carplate_http_request_duration_seconds', "Sampled HTTP request latency", ('endpoint', 'method'))
+db_queries = registry.histogram(
+    'carplate_http_db_queries', "Sampled number of database queries per HTTP request", ('endpoint',),
+    buckets=COUNT_BUCKETS)
+db_time = registry.histogram(
+    'carplate_http_db_duration_seconds', "Sampled database time per HTTP request", ('endpoint',))
+tasks = registry.counter(
+    'carplate_celery_tasks_total', "Finished Celery tasks", ('task', 'state'))
+task_latency = registry.histogram(
+    'carplate_celery_task_duration_seconds', "Sampled Celery task duration", ('task',))
+image_phases = registry.histogram(
+    'carplate_image_retrieval_phase_duration_seconds', "Sampled duration of image retrieval phases", ('phase',))
+list_cache_requests = registry.counter(
+    'carplate_list_cache_requests_total', "HTML list fragment cache lookups", ('result',))
+
+
+_task_starts = {}
+
+
+@task_prerun.connect
+def task_prerun_receiver(task_id, **kwargs):
+    """Starts measuring sampled Celery task, including phases of image retrieval."""
+
+    if sampled():
+        _task_starts[task_id] = time.perf_counter()
+        _timing.enabled = True
+
+
+@task_postrun.connect
+def task_postrun_receiver(task_id, task, state=None, **kwargs):
+    """Records finished Celery task and publishes metrics of worker process."""
+
+    if not settings.CARPLATE_METRICS['ENABLED']:
+        return
+
+    started = _task_starts.pop(task_id, None)
+    if started is not None:
+        task_latency.observe(time.perf_counter() - started, task=task.name)
+        _timing.enabled = False
+    tasks.inc(task=task.name, state=state or 'UNKNOWN')
+    registry.publish()
@@ -0,0 +1,70 @@
+# api/middleware.py
+
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from . import metrics
+
+
+class QueryTimer:
+
+    """
+    Database execute wrapper counting queries and their total duration.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.duration += time.perf_counter() - started
+
+
+class MetricsMiddleware:
+
+    """
+    Counts every request by endpoint, method and status. Sampled requests (CARPLATE_METRICS['SAMPLE_RATE'])
+    are also timed together with their database queries, others cost just one counter increment.
+    Should be the first middleware, so that latency covers the rest of them.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.CARPLATE_METRICS['ENABLED']:
+            return self.get_response(request)
+
+        if not metrics.sampled():
+            response = self.get_response(request)
+            self.count(request, response)
+            return response
+
+        timer = QueryTimer()
+        started = time.perf_counter()
+        with connection.execute_wrapper(timer), metrics.measure_phases():
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+
+        endpoint = self.count(request, response)
+        metrics.http_latency.observe(duration, endpoint=endpoint, method=request.method)
+        metrics.db_queries.observe(timer.queries, endpoint=endpoint)
+        metrics.db_time.observe(timer.duration, endpoint=endpoint)
+        return response
+
+    @staticmethod
+    def count(request, response) -> str:
+        """Counts request and publishes metrics if due. Returns endpoint label, name of the URL pattern."""
+
+        match = getattr(request, 'resolver_match', None)
+        endpoint = match.view_name if match and match.view_name else 'unmatched'
+        metrics.http_requests.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+        metrics.registry.publish()
+        return endpoint
@@ -0,0 +1,17 @@
+# Generated by Django 2.2.13 on 2026-10-18 14:58
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='registration',
+            options={'ordering': ('created', 'id')},
+        ),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations
+
+TRIGRAM_INDEX = 'api_registration_plate_trgm'
+
+
+def create_trigram_index(apps, schema_editor):
+    """Plate contains lookups (search) are LIKE '%...%' queries which can only use trigram index.
+    Prefix and exact lookups are already covered by unique and varchar_pattern_ops indexes."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {TRIGRAM_INDEX} ON api_registration USING gin (plate gin_trgm_ops)')
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {TRIGRAM_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_registration_ordering'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
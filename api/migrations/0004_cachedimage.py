@@ -0,0 +1,53 @@
+# Generated by Django 2.2.13 on 2026-10-18 15:02
+
+import hashlib
+import os
+
+from django.conf import settings
+from django.db import migrations, models
+import django.utils.timezone
+
+PLACEHOLDER = '404.jpg'  # Shown for images not found, see image_cache.DEFAULT_IMAGE, not image of any car model
+
+
+def index_existing_images(apps, schema_editor):
+    """One-time import of images cached by previous versions as images/<CAR_MODEL>.<ext> files."""
+    CachedImage = apps.get_model('api', 'CachedImage')
+    folder = os.path.join(settings.MEDIA_ROOT, 'images')
+    if not os.path.isdir(folder):
+        return
+
+    for file_name in sorted(os.listdir(folder)):
+        path = os.path.join(folder, file_name)
+        if file_name == PLACEHOLDER or not os.path.isfile(path):
+            continue
+        with open(path, 'rb') as file:
+            content_hash = hashlib.sha256(file.read()).hexdigest()
+        car_model = ' '.join(os.path.splitext(file_name)[0].replace('_', ' ').split()).upper()
+        CachedImage.objects.get_or_create(car_model=car_model, defaults={
+            'image': f'images/{file_name}',
+            'content_hash': content_hash,
+            'size': os.path.getsize(path),
+        })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_registration_plate_trigram_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CachedImage',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('car_model', models.CharField(help_text='Normalized car model', max_length=200, unique=True)),
+                ('image', models.CharField(help_text='Image name relative to media root', max_length=255)),
+                ('content_hash', models.CharField(db_index=True, help_text='SHA-256 of image content', max_length=64)),
+                ('size', models.PositiveIntegerField(default=0, help_text='Image size in bytes')),
+                ('last_used', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(index_existing_images, migrations.RunPython.noop),
+    ]
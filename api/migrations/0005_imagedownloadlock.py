@@ -0,0 +1,22 @@
+# Generated by Django 2.2.13 on 2026-10-18 15:04
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_cachedimage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageDownloadLock',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('car_model', models.CharField(help_text='Normalized car model', max_length=200, unique=True)),
+                ('acquired_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 2.2.13 on 2026-10-18 15:12
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_created(apps, schema_editor):
+    """Rows which were never tracked are considered last modified when they were created."""
+
+    Registration = apps.get_model('api', 'Registration')
+    Registration.objects.update(modified=F('created'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_imagedownloadlock'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registration',
+            name='modified',
+            field=models.DateTimeField(auto_now=True, db_index=True, help_text='Last change, used to answer conditional requests'),
+        ),
+        migrations.RunPython(copy_created, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 2.2.13 on 2026-10-18 15:20
+
+from collections import defaultdict
+
+import Models.CICharField
+import api.plates
+from api.utils import chunked
+from django.db import migrations, models
+
+
+def classify_plates(apps, schema_editor):
+    """Stores class of every existing plate, with one UPDATE per plate class and chunk."""
+
+    Registration = apps.get_model('api', 'Registration')
+    rows = Registration.objects.order_by('pk').values_list('pk', 'plate').iterator(chunk_size=5000)
+    for chunk in chunked(rows, 5000):
+        groups = defaultdict(list)
+        for (pk, _), plate_type in zip(chunk, api.plates.classify_many(plate for _, plate in chunk)):
+            groups[plate_type or ''].append(pk)
+        for plate_type, pks in groups.items():
+            Registration.objects.filter(pk__in=pks).update(plate_type=plate_type)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_registration_modified'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registration',
+            name='plate_type',
+            field=models.CharField(blank=True, choices=[('car', 'Car'), ('trailer', 'Trailer'), ('motorcycle', 'Motorcycle'), ('moped', 'Moped'), ('quad', 'Quad bike'), ('taxi', 'Taxi'), ('historic_car', 'Historic car'), ('historic_motorcycle', 'Historic motorcycle'), ('temporary_car', 'Temporary car or trailer'), ('temporary_motorcycle', 'Temporary motorcycle'), ('electric', 'Electric car'), ('diplomatic', 'Diplomatic'), ('custom', 'Custom')], db_index=True, editable=False, help_text='Plate class matched by plate number', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='registration',
+            name='plate',
+            field=Models.CICharField.CICharField(help_text='Car plate number (as per Lithuanian standards)', max_length=6, unique=True, validators=[api.plates.PlateValidator()]),
+        ),
+        migrations.RunPython(classify_plates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 2.2.13 on 2026-10-18 15:47
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_registration_plate_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistrationChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('registration_id', models.IntegerField(help_text='Id of changed registration')),
+                ('plate', models.CharField(help_text='Plate number of changed registration', max_length=6)),
+                ('action', models.CharField(choices=[('upsert', 'Created or updated'), ('delete', 'Deleted')], max_length=10)),
+                ('recorded_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
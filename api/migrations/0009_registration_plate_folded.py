@@ -0,0 +1,52 @@
+# Generated by Django 2.2.13 on 2026-10-18 15:50
+
+from django.db import migrations, models
+from django.db.models import F, Value
+from django.db.models.functions import Replace
+
+import api.plates
+
+TRIGRAM_INDEX = 'api_registration_plate_folded_trgm'
+
+
+def fold_plates(apps, schema_editor):
+    """Folds every existing plate with single UPDATE of nested REPLACE() calls, the same way plates.fold() does."""
+
+    Registration = apps.get_model('api', 'Registration')
+    folded = F('plate')
+    for group in api.plates.CONFUSABLE_CHARACTERS:
+        for character in group[1:]:
+            folded = Replace(folded, Value(character), Value(group[0]))
+    Registration.objects.update(plate_folded=folded)
+
+
+def create_trigram_index(apps, schema_editor):
+    """Fuzzy plate search looks up folded plates by their trigrams, LIKE '%...%' queries use trigram index."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {TRIGRAM_INDEX} ON api_registration USING gin (plate_folded gin_trgm_ops)')
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {TRIGRAM_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_registrationchange'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registration',
+            name='plate_folded',
+            field=models.CharField(blank=True, editable=False, help_text='Plate with confusable characters folded, see plates.fold()', max_length=6),
+        ),
+        migrations.RunPython(fold_plates, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
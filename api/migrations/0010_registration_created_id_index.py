@@ -0,0 +1,17 @@
+# Generated by Django 2.2.13 on 2026-10-18 16:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_registration_plate_folded'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='registration',
+            index=models.Index(fields=['created', 'id'], name='api_registration_created_id'),
+        ),
+    ]
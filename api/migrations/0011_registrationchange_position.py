@@ -0,0 +1,27 @@
+# Generated by Django 2.2.13 on 2026-10-18 16:22
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def sequence_recorded_changes(apps, schema_editor):
+    """Changes recorded before positions were introduced are committed already, they keep their order by id."""
+
+    RegistrationChange = apps.get_model('api', 'RegistrationChange')
+    RegistrationChange.objects.update(position=F('id'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_registration_created_id_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registrationchange',
+            name='position',
+            field=models.BigIntegerField(editable=False, help_text='Place of committed change in the log, see changes.sequence_changes()', null=True, unique=True),
+        ),
+        migrations.RunPython(sequence_recorded_changes, migrations.RunPython.noop),
+    ]
@@ -2,10 +2,13 @@ import logging
 
 from django.contrib import admin
 from django.core.validators import RegexValidator
-from django.db import models
+from django.db import models, router, transaction
+from django.utils import timezone
 
 from Models.CICharField import CICharField
 
+from . import image_variants, plates
+
 logger = logging.getLogger(__name__)  # Get an instance of a logger
 
 
@@ -23,21 +26,18 @@ class Registration(models.Model):
         None
     """
 
-    # RegEx for validating car plate pattern
+    # RegEx for validating owner and car model, plates are validated by api.plates
     car_and_owner_regex = r'^\w+\s+(\w+\s*)+$'
-    car_plate_regex = r'^([a-zA-Z]{2,3}\d{3}$|' \
-                      r'^[a-zA-Z]{2}\d{2}$|' \
-                      r'^\d{3}[a-zA-Z]{2}$|' \
-                      r'^\d{2}[a-zA-Z]{3}$|' \
-                      r'^(?=\w*\d)\S{5,6}$|' \
-                      r'^\d{4}[a-zA-Z]{1,2}$|' \
-                      r'^[THP]\d{5}|\d{5,6}$|' \
-                      r'^\d{4}H|P\d{4}$|' \
-                      r'^E[a-zA-Z]\d{4})$'
 
     created = models.DateTimeField(auto_now_add=True)
-    plate = CICharField(max_length=6, blank=False, unique=True, validators=[RegexValidator(regex=car_plate_regex)],
+    modified = models.DateTimeField(auto_now=True, db_index=True,
+                                    help_text="Last change, used to answer conditional requests")
+    plate = CICharField(max_length=6, blank=False, unique=True, validators=[plates.validate_plate],
                         help_text="Car plate number (as per Lithuanian standards)")
+    plate_folded = models.CharField(max_length=6, blank=True, editable=False,
+                                    help_text="Plate with confusable characters folded, see plates.fold()")
+    plate_type = models.CharField(max_length=20, choices=plates.PLATE_TYPES, blank=True, db_index=True,
+                                  editable=False, help_text="Plate class matched by plate number")
     owner = models.CharField(max_length=200, blank=False, help_text="Owner's full name (Name and Surname)",
                              unique=False, validators=[RegexValidator(regex=car_and_owner_regex)])
     car_model = models.CharField(max_length=200, blank=False, help_text="Car make and model",
@@ -48,30 +48,180 @@ class Registration(models.Model):
                                          editable=False)
 
     class Meta:
-        ordering = ('created',)
+        ordering = ('created', 'id')
+        indexes = [
+            # Keyset pagination and ordered list seek by (created, id), see pagination.RegistrationCursorPagination
+            models.Index(fields=['created', 'id'], name='api_registration_created_id'),
+        ]
 
     def __str__(self):
         return self.plate
 
+    @property
+    def image_variants(self) -> dict:
+        """URLs of resized image variants keyed by variant and format, e.g. image_variants['thumbnail']['webp']"""
+
+        return image_variants.variant_urls(self.image.name)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember values loaded from database, so changed fields can be detected without extra query."""
+
+        instance = super(Registration, cls).from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def get_original_value(self, field_name: str):
+        """Returns value field had when instance was loaded from database (or last saved)."""
+
+        return getattr(self, '_loaded_values', {}).get(self._meta.get_field(field_name).attname)
+
+    def get_changed_fields(self) -> list:
+        """Returns names of fields whose values differ from values loaded from database.
+        Fields which were deferred and never loaded are considered unchanged."""
+
+        loaded = self._loaded_values
+        deferred = self.get_deferred_fields()
+        changed = []
+        for field in self._meta.concrete_fields:
+            if field.attname in deferred:
+                continue
+            value = field.get_prep_value(getattr(self, field.attname))
+            if field.attname not in loaded or loaded[field.attname] != value:
+                changed.append(field.name)
+        return changed
+
     def save(self, force_insert=False, force_update=False, using=None, update_fields=None):
         """Override save method in order to:
             - capitalize plate number
             - set title case for owner field
             - capitalize car model
-            - and verify if car image should be retrieved
+            - verify if car image should be retrieved
+            - write only changed fields when updating instance loaded from database
+            - and run post_save receivers in the same transaction, so change log never misses a saved change
         """
 
-        # Check if car model has changed and if so, mark object as Update Required
-        if self.pk is not None and self.retrieve_image is False:
-            original = Registration.objects.get(pk=self.pk)  # Compare current
-            if original.car_model != self.car_model:  # Compare new and old values of car model
+        self.normalize()
+        self.plate_type = plates.classify(self.plate) or ''
+
+        if self.pk is not None and not self._state.adding and hasattr(self, '_loaded_values'):
+            changed = self.get_changed_fields()
+            if 'car_model' in changed and (update_fields is None or 'car_model' in update_fields):
+                logger.info("Car model changed from '%s' to '%s'", self.get_original_value('car_model'),
+                            self.car_model)
+                self.retrieve_image = True  # Mark object as Update Required
+                changed.append('retrieve_image')
+            if update_fields is None and not force_insert:
+                update_fields = set(changed)
+            elif update_fields is not None and 'retrieve_image' in changed:
+                update_fields = set(update_fields) | {'retrieve_image'}
+
+        # Instance was not loaded from database, so compare with the stored one
+        elif self.pk is not None and self.retrieve_image is False:
+            original = Registration.objects.filter(pk=self.pk).first()
+            if original is not None and original.car_model != self.car_model:
                 logger.info("Car model changed from '%s' to '%s'", original.car_model, self.car_model)
                 self.retrieve_image = True
 
+        if update_fields:  # auto_now is applied only to saved fields
+            update_fields = set(update_fields) | {'modified'}
+            if 'plate' in update_fields:
+                update_fields.add('plate_folded')
+
+        with transaction.atomic(using=using or router.db_for_write(Registration, instance=self), savepoint=False):
+            super(Registration, self).save(force_insert, force_update, using, update_fields)
+
+        # Saved values become the new baseline for change detection
+        deferred = self.get_deferred_fields()
+        loaded = getattr(self, '_loaded_values', {})
+        saved = [field for field in self._meta.concrete_fields
+                 if field.attname not in deferred and (update_fields is None or field.name in update_fields)]
+        loaded.update({field.attname: field.get_prep_value(getattr(self, field.attname)) for field in saved})
+        self._loaded_values = loaded
+
+    def normalize(self):
+        """Apply formatting rules to field values without touching the database.
+        Used by save() and by bulk operations which bypass it.
+        """
+
         self.plate = self.plate.strip().upper()  # Capitalize car plate
+        self.plate_folded = plates.fold(self.plate)  # Searched by fuzzy plate search
         self.car_model = self.car_model.strip().upper()  # Capitalize car model
         self.owner = self.owner.strip().title()  # Apply TitleCase for owner's name
-        super(Registration, self).save(force_insert, force_update, using, update_fields)
+
+
+class CachedImage(models.Model):
+
+    """
+    Index of car model images stored in local cache, shared by all Celery workers.
+    Files are content addressed (named by hash of their content), so the same picture
+    downloaded for several car models is stored only once.
+
+    Args:
+        car_model: Normalized car model
+        image: Image name relative to media root
+        content_hash: SHA-256 of image content
+        size: Image size in bytes
+        last_used: Last time image was taken from cache, used for LRU eviction
+    """
+
+    car_model = models.CharField(max_length=200, unique=True, help_text="Normalized car model")
+    image = models.CharField(max_length=255, help_text="Image name relative to media root")
+    content_hash = models.CharField(max_length=64, db_index=True, help_text="SHA-256 of image content")
+    size = models.PositiveIntegerField(default=0, help_text="Image size in bytes")
+    last_used = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return self.car_model
+
+
+class ImageDownloadLock(models.Model):
+
+    """
+    Marks car model whose image is being downloaded, so that only one worker downloads it at a time.
+
+    Args:
+        car_model: Normalized car model
+        acquired_at: When download started, used to take over locks left by crashed workers
+    """
+
+    car_model = models.CharField(max_length=200, unique=True, help_text="Normalized car model")
+    acquired_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return self.car_model
+
+
+class RegistrationChange(models.Model):
+
+    """
+    Append-only log of registration changes read by downstream replicas, see api.changes.
+    Registration is referenced by id only, so that deletions are kept as tombstones.
+
+    Args:
+        registration_id: Id of changed registration
+        plate: Plate number registration had after change (before deletion). Plate change is recorded
+            as deletion of the previous plate followed by upsert of the new one
+        action: Whether registration was created or updated, or deleted
+        recorded_at: When change was recorded, changes are pruned once older than retention
+        position: Place of change in the log, assigned once its transaction committed, see
+            api.changes.sequence_changes(). Consumers follow positions, not ids, which are assigned before commit
+    """
+
+    UPSERT = 'upsert'
+    DELETE = 'delete'
+    ACTIONS = ((UPSERT, "Created or updated"), (DELETE, "Deleted"))
+
+    id = models.BigAutoField(primary_key=True)
+    registration_id = models.IntegerField(help_text="Id of changed registration")
+    plate = models.CharField(max_length=6, help_text="Plate number of changed registration")
+    action = models.CharField(max_length=10, choices=ACTIONS)
+    recorded_at = models.DateTimeField(default=timezone.now, db_index=True)
+    position = models.BigIntegerField(null=True, unique=True, editable=False,
+                                      help_text="Place of committed change in the log, see changes.sequence_changes()")
+
+    def __str__(self):
+        return f"{self.action} {self.plate}"
 
 
 class RegistrationAdmin(admin.ModelAdmin):
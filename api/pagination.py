@@ -0,0 +1,50 @@
+# api/pagination.py
+
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class RegistrationCursorPagination(CursorPagination):
+    """
+    Keyset pagination over (created, id), matching Registration ordering.
+    Each page costs single query seeking composite (created, id) index, regardless of how deep client has paged.
+
+    Pagination is opt-in: it is applied only when request contains cursor or page_size
+    query parameter, so existing clients keep receiving plain list.
+    """
+
+    ordering = ('created', 'id')
+    page_size_query_param = 'page_size'
+
+    def __init__(self):
+        self.page_size = settings.CARPLATE_PAGE_SIZE
+        self.max_page_size = settings.CARPLATE_MAX_PAGE_SIZE
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not {self.cursor_query_param, self.page_size_query_param} & set(request.query_params):
+            return None
+
+        return super().paginate_queryset(queryset, request, view)
+
+
+def paginate_without_count(queryset, page: int, per_page: int) -> dict:
+    """Returns single page of queryset without counting all rows.
+    One extra row is fetched to find out whether next page exists, so each page costs single query.
+
+    Args:
+        queryset: ordered queryset
+        page (int): 1-based page number
+        per_page (int): number of rows on page
+
+    Returns:
+        dict: rows of the page, page number and whether previous and next pages exist
+    """
+
+    offset = (page - 1) * per_page
+    rows = list(queryset[offset:offset + per_page + 1])
+    return {
+        'object_list': rows[:per_page],
+        'number': page,
+        'has_previous': page > 1,
+        'has_next': len(rows) > per_page,
+    }
@@ -0,0 +1,51 @@
+# api/parsers.py
+
+import codecs
+import csv
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+def _text_lines(stream, media_type=None, parser_context=None):
+    """Decodes request stream lazily so large bodies are never loaded into memory at once."""
+
+    parser_context = parser_context or {}
+    encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+    if stream is None:
+        return iter(())
+    return codecs.getreader(encoding)(stream)
+
+
+class NDJSONParser(BaseParser):
+    """
+    Parses newline delimited JSON. Rows are yielded one by one, malformed lines are
+    yielded as ParseError instances so they can be reported per row.
+    """
+
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        lines = _text_lines(stream, media_type, parser_context)
+        return (self.parse_line(line) for line in lines if line.strip())
+
+    @staticmethod
+    def parse_line(line):
+        try:
+            return json.loads(line)
+        except ValueError as exc:
+            return ParseError(f"JSON parse error - {exc}")
+
+
+class CSVParser(BaseParser):
+    """
+    Parses CSV with header row. Rows are yielded one by one as dictionaries.
+    """
+
+    media_type = 'text/csv'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        lines = _text_lines(stream, media_type, parser_context)
+        return csv.DictReader(lines)
@@ -0,0 +1,231 @@
+# api/plate_index.py
+
+import hashlib
+import logging
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import close_old_connections
+from django.dispatch import receiver
+
+from . import metrics
+from .changes import CursorExpired, log_head, settled_changes
+from .models import Registration, RegistrationChange
+
+logger = logging.getLogger(__name__)  # Get an instance of a logger
+
+
+class BloomFilter:
+
+    """
+    Bloom filter of strings: membership test without false negatives and with given share of false positives.
+    Every value sets `hashes` bits of bit array, positions are derived from single 128 bit digest.
+
+    Args:
+        capacity: number of values filter is sized for, more values raise false positive rate
+        error_rate: share of absent values reported as present once filter holds capacity values
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(capacity, 1)
+        self.size = max(int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)), 8)
+        self.hashes = max(int(round(self.size / capacity * math.log(2))), 1)
+        self.capacity = capacity
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+        self._lock = threading.Lock()  # Setting bit is read, modify and write, concurrent adds could lose bits
+
+    def _positions(self, value: str):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [(first + index * second) % self.size for index in range(self.hashes)]
+
+    def add(self, value: str) -> bool:
+        """Adds value, returns whether it was new. Values already reported present are not counted again."""
+
+        added = False
+        with self._lock:
+            for position in self._positions(value):
+                mask = 1 << (position & 7)
+                if not self.bits[position >> 3] & mask:
+                    self.bits[position >> 3] |= mask
+                    added = True
+            self.count += added
+        return added
+
+    def __contains__(self, value: str) -> bool:
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class PlateIndex:
+
+    """
+    Per-process membership index of registered plates, so lookups of unregistered plates are answered
+    without database. Index is Bloom filter: plate it does not contain is not registered, plate it contains
+    is most likely registered and looked up as usual.
+
+    Index is kept by background thread of process: it builds index by scanning plate column (at server startup,
+    see gunicorn.conf.py, otherwise once started by the first lookup, which goes to database meanwhile) and then
+    follows registration change log every REFRESH_INTERVAL seconds, see api.changes.settled_changes(). Plates
+    saved in this process are added by post_save receiver right away, plates registered by other processes
+    are found once the next refresh picks their changes up, lookups never wait for database.
+
+    Deleted plates can not be removed from Bloom filter, they stay false positives until index is rebuilt
+    every REBUILD_INTERVAL seconds or once it holds more plates than it was sized for.
+    Settings are read from CARPLATE_PLATE_INDEX, index is reset when they change.
+    """
+
+    GROWTH = 2  # Index is sized for this many times plates registered when it is built
+
+    def __init__(self):
+        self._filter = None
+        self._lock = threading.Lock()
+        self._worker = None
+        self._built_at = 0
+        self._settled = 0
+        self.answered = 0
+
+    @property
+    def config(self) -> dict:
+        return settings.CARPLATE_PLATE_INDEX
+
+    @staticmethod
+    def normalize(plate: str) -> str:
+        return plate.strip().upper()
+
+    def might_contain(self, plate: str) -> bool:
+        """Returns False only if plate is certainly not registered."""
+
+        return bool(self.candidates([self.normalize(plate)]))
+
+    def candidates(self, plates) -> list:
+        """Returns those of plates which may be registered, others are certainly not registered.
+        Answered by index alone, without database.
+
+        Args:
+            plates: normalized plate numbers
+        """
+
+        if not self.config['ENABLED']:
+            return list(plates)
+        index = self._filter
+        if index is None or not self.is_maintained():
+            self.start()
+        if index is None:
+            return list(plates)
+
+        missing = {plate for plate in plates if plate not in index}
+        self.answered += len(missing)
+        return [plate for plate in plates if plate not in missing]
+
+    def add(self, *plates: str) -> None:
+        """Adds plates registered by this process, so they are found before next refresh."""
+
+        index = self._filter
+        if index is None or not self.config['ENABLED']:
+            return  # Plates are read from database once index is built
+        for plate in plates:
+            index.add(self.normalize(plate))
+
+    def refresh(self) -> None:
+        """Adds plates of changes committed since the last change index holds, rebuilds index if they were pruned."""
+
+        try:
+            with self._lock:
+                index = self._filter
+                while True:
+                    changes, cursor = settled_changes(self._settled, settings.CARPLATE_BULK_BATCH_SIZE)
+                    for (_, plate), change in changes.items():
+                        if change['action'] == RegistrationChange.UPSERT:
+                            index.add(plate)
+                    if cursor == self._settled:
+                        return
+                    self._settled = cursor
+        except CursorExpired:
+            logger.info("Registration changes were pruned, rebuilding plate index")
+        self.build()
+
+    def is_maintained(self) -> bool:
+        worker = self._worker
+        return worker is not None and worker.is_alive()
+
+    def start(self) -> None:
+        """Starts background thread of process which builds index, unless built already, and keeps it current.
+        Lookups are answered by database until index is built."""
+
+        with self._lock:
+            if self.is_maintained():
+                return
+            self._worker = threading.Thread(target=self._maintain, name='plate-index', daemon=True)
+            self._worker.start()
+
+    def _maintain(self):
+        worker = threading.current_thread()
+        while self._worker is worker:
+            try:
+                index = self._filter
+                if index is None or index.count > index.capacity or \
+                        time.monotonic() - self._built_at > self.config['REBUILD_INTERVAL']:
+                    self.build()
+                else:
+                    time.sleep(self.config['REFRESH_INTERVAL'])
+                    if self._worker is worker and self._filter is index:
+                        self.refresh()
+            except Exception:
+                logger.exception("Maintaining plate index failed")
+                time.sleep(self.config['REFRESH_INTERVAL'])
+            finally:
+                close_old_connections()  # Thread keeps its connection for CONN_MAX_AGE like request threads
+
+    def build(self) -> None:
+        """Builds index of all registered plates, e.g. when server process starts."""
+
+        started = time.monotonic()
+        settled = log_head()
+        index = BloomFilter(max(Registration.objects.count(), 1000) * self.GROWTH, self.config['ERROR_RATE'])
+        queryset = Registration.objects.order_by().values_list('plate', flat=True)
+        for plate in queryset.iterator(chunk_size=settings.CARPLATE_STREAM_CHUNK_SIZE):
+            index.add(plate)
+
+        # Changes placed after the head, including those committed while scanning, are read by next refresh
+        with self._lock:
+            self._filter = index
+            self._settled = settled
+            self._built_at = started
+        logger.info("Built plate index of %d plates, %d bytes, in %.2f seconds", index.count, len(index.bits),
+                    time.monotonic() - started)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._filter = None
+            self._worker = None  # Running thread stops after its current step
+            self._settled = 0
+            self.answered = 0
+
+    def stats(self) -> dict:
+        index = self._filter
+        return {'answered': self.answered, 'size': index.count if index else 0, 'bytes': len(index.bits) if index else 0}
+
+
+plate_index = PlateIndex()
+
+
+@receiver(setting_changed)
+def reset_plate_index(setting, **kwargs):
+    if setting == 'CARPLATE_PLATE_INDEX':
+        plate_index.reset()
+
+
+@metrics.registry.collector
+def plate_index_metrics() -> dict:
+    stats = plate_index.stats()
+    return {
+        'carplate_plate_index_misses_total': ('counter', "Lookups of unregistered plates answered without database",
+                                              stats['answered']),
+        'carplate_plate_index_entries': ('gauge', "Plates added to index of process", stats['size']),
+        'carplate_plate_index_bytes': ('gauge', "Size of index of process", stats['bytes']),
+    }
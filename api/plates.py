@@ -0,0 +1,105 @@
+# api/plates.py
+
+import re
+from functools import lru_cache
+
+from django.core.exceptions import ValidationError
+from django.utils.deconstruct import deconstructible
+
+# Lithuanian plate classes, see README. Order matters: the first class matching whole plate wins,
+# so specific formats go before custom plates, which accept any 5-6 characters containing a digit.
+PLATE_CLASSES = (
+    ('car', "Car", r'[A-Z]{3}\d{3}'),
+    ('trailer', "Trailer", r'[A-Z]{2}\d{3}'),
+    ('motorcycle', "Motorcycle", r'\d{3}[A-Z]{2}'),
+    ('moped', "Moped", r'\d{2}[A-Z]{3}'),
+    ('quad', "Quad bike", r'[A-Z]{2}\d{2}'),
+    ('taxi', "Taxi", r'T\d{5}'),
+    ('historic_car', "Historic car", r'H\d{5}'),
+    ('historic_motorcycle', "Historic motorcycle", r'\d{4}H'),
+    ('temporary_car', "Temporary car or trailer", r'P\d{5}|\d{4}[A-Z]{2}'),
+    ('temporary_motorcycle', "Temporary motorcycle", r'P\d{4}|\d{4}[A-Z]'),
+    ('electric', "Electric car", r'E[A-Z]\d{4}'),
+    ('diplomatic', "Diplomatic", r'\d{5,6}'),
+    ('custom', "Custom", r'(?=\w*\d)\S{5,6}'),
+)
+PLATE_TYPES = tuple((name, label) for name, label, _ in PLATE_CLASSES)
+
+PLATE_PATTERN = '|'.join(f'(?P<{name}>{pattern})' for name, _, pattern in PLATE_CLASSES)
+PLATE_REGEX = re.compile(PLATE_PATTERN)
+
+
+# Characters plate readers (OCR and people) confuse with each other. Plates are folded to the first
+# character of every group, so that confused readings share n-grams with the registered plate
+CONFUSABLE_CHARACTERS = ('0ODQ', '1IL', '2Z', '5S', '6G', '8B')
+_FOLD_TABLE = str.maketrans({character: group[0] for group in CONFUSABLE_CHARACTERS for character in group[1:]})
+
+
+def fold(plate: str) -> str:
+    """Returns normalized plate with confusable characters replaced by their group representative,
+    e.g. 'AB0123', 'ABO123' and 'ABD123' all fold to 'AB0123'.
+
+    Args:
+        plate (str): plate number or its part, case insensitive
+
+    Returns:
+        str: folded plate
+    """
+
+    return plate.strip().upper().translate(_FOLD_TABLE)
+
+
+@lru_cache(maxsize=4096)
+def _classify(plate: str) -> str:
+    match = PLATE_REGEX.fullmatch(plate)
+    return match.lastgroup if match else None
+
+
+def classify(plate: str) -> str:
+    """Validates plate and returns its class in single regex pass.
+    Recent results are cached, so validating and then saving the same plate costs one match.
+
+    Args:
+        plate (str): plate number, case insensitive
+
+    Returns:
+        str: name of plate class, e.g. 'car' or 'taxi'. None if plate is not valid
+    """
+
+    return _classify(plate.strip().upper())
+
+
+def classify_many(plates) -> list:
+    """Classifies many plates at once. Plates are normalized and matched by C level map() over
+    bound method of compiled regex, which is about twice as fast as calling classify() per plate.
+
+    Args:
+        plates: iterable of plate numbers, case insensitive
+
+    Returns:
+        list: plate class names in the same order as plates, None for invalid plates
+    """
+
+    matches = map(PLATE_REGEX.fullmatch, map(str.upper, map(str.strip, plates)))
+    return [match.lastgroup if match else None for match in matches]
+
+
+@deconstructible
+class PlateValidator:
+
+    """
+    Model field validator accepting plates of any known Lithuanian plate class.
+    """
+
+    message = "Enter a valid value."
+    code = 'invalid'
+
+    def __call__(self, value):
+        if classify(str(value)) is None:
+            raise ValidationError(self.message, code=self.code, params={'value': value})
+
+    def __eq__(self, other):
+        return isinstance(other, PlateValidator)
+
+
+validate_plate = PlateValidator()
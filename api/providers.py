@@ -0,0 +1,268 @@
+# api/providers.py
+
+import asyncio
+import logging
+import mimetypes
+import os
+import shutil
+import tempfile
+import threading
+import time
+from urllib.parse import quote_plus, urlparse
+
+import requests
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+try:
+    import aiohttp
+except ImportError:  # Optional, HTTPProvider falls back to thread pool without it
+    aiohttp = None
+
+logger = logging.getLogger(__name__)  # Get an instance of a logger
+
+
+class ProviderBusy(Exception):
+    """No download slot freed up within timeout. Image may well exist, so download should be retried later."""
+
+
+class ImageProvider:
+
+    """
+    Base class for car image providers.
+
+    fetch() returns path to downloaded image placed in a fresh temporary directory,
+    which caller owns and removes once image is stored. afetch() is its coroutine version
+    used by download engine.
+
+    Args:
+        timeout: seconds to wait for free download slot and for single download
+        max_concurrency: maximum number of downloads running at once in this process
+        rate_limit: maximum number of downloads started per second in this process, 0 disables the limit.
+            Download engine applies its own per host limit instead
+    """
+
+    host = None  # Host used for per host rate limiting by download engine
+
+    def __init__(self, timeout: float = 30, max_concurrency: int = 4, rate_limit: float = 0):
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.interval = 1 / rate_limit if rate_limit else 0
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._next_start = 0
+        self._rate_lock = threading.Lock()
+
+    def fetch(self, car_model: str) -> str:
+        """Downloads image of provided car model.
+
+        Args:
+            car_model (str): car model
+
+        Returns:
+            str: Path to downloaded image. If image is not found, function returns None
+
+        Raises:
+            ProviderBusy: if no download slot freed up within timeout
+        """
+
+        if not self._slots.acquire(timeout=self.timeout):
+            raise ProviderBusy(f"No free download slot for {car_model} within {self.timeout} seconds")
+        try:
+            self._throttle()
+            return self._fetch(car_model)
+        finally:
+            self._slots.release()
+
+    def _throttle(self):
+        if not self.interval:
+            return
+        with self._rate_lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+    async def afetch(self, car_model: str) -> str:
+        """Coroutine version of fetch() used by download engine, which limits concurrency itself.
+        Runs blocking download in thread pool of the engine, providers may override it with non-blocking one."""
+
+        return await asyncio.get_event_loop().run_in_executor(None, self._fetch, car_model)
+
+    def _fetch(self, car_model: str) -> str:
+        raise NotImplementedError
+
+
+class IcrawlerProvider(ImageProvider):
+
+    """
+    Searches Google Images using icrawler. Crawl runs in its own thread, crawl which does not complete
+    within timeout is told to stop and fails with TimeoutError, so hung crawl does not keep download slot.
+
+    Args:
+        filters: Google search filters passed to GoogleImageCrawler
+    """
+
+    host = 'www.google.com'
+    DEFAULT_FILTERS = dict(
+        size='large',
+        color='orange',
+        license='commercial,modify',
+        type='photo'
+    )
+
+    def __init__(self, filters: dict = None, **options):
+        super().__init__(**options)
+        self.filters = self.DEFAULT_FILTERS if filters is None else filters
+
+    def _fetch(self, car_model):
+        from icrawler.builtin import GoogleImageCrawler
+
+        tempdir = tempfile.mkdtemp()
+        google_crawler = GoogleImageCrawler(
+            feeder_threads=1,
+            parser_threads=1,
+            downloader_threads=1,
+            storage={'root_dir': tempdir})
+        crawl = threading.Thread(target=google_crawler.crawl, name='icrawler', daemon=True, kwargs=dict(
+            keyword=car_model, filters=self.filters, max_num=1, file_idx_offset=0))
+        crawl.start()
+        crawl.join(self.timeout)
+        if crawl.is_alive():
+            # Crawler threads check signals between tasks, so they exit once current request completes
+            google_crawler.signal.set(feeder_exited=True, parser_exited=True, reach_max_num=True)
+            shutil.rmtree(tempdir, ignore_errors=True)
+            raise TimeoutError(f"Crawl of {car_model} image did not complete within {self.timeout} seconds")
+
+        temp_files = os.listdir(tempdir)
+        if temp_files:
+            return os.path.join(tempdir, temp_files.pop())
+
+        shutil.rmtree(tempdir, ignore_errors=True)
+        return None
+
+
+class HTTPProvider(ImageProvider):
+
+    """
+    Downloads images from HTTP service using pooled keep-alive session shared by all downloads in process.
+
+    Args:
+        url: URL template, {query} is replaced with URL encoded car model.
+            Service can respond with image itself or with JSON document holding image URL
+        url_field: JSON field holding image URL, used when service responds with JSON
+        headers: extra HTTP headers, e.g. API key
+    """
+
+    def __init__(self, url: str, url_field: str = 'url', headers: dict = None, **options):
+        super().__init__(**options)
+        self.url = url
+        self.url_field = url_field
+        self.host = urlparse(url).netloc
+        self.headers = headers or {}
+        self._async_session = None
+
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = requests.adapters.HTTPAdapter(pool_connections=self.max_concurrency,
+                                                pool_maxsize=self.max_concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _fetch(self, car_model):
+        response = self.session.get(self.url.format(query=quote_plus(car_model)), timeout=self.timeout)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+
+        if response.headers.get('Content-Type', '').startswith('application/json'):
+            image_url = response.json().get(self.url_field)
+            if not image_url:
+                return None
+            response = self.session.get(image_url, timeout=self.timeout)
+            response.raise_for_status()
+
+        return self.save(response.content, response.headers.get('Content-Type', ''))
+
+    async def afetch(self, car_model):
+        if aiohttp is None:
+            return await super().afetch(car_model)
+
+        if self._async_session is None:  # Created inside engine's loop and reused by all downloads
+            self._async_session = aiohttp.ClientSession(
+                headers=self.headers, timeout=aiohttp.ClientTimeout(total=self.timeout),
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency))
+
+        async with self._async_session.get(self.url.format(query=quote_plus(car_model))) as response:
+            if response.status == 404:
+                return None
+            response.raise_for_status()
+            if response.content_type != 'application/json':
+                return self.save(await response.read(), response.content_type)
+            image_url = (await response.json()).get(self.url_field)
+
+        if not image_url:
+            return None
+        async with self._async_session.get(image_url) as response:
+            response.raise_for_status()
+            return self.save(await response.read(), response.content_type)
+
+    @staticmethod
+    def save(content: bytes, content_type: str) -> str:
+        extension = mimetypes.guess_extension(content_type.split(';')[0].strip()) or '.jpg'
+        path = os.path.join(tempfile.mkdtemp(), f"image{extension}")
+        with open(path, 'wb') as file:
+            file.write(content)
+        return path
+
+
+class LocalDirectoryProvider(ImageProvider):
+
+    """
+    Takes images from local directory, for offline development, tests and benchmarks.
+    Image is looked up by car model with spaces replaced by underscores, e.g. SUPER_CAR.jpg.
+
+    Args:
+        directory: directory holding images
+        default: optional file name returned for car models without own image
+    """
+
+    def __init__(self, directory: str, default: str = None, **options):
+        super().__init__(**options)
+        self.directory = directory
+        self.default = default
+        self.images = {os.path.splitext(name)[0].upper(): name for name in sorted(os.listdir(directory))}
+
+    def _fetch(self, car_model):
+        name = self.images.get('_'.join(car_model.split()).upper(), self.default)
+        if name is None:
+            return None
+
+        path = os.path.join(tempfile.mkdtemp(), name)
+        shutil.copyfile(os.path.join(self.directory, name), path)
+        return path
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_provider() -> ImageProvider:
+    """Returns image provider configured in CARPLATE_IMAGE_PROVIDER setting. Provider is created
+    once per process, so that its connection pool and concurrency limit are shared by all tasks."""
+
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            config = settings.CARPLATE_IMAGE_PROVIDER
+            _provider = import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+        return _provider
+
+
+@receiver(setting_changed)
+def reset_provider(setting, **kwargs):
+    global _provider
+    if setting == 'CARPLATE_IMAGE_PROVIDER':
+        _provider = None
@@ -1,10 +1,14 @@
 import logging
 
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
-from .models import Registration
-from .tasks import retrieve_image_task
+from .cache import list_cache, plate_cache
+from .changes import record_changes
+from .models import Registration, RegistrationChange
+from .plate_index import plate_index
+from .tasks import queue_image_retrieval
 
 logger = logging.getLogger(__name__)  # Get an instance of a logger
 
@@ -25,4 +29,83 @@ def registration_post_save_receiver(sender, instance, **kwargs):
 
     if instance.retrieve_image:
         logger.info("Registering new task to retrieve car image for %s car plate", instance.plate)
-        retrieve_image_task.delay(plate=instance.plate)
+        queue_image_retrieval(plate=instance.plate)
+
+
+@receiver(post_save, sender=Registration)
+@receiver(post_delete, sender=Registration)
+def registration_plate_cache_receiver(sender, instance, **kwargs):
+    """This function is invoked after Registration is saved or deleted and drops it from plate cache
+
+    Args:
+        sender: model
+        instance: model instance which is being saved or deleted
+    Return:
+        None
+    """
+
+    plates = (instance.plate, instance.get_original_value('plate'))
+    plate_cache.invalidate(*plates)
+    # Receivers run inside the saving transaction, other processes could cache old row until it commits
+    transaction.on_commit(lambda: plate_cache.invalidate(*plates))
+
+
+@receiver(post_save, sender=Registration)
+def registration_plate_index_receiver(sender, instance, **kwargs):
+    """This function is invoked after Registration is saved and adds its plate to membership index of process
+
+    Args:
+        sender: model
+        instance: model instance which is being saved
+    Return:
+        None
+    """
+
+    plate_index.add(instance.plate)
+
+
+@receiver(post_save, sender=Registration)
+@receiver(post_delete, sender=Registration)
+def registration_list_cache_receiver(sender, **kwargs):
+    """This function is invoked after Registration is saved or deleted and invalidates rendered list pages
+
+    Args:
+        sender: model
+    Return:
+        None
+    """
+
+    list_cache.bump()
+
+
+@receiver(post_save, sender=Registration)
+def registration_change_receiver(sender, instance, created, **kwargs):
+    """This function is invoked after Registration is saved and records the change for downstream replicas.
+    Changed plate is recorded as tombstone of the previous plate, so consumers keyed by plate drop it
+
+    Args:
+        sender: model
+        instance: model instance which is being saved
+        created: whether registration was created
+    Return:
+        None
+    """
+
+    previous = instance.get_original_value('plate')
+    if not created and previous and previous != instance.plate:
+        record_changes(RegistrationChange.DELETE, [(instance.pk, previous)])
+    record_changes(RegistrationChange.UPSERT, [(instance.pk, instance.plate)])
+
+
+@receiver(post_delete, sender=Registration)
+def registration_delete_change_receiver(sender, instance, **kwargs):
+    """This function is invoked after Registration is deleted and records tombstone for downstream replicas
+
+    Args:
+        sender: model
+        instance: model instance which is being deleted
+    Return:
+        None
+    """
+
+    record_changes(RegistrationChange.DELETE, [(instance.pk, instance.plate)])
@@ -1,12 +1,182 @@
 # api/serializers
 
-from rest_framework import serializers
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from django.utils.encoding import filepath_to_uri
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
 
+from . import image_variants
 from .models import Registration
 
 
 class RegistrationSerializer(serializers.ModelSerializer):
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Registration
-        fields = ('id', 'created', 'plate', 'owner', 'car_model', 'image',)
+        fields = ('id', 'created', 'modified', 'plate', 'plate_type', 'owner', 'car_model', 'image', 'image_variants',)
+
+    def get_image_variants(self, instance):
+        """Returns absolute URLs of resized images, like DRF does for image field itself."""
+
+        request = self.context.get('request')
+        urls = instance.image_variants
+        if request is not None:
+            urls = {variant: {image_format: request.build_absolute_uri(url) for image_format, url in formats.items()}
+                    for variant, formats in urls.items()}
+        return urls
+
+    @staticmethod
+    def absolute_urls(data: dict, request) -> dict:
+        """Returns copy of registration serialized without request, with media URLs made absolute for request.
+        Plate cache keeps relative URLs, as absolute ones depend on host the registration was requested from."""
+
+        data = dict(data)
+        if data['image']:
+            data['image'] = request.build_absolute_uri(data['image'])
+        data['image_variants'] = {
+            variant: {image_format: request.build_absolute_uri(url) for image_format, url in formats.items()}
+            for variant, formats in (data['image_variants'] or {}).items()}
+        return data
+
+
+class RegistrationRowSerializer:
+
+    """
+    Read-only serializer producing the same output as RegistrationSerializer from .values() rows.
+    Model instances and per field serializer objects are never created and media URLs are built
+    by prefixing names, which makes large list responses several times cheaper.
+
+    Mimics serializer interface used by views, pagination and streaming: RegistrationRowSerializer(rows, many=True,
+    context=context).data. Rows have to come from queryset passed through prepare().
+    """
+
+    class Meta:
+        fields = RegistrationSerializer.Meta.fields
+
+    COLUMNS = ('id', 'created', 'modified', 'plate', 'plate_type', 'owner', 'car_model', 'image')
+
+    def __init__(self, instance=None, many=False, context=None):
+        self.instance = instance
+        self.many = many
+
+        request = (context or {}).get('request')
+        self.media_url = request.build_absolute_uri(default_storage.base_url) if request else default_storage.base_url
+        self.datetime_field = serializers.DateTimeField()
+        self.iso_format = api_settings.DATETIME_FORMAT.lower() == ISO_8601
+        self.timezone = timezone.get_current_timezone() if settings.USE_TZ else None
+
+    @classmethod
+    def prepare(cls, queryset):
+        """Returns queryset yielding rows this serializer expects."""
+
+        return queryset.values(*cls.COLUMNS)
+
+    def format_datetime(self, value):
+        if value is None or not self.iso_format or self.timezone is None or not timezone.is_aware(value):
+            return self.datetime_field.to_representation(value)
+
+        value = value.astimezone(self.timezone).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+
+    def to_representation(self, row: dict) -> dict:
+        image = row['image']
+        variants = {}
+        if image:
+            variants = {variant: {image_format: self.media_url + filepath_to_uri(name)
+                                  for image_format, name in formats.items()}
+                        for variant, formats in image_variants.served_names(image).items()}
+
+        return {
+            'id': row['id'],
+            'created': self.format_datetime(row['created']),
+            'modified': self.format_datetime(row['modified']),
+            'plate': row['plate'],
+            'plate_type': row['plate_type'],
+            'owner': row['owner'],
+            'car_model': row['car_model'],
+            'image': self.media_url + filepath_to_uri(image) if image else None,
+            'image_variants': variants,
+        }
+
+    @property
+    def data(self):
+        if self.many:
+            return [self.to_representation(row) for row in self.instance]
+        return self.to_representation(self.instance)
+
+
+class RegistrationSelectionSerializer(serializers.Serializer):
+
+    """
+    Selects registrations changed by bulk update or delete: by ids, by plates, or by filter
+    with the same fields as list endpoint. Criteria given together must all match.
+    """
+
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, allow_empty=False)
+    plates = serializers.ListField(child=serializers.CharField(max_length=6), required=False, allow_empty=False)
+    filter = serializers.DictField(child=serializers.CharField(), required=False, allow_empty=False)
+
+    FILTER_FIELDS = ('plate', 'owner', 'car_model', 'plate_type')
+
+    def validate_filter(self, value):
+        unknown = set(value) - set(self.FILTER_FIELDS)
+        if unknown:
+            raise serializers.ValidationError(f"Unsupported fields: {', '.join(sorted(unknown))}")
+        return value
+
+    def validate(self, attrs):
+        if not any(key in attrs for key in ('ids', 'plates', 'filter')):
+            raise serializers.ValidationError("Select registrations by ids, plates or filter")
+        return attrs
+
+
+class RegistrationBulkUpdateSerializer(RegistrationSelectionSerializer):
+
+    """
+    Selection of registrations and new values of their fields.
+    """
+
+    class ChangesSerializer(serializers.ModelSerializer):
+        class Meta:
+            model = Registration
+            fields = ('owner', 'car_model')
+            extra_kwargs = {'owner': {'required': False}, 'car_model': {'required': False}}
+
+        def validate(self, attrs):
+            if not attrs:
+                raise serializers.ValidationError("Nothing to update")
+            return attrs
+
+    set = ChangesSerializer()
+
+
+class PlateBatchSerializer(serializers.Serializer):
+
+    """
+    Plates resolved by single batch lookup, at most CARPLATE_BATCH_LOOKUP_MAX of them.
+    """
+
+    plates = serializers.ListField(child=serializers.CharField(), allow_empty=False)
+
+    def validate_plates(self, value):
+        if len(value) > settings.CARPLATE_BATCH_LOOKUP_MAX:
+            raise serializers.ValidationError(f"At most {settings.CARPLATE_BATCH_LOOKUP_MAX} plates per request")
+        return value
+
+
+class FuzzySearchSerializer(serializers.Serializer):
+
+    """
+    Parameters of fuzzy plate search: plate as read (or its part) and number of results.
+    """
+
+    q = serializers.CharField(min_length=3, max_length=10)
+    limit = serializers.IntegerField(min_value=1, default=10)
+
+    def validate_limit(self, value):
+        if value > settings.CARPLATE_FUZZY_SEARCH['MAX_RESULTS']:
+            raise serializers.ValidationError(f"At most {settings.CARPLATE_FUZZY_SEARCH['MAX_RESULTS']} results")
+        return value
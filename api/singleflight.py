@@ -0,0 +1,45 @@
+# api/singleflight.py
+
+import logging
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import ImageDownloadLock
+
+logger = logging.getLogger(__name__)  # Get an instance of a logger
+
+
+@contextmanager
+def single_flight(car_model: str, timeout: int = None):
+    """Makes sure only one worker downloads image of car model at a time.
+    Lock is a database row, so it is shared by all Celery workers.
+
+    Args:
+        car_model (str): normalized car model
+        timeout (int): seconds after which lock is considered abandoned by crashed worker.
+            Defaults to CARPLATE_IMAGE_DOWNLOAD_LOCK_TIMEOUT
+
+    Yields:
+        bool: True if caller acquired the lock and should download image, False if other worker is already doing it
+    """
+
+    timeout = settings.CARPLATE_IMAGE_DOWNLOAD_LOCK_TIMEOUT if timeout is None else timeout
+    expired = timezone.now() - timedelta(seconds=timeout)
+    ImageDownloadLock.objects.filter(car_model=car_model, acquired_at__lt=expired).delete()
+
+    try:
+        with transaction.atomic():
+            lock = ImageDownloadLock.objects.create(car_model=car_model)
+    except IntegrityError:
+        logger.debug("Image download for %s is already in progress", car_model)
+        yield False
+        return
+
+    try:
+        yield True
+    finally:
+        ImageDownloadLock.objects.filter(pk=lock.pk).delete()
@@ -0,0 +1,57 @@
+# api/streaming.py
+
+import csv
+import io
+import json
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+
+from .utils import chunked
+
+STREAM_CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+CSV_EXCLUDED_FIELDS = ('image_variants',)  # Nested values do not fit into CSV column
+
+
+def _ndjson_lines(queryset, serializer_class, context, chunk_size):
+    for chunk in chunked(queryset.iterator(chunk_size=chunk_size), chunk_size):
+        data = serializer_class(chunk, many=True, context=context).data
+        yield ''.join(json.dumps(row) + '\n' for row in data)
+
+
+def _csv_lines(queryset, serializer_class, context, chunk_size):
+    buffer = io.StringIO()
+    fields = [field for field in serializer_class.Meta.fields if field not in CSV_EXCLUDED_FIELDS]
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction='ignore')
+    writer.writeheader()
+
+    for chunk in chunked(queryset.iterator(chunk_size=chunk_size), chunk_size):
+        writer.writerows(serializer_class(chunk, many=True, context=context).data)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    yield buffer.getvalue()
+
+
+def stream_response(queryset, serializer_class, stream_format, context=None) -> StreamingHttpResponse:
+    """Serializes queryset in chunks and streams it to client.
+    Rows are fetched using server side cursor, so memory usage does not depend on table size.
+
+    Args:
+        queryset: queryset to stream
+        serializer_class: serializer used to convert each chunk of rows
+        stream_format (str): either 'ndjson' or 'csv'
+        context (dict): serializer context
+
+    Returns:
+        StreamingHttpResponse: response streaming serialized rows
+    """
+
+    chunk_size = settings.CARPLATE_STREAM_CHUNK_SIZE
+    lines = _csv_lines if stream_format == 'csv' else _ndjson_lines
+    return StreamingHttpResponse(lines(queryset, serializer_class, context, chunk_size),
+                                 content_type=STREAM_CONTENT_TYPES[stream_format])
@@ -1,13 +1,22 @@
-import glob
 import logging
 import os
-import tempfile
+import shutil
+import threading
 
 from celery import shared_task
-from django.core.files import File
-from icrawler.builtin import GoogleImageCrawler
+from celery.exceptions import SoftTimeLimitExceeded
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
 
-from .models import Registration
+from . import image_cache, image_variants, metrics
+from .cache import list_cache, plate_cache
+from .changes import prune_changes, record_changes
+from .download_engine import get_engine
+from .models import Registration, RegistrationChange
+from .providers import ProviderBusy, get_provider
+from .singleflight import single_flight
+from .utils import chunked
 
 logger = logging.getLogger(__name__)  # Get an instance of a logger
 
@@ -24,19 +33,19 @@ def get_image_from_cache(car_model: str) -> str:
     """
 
     logger.debug("Checking image cache for %s", car_model)
-    files = glob.glob(f"images/{car_model.replace(' ', '_')}.*")
-    if files:
-        image = files.pop()
+    with metrics.phase(metrics.image_phases, phase='cache_lookup'):
+        image = image_cache.lookup(car_model)
+    if image:
         logger.debug("Image found in cache: %s", image)
     else:
-        image = None
         logger.debug("%s image not present in cache", car_model)
 
     return image
 
 
 def download_image(car_model: str) -> str:
-    """Downloads image of provided car model from internet.
+    """Downloads image of provided car model using configured image provider, through shared
+    download engine of worker process when CARPLATE_DOWNLOAD_ENGINE is enabled.
     If image is found it will return path to the image, otherwise None is returned
 
     Args:
@@ -44,38 +53,155 @@ def download_image(car_model: str) -> str:
 
     Returns:
         str: Path to downloaded image. If image is not found, function returns None
+
+    Raises:
+        ProviderBusy: if provider had no free download slot, image is not known to be missing
     """
     logger.debug("Downloading %s image from internet", car_model)
-    # tempdir = tempfile.TemporaryDirectory().name
-    tempdir = tempfile.mkdtemp()
-
-    google_crawler = GoogleImageCrawler(
-        feeder_threads=1,
-        parser_threads=1,
-        downloader_threads=1,
-        storage={'root_dir': tempdir})
-
-    filters = dict(
-        size='large',
-        color='orange',
-        license='commercial,modify',
-        type='photo'
-    )
-    google_crawler.crawl(keyword=car_model, filters=filters, max_num=1, file_idx_offset=0)
-    temp_files = os.listdir(tempdir)
-
-    if temp_files:
-        image_name = temp_files.pop()
-        image_path = os.path.join(tempdir, image_name)
-        logger.debug("Image successfully downloaded from internet (%s)", image_path)
+    with metrics.phase(metrics.image_phases, phase='download'):
+        if settings.CARPLATE_DOWNLOAD_ENGINE['ENABLED']:
+            image_path = get_engine().download(get_provider(), car_model)
+        else:
+            image_path = get_provider().fetch(car_model)
 
+    if image_path:
+        logger.debug("Image successfully downloaded from internet (%s)", image_path)
     else:
         logger.debug("Image not found")
-        image_path = None
 
     return image_path
 
 
+def prepare_variants(image: str) -> str:
+    """Creates resized variants of image which are still missing. Image is kept even if it can not be processed,
+    clients fall back to the original.
+
+    Args:
+        image (str): image name relative to media root
+
+    Returns:
+        str: The same image name
+    """
+
+    try:
+        with metrics.phase(metrics.image_phases, phase='variants'):
+            image_variants.generate(image)
+    except (OSError, ValueError):
+        logger.warning("Failed to create resized variants of %s", image, exc_info=True)
+    return image
+
+
+def assign_image(car_model: str, image: str) -> int:
+    """Assigns image to every registration of car model which is waiting for it, using single UPDATE
+
+    Args:
+        car_model (str): normalized car model
+        image (str): image name relative to media root
+
+    Returns:
+        int: number of updated registrations
+    """
+
+    pending = Registration.objects.filter(car_model=car_model, retrieve_image=True)
+    with metrics.phase(metrics.image_phases, phase='assign'), transaction.atomic():
+        rows = list(pending.select_for_update().values_list('pk', 'plate'))
+        updated = pending.update(image=image, retrieve_image=False, modified=timezone.now())
+        record_changes(RegistrationChange.UPSERT, rows)
+    plate_cache.invalidate(*(plate for _, plate in rows))  # Queryset update does not send post_save signal
+    if updated:
+        list_cache.bump()
+    return updated
+
+
+def resolve_image(car_model: str, attempt: int = 0) -> str:
+    """Finds image for provided car model, either in local cache or on the internet.
+    Downloaded image is stored in the image cache so later lookups hit it.
+
+    Only one worker downloads image of the same car model at a time. Other workers get None and
+    leave their registrations pending: once download completes, the image is assigned to every
+    registration of the car model which is still waiting for it. If download fails (including task
+    time limit), retrieval of the car model is scheduled again, so pending registrations are not stranded,
+    see retry_later().
+
+    Args:
+        car_model (str): car model
+        attempt (int): number of retries of the car model so far
+
+    Returns:
+        str: Name of the image relative to media root. Defaults to 404 image if image was not found.
+            None if image is being downloaded by other worker
+
+    Raises:
+        ProviderBusy: if provider had no free download slot, registrations are left pending and retried later
+    """
+
+    # Check if image is already present in cache
+    cached = get_image_from_cache(car_model=car_model)
+    if cached:
+        logger.info("Using image from local cache")
+        return prepare_variants(cached)
+
+    with single_flight(image_cache.normalize_car_model(car_model)) as leader:
+        if not leader:
+            logger.info("%s image is already being downloaded by other task", car_model)
+            return None
+
+        # Other task could have completed download between cache check and acquiring the lock
+        cached = get_image_from_cache(car_model=car_model)
+        if cached:
+            return prepare_variants(cached)
+
+        try:
+            image = prepare_variants(_download_to_cache(car_model))
+        except Exception:
+            # Tasks folded into this download returned without image, nobody else retries their registrations
+            retry_later(car_model, attempt)
+            raise
+
+    # Lock is released and image is cached, so tasks folded into this download can be updated
+    updated = assign_image(car_model, image)
+    logger.info("Downloaded %s image assigned to %d waiting registrations", car_model, updated)
+    return image
+
+
+def _download_to_cache(car_model: str) -> str:
+    # Try downloading image from internet
+    logger.info("Searching internet for %s car model", car_model)
+    image = download_image(car_model=car_model)
+
+    if image:  # If image was successfully downloaded
+        try:
+            with metrics.phase(metrics.image_phases, phase='store'):
+                return image_cache.store(car_model=car_model, source_path=image)
+        finally:
+            shutil.rmtree(os.path.dirname(image), ignore_errors=True)
+
+    # If failed to download image, apply default one
+    logger.info("Image not found, defaulting to 404")
+    return image_cache.DEFAULT_IMAGE
+
+
+def retry_later(car_model: str, attempt: int = 0) -> None:
+    """Schedules image retrieval of registrations of car model which are still pending, with exponential backoff
+    configured by CARPLATE_IMAGE_RETRY. Once retries are exhausted, default image is assigned to them instead.
+
+    Args:
+        car_model (str): car model
+        attempt (int): number of retries of the car model so far
+    """
+
+    config = settings.CARPLATE_IMAGE_RETRY
+    if attempt >= config['MAX_ATTEMPTS']:
+        updated = assign_image(car_model, image_cache.DEFAULT_IMAGE)
+        logger.warning("Giving up %s image retrieval after %d retries, default image assigned to %d registrations",
+                       car_model, attempt, updated)
+        return
+
+    countdown = min(config['DELAY'] * 2 ** attempt, config['MAX_DELAY'])
+    logger.info("Retrying %s image retrieval in %s seconds", car_model, countdown)
+    retrieve_images_task.apply_async(kwargs={'car_model': car_model, 'attempt': attempt + 1}, countdown=countdown)
+
+
 @shared_task
 def retrieve_image_task(plate: str) -> None:
     """Retrieves photography of car and updates image field
@@ -88,26 +214,115 @@ def retrieve_image_task(plate: str) -> None:
 
     logger.info("Task has been called for %s", plate)
     instance = Registration.objects.get(plate=plate)
-    instance.retrieve_image = False  # Mark instance as no update required
+    try:
+        image = resolve_image(car_model=instance.car_model)
+    except ProviderBusy:
+        logger.warning("Image provider is busy, retrieval was scheduled again with backoff", exc_info=True)
+        return
+    if image is None:
+        logger.info("Image will be assigned once download by other task completes")
+        return
 
-    # Check if image is already present in cache
-    cached = get_image_from_cache(car_model=instance.car_model)
-    if cached:
-        logger.info("Saving image from local cache")
-        instance.image = cached
-        instance.save()
-    # Otherwise try downloading image from internet
-    else:
-        logger.info("Searching internet for %s car model", instance.car_model)
-        image = download_image(car_model=instance.car_model)
-
-        if image:  # If image was successfully downloaded
-            with open(image, "rb") as image:
-                django_file = File(image)
-                instance.image.save(name=f"{instance.car_model}.jpg", content=django_file, save=True)
-        else:  # If failed to download image, apply default one
-            logger.info("Image not found, defaulting to 404")
-            instance.image = "images/404.jpg"
-            instance.save()
-
-    logger.info("Updating image completed")
+    # Only registrations still waiting for image of the car model are updated: registration which changed
+    # car model meanwhile waits for image of the new one. Downloaded image was assigned by resolve_image()
+    updated = assign_image(instance.car_model, image)
+    logger.info("Updating image completed for %d registrations", updated)
+
+
+@shared_task
+def retrieve_images_task(car_model: str = None, plates: list = None, attempt: int = 0) -> None:
+    """Retrieves photography once per car model and assigns it to every registration waiting for it.
+    Each car model costs single image lookup and single UPDATE, regardless of number of registrations.
+
+    Args:
+        car_model: Car model to retrieve image for
+        plates: Plate numbers to retrieve images for, grouped by their car models
+        attempt: Number of retries of the car model so far, see retry_later()
+    Return:
+        None
+    """
+
+    pending = Registration.objects.filter(retrieve_image=True)
+    if plates is not None:
+        pending = pending.filter(plate__in=plates)
+    if car_model is not None:
+        pending = pending.filter(car_model=car_model)
+
+    car_models = list(pending.order_by().values_list('car_model', flat=True).distinct())
+    logger.info("Task has been called for %d car models", len(car_models))
+
+    for index, car_model in enumerate(car_models):
+        try:
+            image = resolve_image(car_model=car_model, attempt=attempt)
+        except SoftTimeLimitExceeded:
+            for remaining in car_models[index + 1:]:  # Failed car model itself was already scheduled again
+                retry_later(remaining, attempt)
+            raise
+        except Exception:  # pylint: disable=broad-except
+            # Failure of one car model does not keep the others waiting, failed downloads are scheduled again
+            logger.exception("Retrieving %s image failed", car_model)
+            continue
+        if image is None:
+            logger.info("%s image will be assigned once download by other task completes", car_model)
+            continue
+
+        updated = assign_image(car_model, image)
+        logger.info("Updating %s image completed for %d registrations", car_model, updated)
+
+
+@shared_task
+def prune_changes_task() -> None:
+    """Deletes registration changes older than CARPLATE_CHANGE_FEED['RETENTION'] days, scheduled by Celery beat
+
+    Return:
+        None
+    """
+
+    prune_changes()
+
+
+class ImageRetrievalBatch:
+
+    """
+    Plates saved within one transaction, sent as batch messages once the transaction commits.
+    """
+
+    def __init__(self):
+        self.plates = []
+
+    def __call__(self):
+        if len(self.plates) == 1:  # Registration saved on its own, e.g. through API
+            retrieve_image_task.delay(plate=self.plates[0])
+            return
+        for chunk in chunked(self.plates, settings.CARPLATE_IMAGE_BATCH_SIZE):
+            logger.info("Registering new task to retrieve car images for %d car plates", len(chunk))
+            retrieve_images_task.delay(plates=chunk)
+
+
+_batches = threading.local()
+
+
+def queue_image_retrieval(plate: str) -> None:
+    """Schedules image retrieval for registration.
+    Inside transaction, plates are buffered and sent as batch messages once transaction commits,
+    so that saving many registrations in one transaction does not cost one message per row.
+    Nothing is sent if transaction is rolled back.
+
+    Args:
+        plate: Plate number to retrieve image for
+    Return:
+        None
+    """
+
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        retrieve_image_task.delay(plate=plate)
+        return
+
+    # Batch belongs to current transaction only while its commit hook is still registered,
+    # hooks are dropped when transaction (or savepoint) holding them is rolled back
+    batch = getattr(_batches, 'current', None)
+    if batch is None or not any(hook is batch for _, hook in connection.run_on_commit):
+        batch = _batches.current = ImageRetrievalBatch()
+        transaction.on_commit(batch)
+    batch.plates.append(plate)
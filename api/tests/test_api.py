@@ -4,6 +4,7 @@ from django.test import Client, TestCase
 from rest_framework import status
 from rest_framework.reverse import reverse
 
+from ..cache import plate_cache
 from ..models import Registration
 from ..serializers import RegistrationSerializer
 
@@ -19,6 +20,7 @@ class ModelTests(TestCase):
         self.INVALID_TEXT = "OnlyOneWord"
 
         self.client = Client()
+        plate_cache.clear()
 
         self.reg_first = Registration.objects.create(plate=self.PLATE, owner=self.OWNER, car_model=self.CAR)
         self.reg_second = Registration.objects.create(plate=self.PLATE[::-1], owner=self.OWNER, car_model=self.CAR)
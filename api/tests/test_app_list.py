@@ -0,0 +1,65 @@
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Registration
+
+
+@override_settings(CARPLATE_APP_PAGE_SIZE=2)
+class AppListTests(TestCase):
+    """ Test module for HTML registration list """
+
+    def setUp(self):
+        """Prepare test environment."""
+        caches['default'].clear()
+        Registration.objects.create(plate='ABC121', owner='john doe', car_model='super car')
+        Registration.objects.create(plate='ABC122', owner='jane roe', car_model='other car')
+        Registration.objects.create(plate='XYZ123', owner='john doe', car_model='other car')
+
+    def test_pages_are_fetched_without_count(self):
+        """Test to verify page is rendered with single query fetching only displayed columns."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('app-list'))
+
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('COUNT', queries[0]['sql'])
+        self.assertNotIn('retrieve_image', queries[0]['sql'])
+        self.assertContains(response, 'ABC122')
+        self.assertNotContains(response, 'XYZ123')
+        self.assertContains(response, 'page=2')
+
+        response = self.client.get(reverse('app-list'), {'page': 2})
+        self.assertContains(response, 'XYZ123')
+        self.assertContains(response, 'page=1')
+        self.assertNotContains(response, 'page=3')
+
+    def test_filters(self):
+        """Test to verify list is filtered by plate prefix, owner and car model, keeping filters in page links."""
+        response = self.client.get(reverse('app-list'), {'plate': 'abc'})
+        self.assertContains(response, 'ABC121')
+        self.assertNotContains(response, 'XYZ123')
+
+        response = self.client.get(reverse('app-list'), {'owner': 'john', 'car_model': 'other'})
+        self.assertContains(response, 'XYZ123')
+        self.assertNotContains(response, 'ABC12')
+
+        response = self.client.get(reverse('app-list'), {'page': 'x'})  # Invalid filters show first page
+        self.assertContains(response, 'ABC121')
+
+    def test_rendered_page_is_cached_until_registrations_change(self):
+        """Test to verify cached page is served without queries and invalidated by saves and image updates."""
+        self.client.get(reverse('app-list'), {'plate': 'xyz'})
+        with self.assertNumQueries(0):
+            self.client.get(reverse('app-list'), {'plate': 'xyz'})
+
+        Registration.objects.create(plate='XYZ124', owner='john doe', car_model='super car')
+        self.assertContains(self.client.get(reverse('app-list'), {'plate': 'xyz'}), 'XYZ124')
+
+    @override_settings(CARPLATE_LIST_CACHE={'BACKEND': 'default', 'TIMEOUT': 0})
+    def test_cache_can_be_disabled(self):
+        """Test to verify every request renders page when cache is disabled."""
+        self.client.get(reverse('app-list'))
+        with self.assertNumQueries(1):
+            self.client.get(reverse('app-list'))
@@ -0,0 +1,94 @@
+import asyncio
+import json
+from unittest import mock
+
+from django.test import TransactionTestCase
+from django.urls import reverse
+
+from CarplateAPI.asgi import application
+
+from ..cache import plate_cache
+from ..models import Registration
+
+
+async def call(path: str, method: str = 'GET', query: bytes = b'', headers: list = ()) -> tuple:
+    """Sends single request to ASGI application, returns status, headers and body of response."""
+
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query, 'root_path': '',
+             'http_version': '1.1', 'scheme': 'http', 'server': ('testserver', 80),
+             'headers': [(b'host', b'testserver')] + list(headers)}
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    await application(scope, receive, send)
+    response_headers = {name.decode().lower(): value.decode() for name, value in messages[0]['headers']}
+    return messages[0]['status'], response_headers, b''.join(message.get('body', b'') for message in messages[1:])
+
+
+class AsyncReadHandlerTests(TransactionTestCase):
+    """ Test module for async read endpoints served by CarplateAPI.asgi """
+
+    def setUp(self):
+        """Prepare test environment."""
+        plate_cache.clear()
+        self.registration = Registration.objects.create(plate='ABC123', owner='john doe', car_model='super car')
+        Registration.objects.create(plate='XYZ123', owner='jane roe', car_model='other car')
+
+    def test_responses_match_wsgi(self):
+        """Test to verify async endpoints respond with the same body and headers as WSGI views and middleware."""
+        urls = (
+            reverse('registration-detail-find', kwargs={'plate': 'ABC123'}),
+            reverse('registration-detail-find', kwargs={'plate': 'ABC123'}),  # Served from plate cache
+            reverse('registration-detail', kwargs={'pk': self.registration.pk}),
+            reverse('registration-list'),
+        )
+        for url in urls:
+            expected = self.client.get(url, HTTP_ACCEPT='application/json')
+            status, headers, body = asyncio.run(call(url, headers=[(b'accept', b'application/json')]))
+            self.assertEqual(status, 200)
+            self.assertEqual(json.loads(body), expected.json())
+            self.assertEqual(headers, {name.lower(): value for name, value in expected.items()})
+
+    def test_request_signals(self):
+        """Test to verify natively served requests send request_started and request_finished like WSGI ones."""
+        url = reverse('registration-detail-find', kwargs={'plate': 'ABC123'})
+        with mock.patch('api.asgi.signals.request_started.send') as started, \
+                mock.patch('django.http.response.signals.request_finished.send') as finished:
+            for _ in range(2):  # Database lookup and cached one
+                asyncio.run(call(url))
+        self.assertEqual((started.call_count, finished.call_count), (2, 2))
+
+    def test_not_modified(self):
+        """Test to verify cached plate lookups answer conditional requests."""
+        url = reverse('registration-detail-find', kwargs={'plate': 'ABC123'})
+        _, headers, _ = asyncio.run(call(url))
+        status, _, body = asyncio.run(call(url, headers=[(b'if-none-match', headers['etag'].encode())]))
+        self.assertEqual(status, 304)
+        self.assertEqual(body, b'')
+
+    def test_concurrent_lookups(self):
+        """Test to verify one process serves many concurrent plate lookups."""
+        url = reverse('registration-detail-find', kwargs={'plate': 'XYZ123'})
+
+        async def lookups():
+            return await asyncio.gather(*(call(url) for _ in range(1000)))
+
+        responses = asyncio.run(lookups())
+        self.assertEqual({status for status, _, _ in responses}, {200})
+        self.assertEqual(json.loads(responses[-1][2])['owner'], 'Jane Roe')
+
+    def test_other_requests_are_passed_to_wsgi(self):
+        """Test to verify writes and browsable API are handled by WSGI application."""
+        url = reverse('registration-detail', kwargs={'pk': self.registration.pk})
+        status, _, _ = asyncio.run(call(url, method='DELETE'))
+        self.assertEqual(status, 204)
+        self.assertFalse(Registration.objects.filter(pk=self.registration.pk).exists())
+
+        status, headers, _ = asyncio.run(call(reverse('registration-list'), headers=[(b'accept', b'text/html')]))
+        self.assertEqual(status, 200)
+        self.assertTrue(headers['content-type'].startswith('text/html'))
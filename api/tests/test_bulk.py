@@ -0,0 +1,133 @@
+import json
+from unittest import mock
+
+from django.test import Client, TestCase
+from rest_framework import status
+from rest_framework.reverse import reverse
+
+from ..models import Registration
+
+
+class BulkImportTests(TestCase):
+    """ Test module for bulk registration import """
+
+    def setUp(self):
+        """Prepare test environment."""
+        self.client = Client()
+        self.existing = Registration.objects.create(plate='ABC123', owner='john doe', car_model='super car')
+
+        self.rows = [
+            {'plate': 'abc234', 'owner': 'john doe', 'car_model': 'test model'},
+            {'plate': 'ABC345', 'owner': 'jane doe', 'car_model': 'test model'},
+            {'plate': 'XYZ456', 'owner': 'jane doe', 'car_model': 'other model'},
+        ]
+
+    def post(self, data, content_type):
+        return self.client.post(reverse('registration-bulk'), data=data, content_type=content_type)
+
+    def test_import_json_array(self):
+        """Test to verify rows are created and normalized the same way as save() does."""
+        with mock.patch('api.bulk.retrieve_images_task.delay') as delay:
+            response = self.post(json.dumps(self.rows), 'application/json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data, {'created': 3, 'errors': []})
+        registration = Registration.objects.get(plate='ABC234')
+        self.assertEqual(registration.owner, 'John Doe')
+        self.assertEqual(registration.car_model, 'TEST MODEL')
+        self.assertTrue(registration.retrieve_image)
+        self.assertEqual(delay.call_count, 2)  # One task per distinct car model
+        delay.assert_any_call(car_model='TEST MODEL')
+
+    def test_import_ndjson(self):
+        """Test to verify newline delimited JSON can be imported and malformed lines are reported."""
+        body = '\n'.join([json.dumps(self.rows[0]), '{not json', json.dumps(self.rows[1])])
+        with mock.patch('api.bulk.retrieve_images_task.delay'):
+            response = self.post(body, 'application/x-ndjson')
+
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual([error['row'] for error in response.data['errors']], [2])
+
+    def test_import_csv(self):
+        """Test to verify CSV with header row can be imported."""
+        body = 'plate,owner,car_model\nabc234,john doe,test model\nabc345,jane doe,test model\n'
+        with mock.patch('api.bulk.retrieve_images_task.delay'):
+            response = self.post(body, 'text/csv')
+
+        self.assertEqual(response.data, {'created': 2, 'errors': []})
+        self.assertTrue(Registration.objects.filter(plate='ABC345').exists())
+
+    def test_import_reports_invalid_rows(self):
+        """Test to verify invalid, duplicate and already existing rows are reported without failing others."""
+        rows = self.rows + [
+            {'plate': 'abc123', 'owner': 'john doe', 'car_model': 'test model'},
+            {'plate': 'abc234', 'owner': 'john doe', 'car_model': 'test model'},
+            {'plate': 'OnlyOneWord', 'owner': 'JohnDoe', 'car_model': 'test model'},
+            'not an object',
+        ]
+        with mock.patch('api.bulk.retrieve_images_task.delay'):
+            response = self.post(json.dumps(rows), 'application/json')
+
+        self.assertEqual(response.data['created'], 3)
+        errors = {error['row']: error['errors'] for error in response.data['errors']}
+        self.assertEqual(sorted(errors), [4, 5, 6, 7])
+        self.assertIn('plate', errors[4])
+        self.assertEqual(sorted(errors[6]), ['owner', 'plate'])
+
+    def test_import_requires_list(self):
+        """Test to verify single object is rejected."""
+        response = self.post(json.dumps(self.rows[0]), 'application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BulkUpdateDeleteTests(TestCase):
+    """ Test module for bulk registration update and delete """
+
+    def setUp(self):
+        """Prepare test environment."""
+        self.client = Client()
+        self.first = Registration.objects.create(plate='ABC123', owner='john doe', car_model='super car')
+        self.second = Registration.objects.create(plate='ABC234', owner='jane doe', car_model='other car')
+        Registration.objects.create(plate='XYZ345', owner='jane doe', car_model='super car')
+        Registration.objects.update(retrieve_image=False)
+
+    def send(self, method, data):
+        return getattr(self.client, method)(reverse('registration-bulk'), data=json.dumps(data),
+                                            content_type='application/json')
+
+    def test_update_by_filter(self):
+        """Test to verify filter values are normalized and matching rows updated with one statement."""
+        with self.assertNumQueries(5):  # Savepoint, locking select, update, change log insert, release
+            response = self.send('patch', {'filter': {'owner': 'JANE DOE'}, 'set': {'owner': 'jane roe'}})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'updated': 2, 'images_requeued': 0})
+        self.assertEqual(Registration.objects.filter(owner='Jane Roe').count(), 2)
+        self.assertFalse(Registration.objects.filter(retrieve_image=True).exists())
+
+    def test_update_requeues_changed_car_models_only(self):
+        """Test to verify image is retrieved again only for rows whose car model changed."""
+        with mock.patch('api.bulk.retrieve_images_task.delay') as delay, \
+                mock.patch('api.bulk.transaction.on_commit', side_effect=lambda callback: callback()):
+            response = self.send('patch', {'ids': [self.first.pk, self.second.pk], 'set': {'car_model': 'super car'}})
+
+        self.assertEqual(response.data, {'updated': 2, 'images_requeued': 1})
+        self.assertEqual(list(Registration.objects.filter(retrieve_image=True).values_list('plate', flat=True)),
+                         ['ABC234'])
+        delay.assert_called_once_with(car_model='SUPER CAR')
+
+    def test_delete_by_plates(self):
+        """Test to verify selected registrations are deleted and counted."""
+        response = self.send('delete', {'plates': ['abc123', 'XYZ345', 'NOT123']})
+
+        self.assertEqual(response.data, {'deleted': 2})
+        self.assertEqual(list(Registration.objects.values_list('plate', flat=True)), ['ABC234'])
+
+    def test_selection_is_required(self):
+        """Test to verify requests without selection or changes are rejected."""
+        self.assertEqual(self.send('delete', {}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.send('patch', {'ids': [self.first.pk], 'set': {}}).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.send('patch', {'filter': {'image': 'x'}, 'set': {'owner': 'x y'}}).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Registration.objects.count(), 3)
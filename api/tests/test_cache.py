@@ -0,0 +1,131 @@
+import json
+
+from django.test import Client, TestCase, override_settings
+from rest_framework import status
+from rest_framework.reverse import reverse
+
+from ..cache import PlateCache, plate_cache
+from ..models import Registration
+
+
+class PlateCacheTests(TestCase):
+    """ Test module for plate lookup cache """
+
+    def setUp(self):
+        """Prepare test environment."""
+        self.client = Client()
+        self.registration = Registration.objects.create(plate='abc123', owner='john doe', car_model='super car')
+        plate_cache.clear()
+
+    def get(self, plate):
+        return self.client.get(reverse('registration-detail-find', kwargs={'plate': plate}))
+
+    def test_lru_eviction(self):
+        """Test to verify least recently used entry is evicted once cache is full."""
+        cache = PlateCache(max_size=2, ttl=60)
+        cache.set('AAA111', 1)
+        cache.set('BBB222', 2)
+        cache.get('aaa111')
+        cache.set('CCC333', 3)
+        self.assertEqual(cache.get('AAA111'), 1)
+        self.assertIsNone(cache.get('BBB222'))
+        self.assertEqual(cache.stats(), {'hits': 2, 'misses': 1, 'size': 2})
+
+    def test_ttl_expiry(self):
+        """Test to verify expired entries are not returned."""
+        cache = PlateCache(max_size=2, ttl=-1)
+        cache.set('AAA111', 1)
+        self.assertIsNone(cache.get('AAA111'))
+
+    def test_lookup_is_served_from_cache(self):
+        """Test to verify repeated lookup does not query database."""
+        first = self.get('abc123')
+        with self.assertNumQueries(0):
+            second = self.get('ABC123')
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(plate_cache.hits, 1)
+        self.assertEqual(plate_cache.misses, 1)
+
+    @override_settings(ALLOWED_HOSTS=['testserver', 'api.example.com'])
+    def test_cached_media_urls_follow_request_host(self):
+        """Test to verify cached registration is served with media URLs of the host it is requested from."""
+        Registration.objects.filter(pk=self.registration.pk).update(image='images/car.jpg')
+        self.assertEqual(self.get('ABC123').data['image'], 'http://testserver/media/images/car.jpg')
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('registration-detail-find', kwargs={'plate': 'ABC123'}),
+                                       HTTP_HOST='api.example.com')
+        self.assertEqual(response.data['image'], 'http://api.example.com/media/images/car.jpg')
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+                               'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                          'LOCATION': 'plate-cache-tests'}})
+    def test_shared_backend_invalidation(self):
+        """Test to verify invalidation by other process is seen, as in-process entries are not kept with backend."""
+        cache, other = PlateCache(backend='shared'), PlateCache(backend='shared')
+        cache.set('AAA111', 1)
+        self.assertEqual(cache.get('AAA111'), 1)
+        other.invalidate('AAA111')
+        self.assertIsNone(cache.get('AAA111'))
+        self.assertEqual(cache.stats()['size'], 0)
+
+    def test_cache_is_invalidated_on_save(self):
+        """Test to verify updated registration is not served from stale cache."""
+        self.get('ABC123')
+        self.registration.owner = 'jane doe'
+        self.registration.save()
+        self.assertEqual(self.get('ABC123').data['owner'], 'Jane Doe')
+
+    def test_cache_is_invalidated_on_delete(self):
+        """Test to verify deleted registration is dropped from cache."""
+        self.get('ABC123')
+        self.registration.delete()
+        self.assertIsNone(plate_cache.get('ABC123'))
+
+    def test_update_through_plate_endpoint(self):
+        """Test to verify update through plate endpoint invalidates cached entry."""
+        self.get('ABC123')
+        response = self.client.patch(reverse('registration-detail-find', kwargs={'plate': 'ABC123'}),
+                                     data={'owner': 'jane doe'}, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.get('ABC123').data['owner'], 'Jane Doe')
+
+
+class BatchLookupTests(TestCase):
+    """ Test module for batch plate lookup """
+
+    def setUp(self):
+        """Prepare test environment."""
+        self.client = Client()
+        Registration.objects.create(plate='abc123', owner='john doe', car_model='super car')
+        Registration.objects.create(plate='xyz789', owner='jane doe', car_model='other car')
+        plate_cache.clear()
+
+    def test_lookup_many_plates(self):
+        """Test to verify plates are resolved with one query and unknown plates map to null."""
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('registration-batch-lookup'),
+                                       data={'plate': ['abc123', 'XYZ789', 'NOT123']})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(response.data), ['ABC123', 'XYZ789', 'NOT123'])
+        self.assertEqual(response.data['XYZ789']['owner'], 'Jane Doe')
+        self.assertIsNone(response.data['NOT123'])
+        self.assertEqual(response.data['ABC123'], self.client.get(
+            reverse('registration-detail-find', kwargs={'plate': 'ABC123'})).data)
+
+    def test_lookup_uses_plate_cache(self):
+        """Test to verify cached plates are not queried again."""
+        self.client.post(reverse('registration-batch-lookup'), data=json.dumps(['ABC123', 'XYZ789']),
+                         content_type='application/json')
+        with self.assertNumQueries(0):
+            response = self.client.post(reverse('registration-batch-lookup'),
+                                        data=json.dumps({'plates': ['abc123', 'xyz789']}),
+                                        content_type='application/json')
+        self.assertEqual(response.data['ABC123']['plate'], 'ABC123')
+
+    @override_settings(CARPLATE_BATCH_LOOKUP_MAX=2)
+    def test_lookup_limit(self):
+        """Test to verify batches above configured limit and empty batches are rejected."""
+        url = reverse('registration-batch-lookup')
+        self.assertEqual(self.client.get(url, data={'plate': ['AAA111', 'BBB222', 'CCC333']}).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,106 @@
+import json
+from datetime import timedelta
+from unittest import mock
+
+from django.db import transaction
+from django.test import Client, TestCase, override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.reverse import reverse
+
+from ..changes import prune_changes
+from ..models import Registration, RegistrationChange
+
+FEED = {'PAGE_SIZE': 100, 'RETENTION': 30}
+
+
+@override_settings(CARPLATE_CHANGE_FEED=FEED)
+class ChangeFeedTests(TestCase):
+    """ Test module for registration change feed """
+
+    def setUp(self):
+        """Prepare test environment."""
+        self.client = Client()
+        self.registration = Registration.objects.create(plate='abc123', owner='john doe', car_model='super car')
+
+    def changes(self, since=0, **params):
+        return self.client.get(reverse('registration-changes'), data=dict(params, since=since))
+
+    def test_upserts_and_tombstones(self):
+        """Test to verify saves are served with current data, deletions as tombstones, each registration once."""
+        self.registration.owner = 'jane doe'
+        self.registration.save()
+        other = Registration.objects.create(plate='xyz789', owner='jane doe', car_model='other car')
+        other.delete()
+
+        response = self.changes()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        changes = response.data['changes']
+        self.assertEqual([(change['action'], change['plate']) for change in changes],
+                         [('upsert', 'ABC123'), ('delete', 'XYZ789')])
+        self.assertEqual(changes[0]['data']['owner'], 'Jane Doe')
+        self.assertEqual(changes[0]['data'], self.client.get(
+            reverse('registration-detail', kwargs={'pk': self.registration.pk})).json())
+        self.assertIsNone(changes[1]['data'])
+        self.assertEqual(response.data['cursor'], RegistrationChange.objects.latest('position').position)
+
+        self.assertEqual(self.changes(response.data['cursor']).data['changes'], [])
+
+    def test_plate_change_records_tombstone(self):
+        """Test to verify changed plate is served as tombstone of the previous plate followed by the new one."""
+        cursor = self.changes().data['cursor']
+        self.registration.plate = 'xyz789'
+        self.registration.save()
+
+        changes = self.changes(cursor).data['changes']
+        self.assertEqual([(change['action'], change['plate'], change['registration_id']) for change in changes],
+                         [('delete', 'ABC123', self.registration.pk), ('upsert', 'XYZ789', self.registration.pk)])
+        self.assertIsNone(changes[0]['data'])
+        self.assertEqual(changes[1]['data']['plate'], 'XYZ789')
+
+    def test_change_is_recorded_in_saving_transaction(self):
+        """Test to verify save is rolled back when its change can not be recorded."""
+        self.registration.owner = 'jane doe'
+        with mock.patch('api.receivers.record_changes', side_effect=RuntimeError), self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                self.registration.save()
+        self.assertEqual(Registration.objects.get(pk=self.registration.pk).owner, 'John Doe')
+
+    def test_bulk_operations_are_recorded(self):
+        """Test to verify bulk import, update and delete record their changes."""
+        cursor = self.changes().data['cursor']
+        with mock.patch('api.bulk.retrieve_images_task.delay'):
+            self.client.post(reverse('registration-bulk'), content_type='application/json',
+                             data=json.dumps([{'plate': 'xyz789', 'owner': 'jane doe', 'car_model': 'other car'}]))
+            self.client.patch(reverse('registration-bulk'), content_type='application/json',
+                              data=json.dumps({'plates': ['ABC123'], 'set': {'owner': 'jane roe'}}))
+        self.client.delete(reverse('registration-bulk'), content_type='application/json',
+                           data=json.dumps({'plates': ['XYZ789']}))
+
+        changes = self.changes(cursor).data['changes']
+        self.assertEqual([(change['action'], change['plate']) for change in changes],
+                         [('upsert', 'ABC123'), ('delete', 'XYZ789')])
+        self.assertEqual(changes[0]['data']['owner'], 'Jane Roe')
+
+    def test_late_commit_is_not_skipped(self):
+        """Test to verify change committed after changes of higher ids follows cursor already served."""
+        cursor = self.changes().data['cursor']
+        late_id = RegistrationChange.objects.order_by('id').first().id - 1  # Id taken before the served change
+        RegistrationChange.objects.create(id=late_id, registration_id=self.registration.pk, plate='ABC123',
+                                          action=RegistrationChange.UPSERT)
+
+        response = self.changes(cursor)
+        self.assertEqual([change['id'] for change in response.data['changes']], [late_id])
+        self.assertGreater(response.data['cursor'], cursor)
+
+    def test_pruned_cursor(self):
+        """Test to verify old changes are pruned and cursors pointing before them are rejected."""
+        cursor = self.changes().data['cursor']
+        for owner in ('jane doe', 'jane roe'):
+            self.registration.owner = owner
+            self.registration.save()
+        RegistrationChange.objects.update(recorded_at=timezone.now() - timedelta(days=31))
+
+        self.assertEqual(prune_changes(), 2)  # The latest change is kept
+        self.assertEqual(self.changes(cursor).status_code, status.HTTP_410_GONE)
+        self.assertEqual(self.changes(cursor, limit='x').status_code, status.HTTP_400_BAD_REQUEST)
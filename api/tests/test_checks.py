@@ -0,0 +1,35 @@
+from django.test import SimpleTestCase, override_settings
+
+from ..checks import DEFAULT_SECRET_KEY, check_production_settings
+
+
+class ProductionChecksTests(SimpleTestCase):
+    """ Test module for deployment checks of production serving profile """
+
+    @override_settings(DEBUG=True, SECRET_KEY=DEFAULT_SECRET_KEY, ALLOWED_HOSTS=[])
+    def test_development_settings(self):
+        """Test to verify development settings are reported as errors."""
+        ids = {message.id for message in check_production_settings(None)}
+        self.assertTrue({'api.E001', 'api.E002', 'api.E003'} <= ids)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_process_local_cache(self):
+        """Test to verify caches which have to be shared between processes are not local memory ones."""
+        ids = [message.id for message in check_production_settings(None)]
+        self.assertEqual(ids.count('api.E004'), 2)  # List cache and metrics
+
+    def test_process_local_plate_cache(self):
+        """Test to verify plate cache is not kept in every process."""
+        with override_settings(CARPLATE_PLATE_CACHE={'MAX_SIZE': 100, 'TTL': 300, 'BACKEND': None}):
+            self.assertIn('api.E005', [message.id for message in check_production_settings(None)])
+        with override_settings(CARPLATE_PLATE_CACHE={'MAX_SIZE': 0, 'TTL': 300, 'BACKEND': None}):
+            self.assertNotIn('api.E005', [message.id for message in check_production_settings(None)])
+
+    @override_settings(DEBUG=False, SECRET_KEY='secret', ALLOWED_HOSTS=['api'], STATIC_ROOT='/static',
+                       CACHES={'default': {'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+                                           'LOCATION': 'memcached:11211'}},
+                       CARPLATE_PLATE_CACHE={'MAX_SIZE': 10000, 'TTL': 300, 'BACKEND': 'default'})
+    def test_production_settings(self):
+        """Test to verify production settings pass, apart from connections not reused by test database."""
+        ids = {message.id for message in check_production_settings(None)}
+        self.assertFalse({'api.E001', 'api.E002', 'api.E003', 'api.E004', 'api.E005', 'api.W002'} & ids)
@@ -0,0 +1,76 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..cache import plate_cache
+from ..models import Registration
+from ..tasks import assign_image
+
+
+class ConditionalGetTests(TestCase):
+    """ Test module for ETag / Last-Modified handling of registration endpoints """
+
+    def setUp(self):
+        """Prepare test environment."""
+        plate_cache.clear()
+        self.registration = Registration.objects.create(plate='ABC123', owner='john doe', car_model='super car')
+        Registration.objects.create(plate='XYZ123', owner='jane roe', car_model='other car')
+        self.urls = (
+            reverse('registration-list'),
+            reverse('registration-detail', kwargs={'pk': self.registration.pk}),
+            reverse('registration-detail-find', kwargs={'plate': 'ABC123'}),
+        )
+
+    def test_unchanged_resource_is_not_serialized(self):
+        """Test to verify matching ETag is answered with 304 using single query, or none if plate is cached."""
+        for url, queries in zip(self.urls, (1, 1, 0)):
+            etag = self.client.get(url)['ETag']
+            with self.assertNumQueries(queries):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response['ETag'], etag)
+
+    def test_if_modified_since(self):
+        """Test to verify Last-Modified can be used instead of ETag."""
+        last_modified = self.client.get(self.urls[1])['Last-Modified']
+        response = self.client.get(self.urls[1], HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_changes_invalidate_etag(self):
+        """Test to verify saves, queryset updates, inserts and deletes change ETag."""
+        etags = [self.client.get(url)['ETag'] for url in self.urls]
+
+        self.registration.owner = 'john smith'
+        self.registration.save()
+        for url, etag in zip(self.urls, etags):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        etags = [self.client.get(url)['ETag'] for url in self.urls]
+        assign_image('SUPER CAR', 'images/404.jpg')
+        for url, etag in zip(self.urls, etags):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        etag = self.client.get(self.urls[0])['ETag']
+        Registration.objects.get(plate='XYZ123').delete()
+        self.assertEqual(self.client.get(self.urls[0], HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_list_validators_do_not_scan_list(self):
+        """Test to verify list ETag is read from change log head and latest modified timestamp, not by counting rows."""
+        etag = self.client.get(self.urls[0], {'owner': 'Jane Roe'})['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.urls[0], {'owner': 'Jane Roe'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertNotIn('COUNT', queries[0]['sql'].upper())
+        self.assertNotIn('JANE ROE', queries[0]['sql'].upper())
+
+    def test_etag_depends_on_filters_and_format(self):
+        """Test to verify differently filtered or rendered lists have different ETags."""
+        etag = self.client.get(self.urls[0])['ETag']
+        self.assertNotEqual(self.client.get(self.urls[0], {'owner': 'Jane Roe'})['ETag'], etag)
+        self.assertNotEqual(self.client.get(self.urls[0], HTTP_ACCEPT='text/html')['ETag'], etag)
+
+    def test_missing_registration(self):
+        """Test to verify missing registration is still answered with 404."""
+        response = self.client.get(reverse('registration-detail', kwargs={'pk': 999}), HTTP_IF_NONE_MATCH='"x"')
+        self.assertEqual(response.status_code, 404)
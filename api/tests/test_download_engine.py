@@ -0,0 +1,105 @@
+import asyncio
+import threading
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from ..download_engine import DownloadEngine, HostRateLimiter, get_engine
+from ..providers import ImageProvider
+from ..tasks import download_image
+
+
+class FakeProvider(ImageProvider):
+    """Provider which counts downloads in flight and fails first failures attempts."""
+
+    host = 'images.local'
+
+    def __init__(self, delay=0.05, failures=0):
+        super().__init__()
+        self.delay = delay
+        self.failures = failures
+        self.calls = 0
+        self.running = 0
+        self.peak = 0
+
+    async def afetch(self, car_model):
+        self.calls += 1
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.calls <= self.failures:
+                raise ConnectionError(car_model)
+            return f"/tmp/{car_model}.jpg"
+        finally:
+            self.running -= 1
+
+
+class DownloadEngineTests(SimpleTestCase):
+    """ Test module for asynchronous download engine """
+
+    def setUp(self):
+        """Prepare test environment."""
+        self.engine = DownloadEngine(max_concurrency=5, retries=2, backoff=0.01, timeout=5)
+
+    def tearDown(self):
+        self.engine.stop()
+
+    def test_downloads_run_concurrently(self):
+        """Test to verify many downloads are in flight at once, but never more than max_concurrency."""
+        provider = FakeProvider(delay=0.1)
+
+        start = time.monotonic()
+        futures = [self.engine.submit(provider, f"car {number}") for number in range(20)]
+        results = [future.result(timeout=5) for future in futures]
+
+        self.assertEqual(results[0], '/tmp/car 0.jpg')
+        self.assertEqual(provider.peak, 5)
+        self.assertLess(time.monotonic() - start, 1.5)  # 4 waves of 0.1s instead of 20 sequential downloads
+
+    def test_retries_with_backoff(self):
+        """Test to verify failed download is retried and error is raised once retries run out."""
+        self.assertEqual(self.engine.download(FakeProvider(delay=0, failures=2), 'car'), '/tmp/car.jpg')
+
+        with self.assertRaises(ConnectionError):
+            self.engine.download(FakeProvider(delay=0, failures=3), 'car')
+
+    def test_blocking_provider_runs_in_thread_pool(self):
+        """Test to verify providers without own afetch() are run in engine's thread pool."""
+        provider = ImageProvider()
+        threads = []
+        provider._fetch = lambda car_model: threads.append(threading.current_thread().name) or car_model
+
+        self.assertEqual(self.engine.download(provider, 'car'), 'car')
+        self.assertTrue(threads[0].startswith('download'))
+
+    def test_host_rate_limit(self):
+        """Test to verify requests to the same host are spaced out."""
+        limiter = HostRateLimiter(rate=20)
+
+        async def wait_all():
+            start = time.monotonic()
+            for _ in range(3):
+                await limiter.wait('images.local')
+            await limiter.wait('other.local')  # Other hosts are not delayed
+            return time.monotonic() - start
+
+        elapsed = asyncio.new_event_loop().run_until_complete(wait_all())
+        self.assertGreaterEqual(elapsed, 0.09)
+        self.assertLess(elapsed, 0.5)
+
+    def test_download_image_uses_engine_when_enabled(self):
+        """Test to verify download_image() goes through the engine only when it is enabled in settings."""
+        config = {'ENABLED': True, 'OPTIONS': {'max_concurrency': 2}}
+        provider = FakeProvider(delay=0)
+        with override_settings(CARPLATE_DOWNLOAD_ENGINE=config), \
+                mock.patch('api.tasks.get_provider', return_value=provider):
+            self.assertEqual(get_engine().max_concurrency, 2)
+            self.assertEqual(download_image('car'), '/tmp/car.jpg')
+        self.assertEqual(provider.calls, 1)
+
+        provider.fetch = mock.Mock(return_value=None)
+        with mock.patch('api.tasks.get_provider', return_value=provider):
+            self.assertIsNone(download_image('car'))
+        provider.fetch.assert_called_once_with('car')
@@ -0,0 +1,73 @@
+from django.test import Client, TestCase, override_settings
+from rest_framework import status
+from rest_framework.reverse import reverse
+
+from ..fuzzy import similarity
+from ..models import Registration
+from ..plates import fold
+
+SEARCH = {'BACKEND': 'database', 'CANDIDATES': 100, 'MAX_RESULTS': 10, 'MIN_SCORE': 0.5,
+          'REFRESH_INTERVAL': 0, 'REBUILD_INTERVAL': 3600}
+
+
+@override_settings(CARPLATE_FUZZY_SEARCH=SEARCH,
+                   CARPLATE_CHANGE_FEED={'PAGE_SIZE': 100, 'RETENTION': 30})
+class FuzzySearchTests(TestCase):
+    """ Test module for fuzzy plate search """
+
+    def setUp(self):
+        """Prepare test environment."""
+        self.client = Client()
+        for plate in ('AB0123', 'ABO128', 'XYZ789', 'EB1234', 'T12345'):
+            Registration.objects.create(plate=plate, owner='john doe', car_model='super car')
+
+    def search(self, query, **params):
+        return self.client.get(reverse('registration-fuzzy-search'), data=dict(params, q=query))
+
+    def plates(self, query, **params):
+        response = self.search(query, **params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [(result['plate'], result['score']) for result in response.data['results']]
+
+    def test_similarity(self):
+        """Test to verify confused characters and partial queries score higher than other misreadings."""
+        self.assertEqual(fold('abo12b'), 'A80128')
+        self.assertEqual(similarity('AB0123', 'AB0123'), 1)
+        self.assertGreater(similarity('ABO123', 'AB0123'), similarity('ABX123', 'AB0123'))
+        self.assertGreater(similarity('B012', 'AB0123'), 0.7)
+        self.assertLess(similarity('XYZ789', 'AB0123'), 0.5)
+
+    def test_misread_plate(self):
+        """Test to verify misread plate finds registered one first, for both index backends."""
+        for backend in ('database', 'memory'):
+            with self.subTest(backend=backend), override_settings(CARPLATE_FUZZY_SEARCH=dict(SEARCH, BACKEND=backend)):
+                results = self.plates('ABO1Z3')
+                self.assertEqual(results[0][0], 'AB0123')
+                self.assertEqual([plate for plate, _ in results], ['AB0123', 'ABO128'])
+                self.assertEqual(self.plates('8I234')[0][0], 'EB1234')  # Partial plate
+
+    def test_response_shape(self):
+        """Test to verify results carry the same fields as detail endpoint and their score."""
+        registration = self.search('AB0123').data['results'][0]
+        expected = self.client.get(reverse('registration-detail-find', kwargs={'plate': 'AB0123'})).json()
+        self.assertEqual(registration.pop('score'), 1)
+        self.assertEqual(registration, expected)
+
+    def test_memory_index_follows_changes(self):
+        """Test to verify memory index picks up created, renamed and deleted registrations."""
+        with override_settings(CARPLATE_FUZZY_SEARCH=dict(SEARCH, BACKEND='memory')):
+            self.assertEqual(self.plates('XYZ789')[0], ('XYZ789', 1))
+            Registration.objects.create(plate='QWE456', owner='jane doe', car_model='other car')
+            registration = Registration.objects.get(plate='XYZ789')
+            registration.plate = 'XYZ788'
+            registration.save()
+            Registration.objects.get(plate='T12345').delete()
+
+            self.assertEqual(self.plates('QWE456')[0], ('QWE456', 1))
+            self.assertEqual(self.plates('XYZ789')[0][0], 'XYZ788')
+            self.assertNotIn('T12345', [plate for plate, _ in self.plates('T12345')])
+
+    def test_invalid_query(self):
+        """Test to verify too short queries and limits above configured maximum are rejected."""
+        self.assertEqual(self.search('AB').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.search('AB0123', limit=11).status_code, status.HTTP_400_BAD_REQUEST)
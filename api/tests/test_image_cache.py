@@ -0,0 +1,92 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from importlib import import_module
+
+from django.apps import apps
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .. import image_cache
+from ..models import CachedImage, Registration
+
+
+class ImageCacheTests(TestCase):
+    """ Test module for content addressed image cache """
+
+    def setUp(self):
+        """Prepare test environment."""
+        self.media_root = tempfile.mkdtemp()
+        self.settings = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings.enable()
+        self.source = os.path.join(self.media_root, 'download.jpg')
+        with open(self.source, 'wb') as file:
+            file.write(b'image content')
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media_root)
+
+    def test_existing_images_are_indexed(self):
+        """Test to verify images cached by file name are imported into index by migration, except placeholder."""
+        os.mkdir(os.path.join(self.media_root, 'images'))
+        for file_name in ('super_car.jpg', '404.jpg'):
+            shutil.copy(self.source, os.path.join(self.media_root, 'images', file_name))
+
+        import_module('api.migrations.0004_cachedimage').index_existing_images(apps, None)
+        self.assertEqual(image_cache.lookup('super car'), 'images/super_car.jpg')
+        self.assertIsNone(image_cache.lookup('404'))
+
+    def test_store_and_lookup(self):
+        """Test to verify stored image is found using normalized car model without touching file system."""
+        name = image_cache.store('super car', self.source)
+        self.assertTrue(os.path.isfile(os.path.join(self.media_root, name)))
+        os.remove(os.path.join(self.media_root, name))
+        self.assertEqual(image_cache.lookup(' Super  Car '), name)
+        self.assertIsNone(image_cache.lookup('other car'))
+
+    def test_same_content_is_stored_once(self):
+        """Test to verify identical images downloaded for different car models share one file."""
+        first = image_cache.store('super car', self.source)
+        second = image_cache.store('other car', self.source)
+        self.assertEqual(first, second)
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'images')), [os.path.basename(first)])
+
+    def test_eviction_removes_least_recently_used(self):
+        """Test to verify eviction drops oldest entries and deletes files nobody refers to."""
+        old = image_cache.store('old car', self.source)
+        CachedImage.objects.filter(car_model='OLD CAR').update(last_used=timezone.now() - timedelta(days=1))
+        with open(self.source, 'wb') as file:
+            file.write(b'other content')
+        new = image_cache.store('new car', self.source)
+
+        self.assertEqual(image_cache.evict(max_bytes=len(b'other content')), 1)
+        self.assertIsNone(image_cache.lookup('old car'))
+        self.assertEqual(image_cache.lookup('new car'), new)
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, old)))
+
+    def test_eviction_counts_shared_files_once(self):
+        """Test to verify file shared by several car models is counted and freed once."""
+        shared = image_cache.store('super car', self.source)
+        image_cache.store('other car', self.source)
+        CachedImage.objects.update(last_used=timezone.now() - timedelta(days=1))
+        with open(self.source, 'wb') as file:
+            file.write(b'other content')
+        new = image_cache.store('new car', self.source)
+
+        self.assertEqual(image_cache.evict(max_bytes=2 * len(b'image content')), 0)
+        self.assertEqual(image_cache.evict(max_bytes=len(b'other content')), 2)
+        self.assertEqual(list(CachedImage.objects.values_list('image', flat=True)), [new])
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, shared)))
+
+    def test_eviction_keeps_files_used_by_registrations(self):
+        """Test to verify evicted image is kept on disk while registration still shows it."""
+        name = image_cache.store('super car', self.source)
+        registration = Registration.objects.create(plate='ABC123', owner='john doe', car_model='super car')
+        registration.image = name
+        registration.save()
+
+        image_cache.evict(max_bytes=0)
+        self.assertIsNone(image_cache.lookup('super car'))
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, name)))
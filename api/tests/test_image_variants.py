@@ -0,0 +1,93 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from .. import image_cache, image_variants
+from ..models import Registration
+from ..tasks import retrieve_image_task
+
+
+class ImageVariantTests(TestCase):
+    """ Test module for resized image variants """
+
+    def setUp(self):
+        """Prepare test environment."""
+        self.media_root = tempfile.mkdtemp()
+        self.settings = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings.enable()
+        self.source = os.path.join(self.media_root, 'download.png')
+        Image.new('RGBA', (1600, 1200), (200, 40, 40, 255)).save(self.source)
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media_root)
+
+    def test_variants_are_resized_and_compressed(self):
+        """Test to verify every variant is created in every format, keeping aspect ratio."""
+        image = image_cache.store('super car', self.source)
+        names = image_variants.generate(image)
+
+        stem = os.path.splitext(os.path.basename(image))[0]
+        self.assertEqual(names['thumbnail']['webp'], f"images/variants/{stem}.thumbnail.webp")
+        with Image.open(os.path.join(self.media_root, names['thumbnail']['jpeg'])) as thumbnail:
+            self.assertEqual((thumbnail.format, thumbnail.size), ('JPEG', (160, 120)))
+        with Image.open(os.path.join(self.media_root, names['medium']['webp'])) as medium:
+            self.assertEqual((medium.format, medium.size), ('WEBP', (640, 480)))
+        self.assertLess(os.path.getsize(os.path.join(self.media_root, names['thumbnail']['jpeg'])), 10 * 1024)
+
+    def test_existing_variants_are_not_recreated(self):
+        """Test to verify image is processed only once."""
+        image = image_cache.store('super car', self.source)
+        image_variants.generate(image)
+
+        with mock.patch('api.image_variants.Image.open') as open_image:
+            image_variants.generate(image)
+        open_image.assert_not_called()
+
+    def test_task_creates_variants_and_api_exposes_them(self):
+        """Test to verify image retrieval task creates variants and serializer returns their URLs."""
+        Registration.objects.create(plate='ABC123', owner='john doe', car_model='super car')
+        with mock.patch('api.tasks.download_image', return_value=self.source), \
+                mock.patch('api.tasks.shutil.rmtree'):
+            retrieve_image_task(plate='ABC123')
+
+        registration = Registration.objects.get(plate='ABC123')
+        names = image_variants.variant_names(registration.image.name)
+        self.assertTrue(os.path.isfile(os.path.join(self.media_root, names['medium']['webp'])))
+
+        response = self.client.get(reverse('registration-detail-find', kwargs={'plate': 'ABC123'}))
+        self.assertEqual(response.data['image_variants']['thumbnail']['webp'],
+                         f"http://testserver/media/{names['thumbnail']['webp']}")
+
+    def test_missing_variants_fall_back_to_original(self):
+        """Test to verify variants are advertised only once created, until then original image is served."""
+        image = image_cache.store('super car', self.source)
+        Registration.objects.create(plate='ABC123', owner='john doe', car_model='super car')
+        Registration.objects.filter(plate='ABC123').update(image=image, retrieve_image=False)
+        url = reverse('registration-detail-find', kwargs={'plate': 'ABC123'})
+
+        variants = self.client.get(url).data['image_variants']
+        self.assertEqual(variants['thumbnail']['webp'], f"http://testserver/media/{image}")
+        row = self.client.get(reverse('registration-list')).data[0]
+        self.assertEqual(row['image_variants']['thumbnail']['jpeg'], f"http://testserver/media/{image}")
+
+        output = StringIO()
+        call_command('generate_image_variants', stdout=output)
+        self.assertIn("Variants of 1 images are in place, 0 images failed", output.getvalue())
+        names = image_variants.variant_names(image)
+        self.assertTrue(os.path.isfile(os.path.join(self.media_root, names['medium']['jpeg'])))
+        self.assertEqual(image_variants.variant_urls(image)['thumbnail']['webp'], f"/media/{names['thumbnail']['webp']}")
+
+    def test_evicted_image_variants_are_deleted(self):
+        """Test to verify variants are removed together with evicted image."""
+        image = image_cache.store('super car', self.source)
+        names = image_variants.generate(image)
+        image_cache.evict(max_bytes=0)
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, names['thumbnail']['jpeg'])))
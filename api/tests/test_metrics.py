@@ -0,0 +1,142 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import metrics
+from ..cache import plate_cache
+from ..models import CachedImage, Registration
+from ..tasks import get_image_from_cache, retrieve_image_task
+
+
+def metrics_with(**options):
+    return override_settings(CARPLATE_METRICS=dict(settings.CARPLATE_METRICS, **options))
+
+
+class MetricTests(TestCase):
+    """ Test module for metric types and Prometheus rendering """
+
+    def test_histogram(self):
+        """Test to verify histogram renders cumulative buckets, sum and count."""
+        histogram = metrics.Histogram('test_seconds', "Test", ('name',), buckets=(1, 5))
+        for value in (0.5, 1, 3, 10):
+            histogram.observe(value, name='a')
+        lines = list(metrics._histogram_lines('test_seconds', {'name': 'a'}, [1, 5],
+                                              histogram.snapshot()['samples'][0][1]))
+        self.assertEqual(lines, [
+            'test_seconds_bucket{name="a",le="1"} 2',
+            'test_seconds_bucket{name="a",le="5"} 3',
+            'test_seconds_bucket{name="a",le="+Inf"} 4',
+            'test_seconds_sum{name="a"} 14.5',
+            'test_seconds_count{name="a"} 4',
+        ])
+
+    def test_label_escaping(self):
+        """Test to verify label values are escaped."""
+        self.assertEqual(metrics._labels({'name': 'a"b\\c'}), '{name="a\\"b\\\\c"}')
+
+    def test_phase_is_measured_only_when_enabled(self):
+        """Test to verify phase timings are skipped unless request or task is sampled."""
+        histogram = metrics.Histogram('test_phase_seconds', "Test", ('phase',))
+        with metrics.phase(histogram, phase='download'):
+            pass
+        self.assertEqual(histogram.snapshot()['samples'], [])
+        with metrics.measure_phases(), metrics.phase(histogram, phase='download'):
+            pass
+        self.assertEqual(histogram.snapshot()['samples'][0][1][-2], 0)  # Not in +Inf bucket
+        self.assertEqual(sum(histogram.snapshot()['samples'][0][1][:-1]), 1)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+                               'metrics': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                           'LOCATION': 'metrics-tests'}})
+    @metrics_with(BACKEND='metrics')
+    def test_processes_publish_to_own_slots(self):
+        """Test to verify processes publishing at once keep their snapshots and expired slots are claimed again."""
+        registries = [metrics.Registry() for _ in range(3)]
+        for number, registry in enumerate(registries):
+            with mock.patch.object(metrics.Registry, 'process', f'host:{number}'):
+                registry.publish(force=True)
+        self.assertEqual([registry._slot for registry in registries], [0, 1, 2])
+
+        registries[1].backend.delete(metrics.Registry.KEY_PREFIX + '1')  # Process 1 stopped and its slot expired
+        with mock.patch.object(metrics.Registry, 'process', 'host:3'):
+            processes = metrics.Registry().collect()
+        self.assertEqual(sorted(processes), ['host:0', 'host:2', 'host:3'])
+
+
+class MetricsEndpointTests(TestCase):
+    """ Test module for metrics middleware, Celery hooks and /metrics endpoint """
+
+    def setUp(self):
+        """Prepare test environment."""
+        plate_cache.clear()
+        # Image task finds cached image, its variants are created in temporary media root
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        os.mkdir(os.path.join(media_root, 'images'))
+        shutil.copy(os.path.join(settings.MEDIA_ROOT, 'images', '404.jpg'), os.path.join(media_root, 'images'))
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        CachedImage.objects.create(car_model='404', image='images/404.jpg', content_hash='0' * 64)
+        self.registration = Registration.objects.create(plate='ABC123', owner='john doe', car_model='404')
+        self.url = reverse('registration-detail', kwargs={'pk': self.registration.pk})
+
+    @staticmethod
+    def value(metric, **labels):
+        for label_values, value in metric.snapshot()['samples']:
+            if dict(zip(metric.labelnames, label_values)) == labels:
+                return value
+        return None
+
+    def test_requests_are_measured(self):
+        """Test to verify requests are counted and timed together with their database queries."""
+        labels = {'endpoint': 'registration-detail', 'method': 'GET'}
+        requests = self.value(metrics.http_requests, status='200', **labels) or 0
+        latency = self.value(metrics.http_latency, **labels)
+        observed = sum(latency[:-1]) if latency else 0
+
+        self.client.get(self.url)
+
+        self.assertEqual(self.value(metrics.http_requests, status='200', **labels), requests + 1)
+        self.assertEqual(sum(self.value(metrics.http_latency, **labels)[:-1]), observed + 1)
+        self.assertIsNotNone(self.value(metrics.db_queries, endpoint='registration-detail'))
+
+    def test_unsampled_requests_are_only_counted(self):
+        """Test to verify requests outside of sample are counted, but not timed."""
+        labels = {'endpoint': 'registration-detail', 'method': 'GET'}
+        latency = list(self.value(metrics.http_latency, **labels) or [])
+
+        with metrics_with(SAMPLE_RATE=0):
+            self.client.get(self.url)
+
+        self.assertEqual(list(self.value(metrics.http_latency, **labels) or []), latency)
+
+    def test_metrics_endpoint(self):
+        """Test to verify metrics of requests, tasks and caches are exposed in Prometheus format."""
+        self.client.get(self.url)
+        get_image_from_cache('404')
+        retrieve_image_task.apply(args=('ABC123',))
+
+        response = self.client.get(reverse('metrics'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        content = response.content.decode()
+        self.assertIn('# TYPE carplate_http_request_duration_seconds histogram', content)
+        self.assertIn('carplate_http_requests_total{endpoint="registration-detail",method="GET",status="200"', content)
+        self.assertIn('carplate_celery_tasks_total{task="api.tasks.retrieve_image_task",state="SUCCESS"', content)
+        self.assertIn('carplate_image_retrieval_phase_duration_seconds_count{phase="cache_lookup"', content)
+        self.assertIn('carplate_plate_cache_hits_total{process=', content)
+
+    @metrics_with(ENABLED=False)
+    def test_disabled(self):
+        """Test to verify disabled metrics are neither collected nor exposed."""
+        with mock.patch.object(metrics.http_requests, 'inc') as inc:
+            self.client.get(self.url)
+        inc.assert_not_called()
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 404)
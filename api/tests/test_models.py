@@ -1,7 +1,12 @@
+import shutil
+import tempfile
+
+from django.db import connection
 from django.db.utils import IntegrityError
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 
-from ..models import Registration
+from ..models import CachedImage, Registration
 from ..tasks import get_image_from_cache, retrieve_image_task
 
 
@@ -58,17 +63,72 @@ class ModelTests(TestCase):
         with self.assertRaises(IntegrityError):
             Registration.objects.create(plate=self.PLATE, owner=self.OWNER, car_model=self.CAR)
 
+    def test_update_does_not_query_original(self):
+        """Test to verify updating loaded instance costs single UPDATE statement and its change log entry."""
+        registration = Registration.objects.get(pk=self.reg_first.pk)
+        registration.owner = 'jane doe'
+        with self.assertNumQueries(2):
+            registration.save()
+        self.assertEqual(Registration.objects.get(pk=self.reg_first.pk).owner, 'Jane Doe')
+
+    def test_noop_save_does_not_query(self):
+        """Test to verify saving unchanged loaded instance with resolved image issues no query."""
+        Registration.objects.filter(pk=self.reg_first.pk).update(retrieve_image=False)
+        registration = Registration.objects.get(pk=self.reg_first.pk)
+        with self.assertNumQueries(0):
+            registration.save()
+
+    def test_update_writes_only_changed_fields(self):
+        """Test to verify car model change marks image for retrieval and only changed columns are written."""
+        registration = Registration.objects.get(pk=self.reg_first.pk)
+        registration.retrieve_image = False
+        registration.save()
+        self.assertEqual(registration.get_changed_fields(), [])
+
+        registration.car_model = 'other car'
+        with CaptureQueriesContext(connection) as queries:
+            registration.save()
+        update = queries.captured_queries[0]['sql']
+        self.assertIn('"car_model"', update)
+        self.assertIn('"retrieve_image"', update)
+        self.assertNotIn('"owner"', update)
+        self.assertTrue(Registration.objects.get(pk=self.reg_first.pk).retrieve_image)
+
+    def test_unchanged_instance_is_not_written(self):
+        """Test to verify saving instance without changes does not touch database."""
+        registration = Registration.objects.get(pk=self.reg_first.pk)
+        registration.car_model = self.CAR  # Same value once normalized
+        with self.assertNumQueries(0):
+            registration.save()
+
+    def test_plate_lookups_are_case_insensitive(self):
+        """Test to verify plate lookups match regardless of case used in query."""
+        self.assertEqual(Registration.objects.get(plate__iexact=self.PLATE).pk, self.reg_first.pk)
+        self.assertEqual(Registration.objects.filter(plate__contains='bc1').count(), 2)
+        self.assertEqual(Registration.objects.filter(plate__istartswith='abc').count(), 1)
+        self.assertEqual(Registration.objects.filter(plate__in=[self.PLATE]).count(), 1)
+
+    def test_plate_lookups_do_not_use_upper(self):
+        """Test to verify plate lookups compare stored value directly, so that plain index can be used."""
+        query = str(Registration.objects.filter(plate__icontains=self.PLATE).query)
+        self.assertNotIn('UPPER', query)
+        self.assertIn(self.PLATE.upper(), query)
+
     def test_image_caching(self):
         """Test to verify image can be retrieved from cache if it exists."""
 
+        CachedImage.objects.create(car_model='OTHER CAR', image='images/other_car.jpg', content_hash='0' * 64)
         non_cached_image = get_image_from_cache(car_model=self.CAR)
-        cached_image = get_image_from_cache(car_model='404')
+        cached_image = get_image_from_cache(car_model='other car')
         self.assertEqual(non_cached_image, None)
-        self.assertEqual(cached_image, 'images/404.jpg')
+        self.assertEqual(cached_image, 'images/other_car.jpg')
 
     def test_image_download(self):
         """Test to verify image can be downloaded from internet."""
-        retrieve_image_task(plate=self.PLATE)
+        media_root = tempfile.mkdtemp()  # Downloaded image and its variants are not left in repository
+        self.addCleanup(shutil.rmtree, media_root)
+        with override_settings(MEDIA_ROOT=media_root):
+            retrieve_image_task(plate=self.PLATE)
         registration = Registration.objects.get(plate=self.PLATE)
-        self.assertEqual(registration.image.path, f"/code/images/{registration.car_model.replace(' ', '_')}.jpg")
+        self.assertEqual(registration.image.name, get_image_from_cache(car_model=registration.car_model))
 
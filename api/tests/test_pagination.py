@@ -0,0 +1,65 @@
+import csv
+import io
+import json
+
+from django.db import connection
+from django.test import Client, TestCase
+from rest_framework import status
+from rest_framework.reverse import reverse
+
+from ..models import Registration
+from ..serializers import RegistrationSerializer
+
+
+class PaginationTests(TestCase):
+    """ Test module for registration list pagination and streaming """
+
+    def setUp(self):
+        """Prepare test environment."""
+        self.client = Client()
+        for plate in ('ABC121', 'ABC122', 'ABC123', 'ABC124', 'ABC125'):
+            Registration.objects.create(plate=plate, owner='john doe', car_model='super car')
+
+    def test_list_is_not_paginated_by_default(self):
+        """Test to verify plain list is returned when pagination is not requested."""
+        response = self.client.get(reverse('registration-list'))
+        self.assertEqual(len(response.data), 5)
+
+    def test_cursor_pagination(self):
+        """Test to verify pages follow (created, id) ordering and cover all rows exactly once."""
+        plates = []
+        url = reverse('registration-list') + '?page_size=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            plates += [row['plate'] for row in response.data['results']]
+            url = response.data['next']
+
+        expected = list(Registration.objects.order_by('created', 'id').values_list('plate', flat=True))
+        self.assertEqual(plates, expected)
+
+    def test_pagination_ordering_is_indexed(self):
+        """Test to verify (created, id) pages are served by composite index."""
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, Registration._meta.db_table)
+        self.assertIn(['created', 'id'], [constraint['columns'] for constraint in constraints.values()
+                                          if constraint['index']])
+
+    def test_stream_ndjson(self):
+        """Test to verify NDJSON stream contains the same rows as serializer."""
+        response = self.client.get(reverse('registration-list'), {'stream': 'ndjson'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        serializer = RegistrationSerializer(Registration.objects.all(), many=True)
+        self.assertEqual(rows, json.loads(json.dumps(serializer.data)))
+
+    def test_stream_csv_respects_filters(self):
+        """Test to verify CSV stream contains header and only filtered rows."""
+        response = self.client.get(reverse('registration-list'), {'stream': 'csv', 'search': '123'})
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([row['plate'] for row in rows], ['ABC123'])
+
+    def test_stream_invalid_format(self):
+        """Test to verify unsupported stream format is rejected."""
+        response = self.client.get(reverse('registration-list'), {'stream': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,109 @@
+import threading
+from unittest import mock
+
+from django.test import Client, TestCase, override_settings
+from rest_framework import status
+from rest_framework.reverse import reverse
+
+from ..cache import plate_cache
+from ..changes import log_head
+from ..models import Registration, RegistrationChange
+from ..plate_index import BloomFilter, plate_index
+
+INDEX = {'ENABLED': True, 'ERROR_RATE': 0.01, 'REFRESH_INTERVAL': 3600, 'REBUILD_INTERVAL': 3600}
+
+
+@override_settings(CARPLATE_PLATE_INDEX=INDEX, CARPLATE_CHANGE_FEED={'PAGE_SIZE': 100, 'RETENTION': 30})
+class PlateIndexTests(TestCase):
+    """ Test module for plate membership index """
+
+    def setUp(self):
+        """Prepare test environment."""
+        self.client = Client()
+        plate_cache.clear()
+        Registration.objects.create(plate='abc123', owner='john doe', car_model='super car')
+        plate_index.build()
+        patcher = mock.patch.object(plate_index, 'start')  # Index is refreshed explicitly
+        self.start = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, plate):
+        return self.client.get(reverse('registration-detail-find', kwargs={'plate': plate}))
+
+    @staticmethod
+    def register_elsewhere(plate):
+        """Registers plate the way other process does, without adding it to index of this one."""
+        with mock.patch.object(plate_index, 'add'):
+            registration = Registration.objects.create(plate=plate, owner='jane doe', car_model='other car')
+        return registration
+
+    def test_bloom_filter(self):
+        """Test to verify filter has no false negatives and about configured share of false positives."""
+        index = BloomFilter(10000, 0.01)
+        for number in range(10000):
+            index.add(f'ABC{number:04}')
+        self.assertTrue(all(f'ABC{number:04}' in index for number in range(10000)))
+        false_positives = sum(f'XYZ{number:04}' in index for number in range(10000))
+        self.assertLess(false_positives, 200)
+        count = index.count
+        self.assertFalse(index.add('ABC0001'))
+        self.assertEqual(index.count, count)
+
+    def test_unknown_plate_is_not_looked_up(self):
+        """Test to verify lookup of unregistered plate returns 404 without database."""
+        self.assertEqual(self.get('ABC123').status_code, status.HTTP_200_OK)
+        self.register_elsewhere('XYZ789')  # Changes of other processes are not checked by lookups
+        with self.assertNumQueries(0):
+            response = self.get('NOT123')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(plate_index.stats()['answered'], 1)
+
+    def test_saved_plate_is_added(self):
+        """Test to verify plates registered by this process are found right away."""
+        Registration.objects.create(plate='xyz789', owner='jane doe', car_model='other car')
+        self.assertEqual(self.get('XYZ789').status_code, status.HTTP_200_OK)
+
+    def test_changes_of_other_processes_are_picked_up(self):
+        """Test to verify plates registered by other processes are found once index is refreshed."""
+        self.register_elsewhere('XYZ789')
+        self.assertFalse(plate_index.might_contain('xyz789'))
+        plate_index.refresh()
+        self.assertTrue(plate_index.might_contain('xyz789'))
+        self.assertEqual(self.get('XYZ789').status_code, status.HTTP_200_OK)
+        self.assertFalse(plate_index.might_contain('NOT123'))
+
+    def test_pruned_changes_rebuild_index(self):
+        """Test to verify index is rebuilt when changes it did not read yet were pruned."""
+        self.register_elsewhere('XYZ789')
+        self.register_elsewhere('QWE456')
+        log_head()  # Places changes in the log
+        latest = RegistrationChange.objects.latest('position')
+        RegistrationChange.objects.exclude(pk=latest.pk).delete()  # Pruned before index read them
+        plate_index.refresh()
+        self.assertTrue(plate_index.might_contain('XYZ789'))
+
+    def test_index_is_maintained_in_background(self):
+        """Test to verify missing index is started in background while database answers lookups,
+        and background thread follows changes of other processes."""
+        plate_index.reset()
+        self.assertTrue(plate_index.might_contain('NOT123'))
+        self.start.assert_called_once()
+
+        plate_index.build()
+        self.register_elsewhere('XYZ789')
+        refresh = plate_index.refresh
+
+        def last_refresh():
+            plate_index._worker = None  # Stops the loop
+            refresh()
+
+        plate_index._worker = threading.current_thread()
+        with mock.patch.object(plate_index, 'refresh', side_effect=last_refresh), \
+                mock.patch('api.plate_index.time.sleep'), mock.patch('api.plate_index.close_old_connections'):
+            plate_index._maintain()
+        self.assertTrue(plate_index.might_contain('XYZ789'))
+
+    def test_disabled(self):
+        """Test to verify lookups query database when index is disabled."""
+        with override_settings(CARPLATE_PLATE_INDEX=dict(INDEX, ENABLED=False)), self.assertNumQueries(1):
+            self.assertEqual(self.get('NOT123').status_code, status.HTTP_404_NOT_FOUND)
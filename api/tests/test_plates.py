@@ -0,0 +1,69 @@
+from django.core.exceptions import ValidationError
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from ..bulk import import_registrations
+from ..models import Registration
+from ..plates import classify, classify_many, validate_plate
+
+
+class PlateClassifierTests(SimpleTestCase):
+    """ Test module for plate validation and classification """
+
+    PLATES = {
+        'ABC123': 'car',
+        'ab123': 'trailer',
+        '123AB': 'motorcycle',
+        '12ABC': 'moped',
+        'AB12': 'quad',
+        'T12345': 'taxi',
+        'H12345': 'historic_car',
+        '1234H': 'historic_motorcycle',
+        'P12345': 'temporary_car',
+        '1234AB': 'temporary_car',
+        'P1234': 'temporary_motorcycle',
+        '1234A': 'temporary_motorcycle',
+        'EA1234': 'electric',
+        '123456': 'diplomatic',
+        '12345': 'diplomatic',
+        'A1B2C': 'custom',
+        ' abc123 ': 'car',
+    }
+    INVALID = ('', 'ABC', 'ABCDEF', 'ABC1234', 'T123456', 'AB 12', 'A-1234', 'T1234X5')
+
+    def test_classify(self):
+        """Test to verify every plate class is recognized and invalid plates are rejected."""
+        for plate, plate_type in self.PLATES.items():
+            self.assertEqual(classify(plate), plate_type, plate)
+        for plate in self.INVALID:
+            self.assertIsNone(classify(plate), plate)
+
+    def test_classify_many(self):
+        """Test to verify batch classification gives the same results as classifying one by one."""
+        plates = list(self.PLATES) + list(self.INVALID)
+        self.assertEqual(classify_many(plates), [classify(plate) for plate in plates])
+
+    def test_validator(self):
+        """Test to verify model validator rejects invalid plates."""
+        validate_plate('ABC123')
+        with self.assertRaises(ValidationError):
+            validate_plate('ABC1234')
+
+
+class PlateTypeTests(TestCase):
+    """ Test module for stored plate class """
+
+    def test_plate_type_is_stored_and_filterable(self):
+        """Test to verify plate class is stored on save and bulk import and can be used as API filter."""
+        registration = Registration.objects.create(plate='t12345', owner='john doe', car_model='super car')
+        self.assertEqual(registration.plate_type, 'taxi')
+        import_registrations([{'plate': 'EA1234', 'owner': 'john doe', 'car_model': 'super car'},
+                              {'plate': 'ABC1234', 'owner': 'john doe', 'car_model': 'super car'}])
+        self.assertEqual(Registration.objects.get(plate='EA1234').plate_type, 'electric')
+
+        registration.plate = 'ABC123'
+        registration.save()
+        self.assertEqual(Registration.objects.get(pk=registration.pk).plate_type, 'car')
+
+        response = self.client.get(reverse('registration-list'), {'plate_type': 'electric'})
+        self.assertEqual([row['plate'] for row in response.data], ['EA1234'])
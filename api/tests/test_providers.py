@@ -0,0 +1,86 @@
+import os
+import shutil
+import tempfile
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from ..providers import HTTPProvider, IcrawlerProvider, LocalDirectoryProvider, ProviderBusy, get_provider
+
+
+class ProviderTests(SimpleTestCase):
+    """ Test module for image providers """
+
+    def setUp(self):
+        """Prepare test environment."""
+        self.directory = tempfile.mkdtemp()
+        for name in ('SUPER_CAR.jpg', 'default.png'):
+            with open(os.path.join(self.directory, name), 'wb') as file:
+                file.write(name.encode())
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_local_directory_provider(self):
+        """Test to verify image is copied from local directory and default is used for unknown car models."""
+        provider = LocalDirectoryProvider(directory=self.directory, default='default.png')
+
+        image = provider.fetch('Super Car')
+        with open(image, 'rb') as file:
+            self.assertEqual(file.read(), b'SUPER_CAR.jpg')
+        self.assertNotEqual(os.path.dirname(image), self.directory)  # Caller owns returned file
+        self.assertTrue(provider.fetch('other car').endswith('default.png'))
+        self.assertIsNone(LocalDirectoryProvider(directory=self.directory).fetch('other car'))
+
+    def test_http_provider_reuses_session(self):
+        """Test to verify HTTP provider follows JSON responses using the same pooled session."""
+        provider = HTTPProvider(url='http://images.local/search?q={query}', timeout=5)
+        search = mock.Mock(status_code=200, headers={'Content-Type': 'application/json'})
+        search.json.return_value = {'url': 'http://images.local/1.png'}
+        image = mock.Mock(status_code=200, headers={'Content-Type': 'image/png'}, content=b'png')
+
+        with mock.patch.object(provider.session, 'get', side_effect=[search, image]) as get:
+            path = provider.fetch('super car')
+
+        get.assert_any_call('http://images.local/search?q=super+car', timeout=5)
+        self.assertTrue(path.endswith('.png'))
+        shutil.rmtree(os.path.dirname(path))
+
+    def test_concurrency_limit(self):
+        """Test to verify provider gives up when no download slot frees up within timeout, telling it from not found."""
+        provider = LocalDirectoryProvider(directory=self.directory, max_concurrency=1, timeout=0.01)
+        provider._slots.acquire()
+        with self.assertRaises(ProviderBusy):
+            provider.fetch('super car')
+
+    def test_hung_crawl_times_out(self):
+        """Test to verify crawl is stopped once timeout elapses and its download slot is freed."""
+        provider = IcrawlerProvider(timeout=0.1, max_concurrency=1)
+        with mock.patch('icrawler.builtin.GoogleImageCrawler') as crawler:
+            stopped = threading.Event()
+            crawler.return_value.crawl.side_effect = lambda **kwargs: stopped.wait(5)
+            crawler.return_value.signal.set.side_effect = lambda **signals: stopped.set()
+            with self.assertRaises(TimeoutError):
+                provider.fetch('super car')
+            self.assertTrue(stopped.is_set())
+            stopped.clear()
+            with self.assertRaises(TimeoutError):
+                provider.fetch('super car')  # Slot was released
+
+    def test_rate_limit(self):
+        """Test to verify downloads are spaced out according to rate limit."""
+        provider = LocalDirectoryProvider(directory=self.directory, rate_limit=50)
+        with mock.patch('api.providers.time.sleep') as sleep:
+            for _ in range(3):
+                provider.fetch('super car')
+        self.assertEqual(sleep.call_count, 2)
+        self.assertTrue(all(0 < call[0][0] <= 0.04 for call in sleep.call_args_list))
+
+    def test_provider_is_configured_in_settings(self):
+        """Test to verify provider backend and options are taken from settings."""
+        config = {'BACKEND': 'api.providers.LocalDirectoryProvider', 'OPTIONS': {'directory': self.directory}}
+        with override_settings(CARPLATE_IMAGE_PROVIDER=config):
+            provider = get_provider()
+            self.assertIsInstance(provider, LocalDirectoryProvider)
+            self.assertIs(get_provider(), provider)
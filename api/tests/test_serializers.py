@@ -0,0 +1,42 @@
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from ..models import Registration
+from ..serializers import RegistrationRowSerializer, RegistrationSerializer
+
+
+class RegistrationRowSerializerTests(TestCase):
+    """ Test module for fast read-only registration serializer """
+
+    def setUp(self):
+        """Prepare test environment."""
+        Registration.objects.create(plate='ABC123', owner='john doe', car_model='super car')
+        registration = Registration.objects.create(plate='XYZ123', owner='jane roe', car_model='other car')
+        Registration.objects.filter(pk=registration.pk).update(image='images/My Car.jpg')
+        self.request = APIRequestFactory().get('/api')
+
+    def assertSameOutput(self, context):
+        queryset = Registration.objects.all()
+        expected = RegistrationSerializer(queryset, many=True, context=context).data
+        rows = RegistrationRowSerializer(RegistrationRowSerializer.prepare(queryset), many=True, context=context).data
+        self.assertEqual(rows, [dict(row) for row in expected])
+
+    def test_output_matches_model_serializer(self):
+        """Test to verify fast serializer produces the same rows, with and without absolute URLs."""
+        self.assertSameOutput({'request': self.request})
+        self.assertSameOutput({})
+
+    @override_settings(TIME_ZONE='Europe/Vilnius')
+    def test_datetimes_are_converted_to_current_timezone(self):
+        """Test to verify datetimes are formatted like DRF does outside UTC."""
+        timezone.activate('Europe/Vilnius')
+        try:
+            self.assertSameOutput({'request': self.request})
+        finally:
+            timezone.deactivate()
+
+    def test_single_row(self):
+        """Test to verify single row can be serialized."""
+        row = RegistrationRowSerializer.prepare(Registration.objects.filter(plate='ABC123')).get()
+        self.assertEqual(RegistrationRowSerializer(row).data['image'], None)
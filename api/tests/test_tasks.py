@@ -0,0 +1,202 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from celery import current_app
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from ..models import ImageDownloadLock, Registration
+from ..providers import ProviderBusy
+from ..tasks import retrieve_image_task, retrieve_images_task
+
+
+class ImageTaskTests(TestCase):
+    """ Test module for image retrieval tasks """
+
+    def setUp(self):
+        """Prepare test environment."""
+        self.media_root = tempfile.mkdtemp()
+        self.settings = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings.enable()
+
+        for plate in ('ABC121', 'ABC122', 'ABC123'):
+            Registration.objects.create(plate=plate, owner='john doe', car_model='super car')
+
+        self.download = mock.patch('api.tasks.download_image', side_effect=self.fake_download)
+        self.download_mock = self.download.start()
+
+    def tearDown(self):
+        self.download.stop()
+        self.settings.disable()
+        shutil.rmtree(self.media_root)
+
+    @staticmethod
+    def fake_download(car_model):
+        path = os.path.join(tempfile.mkdtemp(), 'image.jpg')
+        with open(path, 'wb') as file:
+            file.write(car_model.encode())
+        return path
+
+    def failing_download(self, car_model):
+        if car_model == 'SUPER CAR':
+            raise ConnectionError(car_model)
+        return self.fake_download(car_model)
+
+    def test_download_is_shared_by_car_model(self):
+        """Test to verify image is downloaded once and assigned to all registrations of the car model."""
+        retrieve_image_task(plate='ABC121')
+        retrieve_image_task(plate='ABC122')
+
+        self.assertEqual(self.download_mock.call_count, 1)
+        images = set(Registration.objects.values_list('image', flat=True))
+        self.assertEqual(len(images), 1)
+        self.assertFalse(Registration.objects.filter(retrieve_image=True).exists())
+
+    def test_task_is_folded_into_running_download(self):
+        """Test to verify task does not download image while other task is downloading it."""
+        ImageDownloadLock.objects.create(car_model='SUPER CAR')
+        retrieve_image_task(plate='ABC121')
+
+        self.download_mock.assert_not_called()
+        self.assertTrue(Registration.objects.get(plate='ABC121').retrieve_image)
+
+    def test_abandoned_lock_is_taken_over(self):
+        """Test to verify lock left by crashed worker does not block downloads forever."""
+        ImageDownloadLock.objects.create(car_model='SUPER CAR', acquired_at=timezone.now() - timedelta(hours=1))
+        retrieve_images_task(car_model='SUPER CAR')
+
+        self.download_mock.assert_called_once()
+        self.assertFalse(Registration.objects.filter(retrieve_image=True).exists())
+        self.assertFalse(ImageDownloadLock.objects.exists())
+
+    def test_busy_provider_leaves_registrations_pending(self):
+        """Test to verify busy provider does not get 404 image assigned, retrieval is retried later instead."""
+        self.download_mock.side_effect = ProviderBusy('No free download slot')
+        with mock.patch('api.tasks.retrieve_images_task.apply_async') as retry:
+            retrieve_images_task(car_model='SUPER CAR')
+            retrieve_image_task(plate='ABC121')
+
+        self.assertEqual(Registration.objects.filter(retrieve_image=True).count(), 3)
+        self.assertFalse(Registration.objects.exclude(image='').exists())
+        self.assertEqual(retry.call_count, 2)
+        retry.assert_called_with(kwargs={'car_model': 'SUPER CAR', 'attempt': 1}, countdown=60)
+        self.assertFalse(ImageDownloadLock.objects.exists())
+
+    def test_busy_provider_backs_off(self):
+        """Test to verify retries of busy provider share backoff of failed downloads, so they do not pile up."""
+        self.download_mock.side_effect = ProviderBusy('No free download slot')
+        with mock.patch('api.tasks.retrieve_images_task.apply_async') as retry:
+            retrieve_images_task(car_model='SUPER CAR', attempt=2)
+        retry.assert_called_once_with(kwargs={'car_model': 'SUPER CAR', 'attempt': 3}, countdown=240)
+
+    def test_failed_download_is_retried(self):
+        """Test to verify failed download of leader schedules retrieval again for registrations of folded tasks."""
+        Registration.objects.create(plate='XYZ123', owner='john doe', car_model='other car')
+        self.download_mock.side_effect = self.failing_download
+        with mock.patch('api.tasks.retrieve_images_task.apply_async') as retry:
+            with self.assertRaises(ConnectionError):
+                retrieve_image_task(plate='ABC121')
+            retrieve_images_task()
+
+        self.assertEqual(set(Registration.objects.filter(retrieve_image=True).values_list('plate', flat=True)),
+                         {'ABC121', 'ABC122', 'ABC123'})  # Failure of one car model does not stop the others
+        self.assertEqual(retry.call_count, 2)
+        retry.assert_called_with(kwargs={'car_model': 'SUPER CAR', 'attempt': 1}, countdown=60)
+        self.assertFalse(ImageDownloadLock.objects.exists())
+
+    @override_settings(CARPLATE_IMAGE_RETRY={'DELAY': 60, 'MAX_DELAY': 200, 'MAX_ATTEMPTS': 3})
+    def test_retries_back_off_and_give_up(self):
+        """Test to verify retries are delayed exponentially and default image is assigned once they are exhausted."""
+        self.download_mock.side_effect = self.failing_download
+        with mock.patch('api.tasks.retrieve_images_task.apply_async') as retry:
+            for attempt in range(4):
+                retrieve_images_task(car_model='SUPER CAR', attempt=attempt)
+
+        self.assertEqual([call[1]['countdown'] for call in retry.call_args_list], [60, 120, 200])
+        self.assertEqual([call[1]['kwargs']['attempt'] for call in retry.call_args_list], [1, 2, 3])
+        self.assertFalse(Registration.objects.filter(retrieve_image=True).exists())
+        self.assertEqual(set(Registration.objects.values_list('image', flat=True)), {'images/404.jpg'})
+
+    def test_car_model_changed_during_retrieval_keeps_waiting(self):
+        """Test to verify image of the previous car model is not assigned to registration which changed it."""
+        registration = Registration.objects.get(plate='ABC121')
+
+        def change_car_model(car_model):
+            registration.car_model = 'other car'
+            registration.save()
+            return self.fake_download(car_model)
+
+        self.download_mock.side_effect = change_car_model
+        with mock.patch('api.receivers.queue_image_retrieval'):
+            retrieve_image_task(plate='ABC121')
+
+        registration.refresh_from_db()
+        self.assertEqual(registration.car_model, 'OTHER CAR')
+        self.assertTrue(registration.retrieve_image)
+        self.assertFalse(Registration.objects.filter(car_model='SUPER CAR', retrieve_image=True).exists())
+
+    def test_batch_task_resolves_image_once_per_car_model(self):
+        """Test to verify batch task groups plates by car model and updates them together."""
+        Registration.objects.create(plate='XYZ123', owner='john doe', car_model='other car')
+        with mock.patch('api.tasks.resolve_image', return_value='images/404.jpg') as resolve:
+            retrieve_images_task(plates=['ABC121', 'ABC122', 'XYZ123'])
+
+        self.assertEqual(sorted(call[1]['car_model'] for call in resolve.call_args_list), ['OTHER CAR', 'SUPER CAR'])
+        self.assertFalse(Registration.objects.filter(retrieve_image=True).exists())
+
+
+class ImageTaskQueueTests(TransactionTestCase):
+    """ Test module for queueing image retrieval from post_save receiver """
+
+    def create(self, plates):
+        for plate in plates:
+            Registration.objects.create(plate=plate, owner='john doe', car_model='super car')
+
+    def test_saves_in_transaction_are_batched(self):
+        """Test to verify registrations saved in one transaction produce single batch message after commit."""
+        with mock.patch('api.tasks.retrieve_images_task.delay') as batch_delay, \
+                mock.patch('api.tasks.retrieve_image_task.delay') as single_delay:
+            with transaction.atomic():
+                self.create(['ABC121', 'ABC122', 'ABC123'])
+                batch_delay.assert_not_called()
+
+        batch_delay.assert_called_once_with(plates=['ABC121', 'ABC122', 'ABC123'])
+        single_delay.assert_not_called()
+
+    def test_rolled_back_transaction_sends_nothing(self):
+        """Test to verify no message is sent for registrations which were rolled back."""
+        with mock.patch('api.tasks.retrieve_images_task.delay') as batch_delay:
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                self.create(['ABC121'])
+                raise RuntimeError()
+
+        batch_delay.assert_not_called()
+
+    def test_save_outside_transaction_is_sent_immediately(self):
+        """Test to verify registration saved in autocommit mode is sent as single plate message."""
+        with mock.patch('api.tasks.retrieve_image_task.delay') as single_delay:
+            self.create(['ABC121'])
+
+        single_delay.assert_called_once_with(plate='ABC121')
+
+
+class TaskRoutingTests(SimpleTestCase):
+    """ Test module for Celery routing and execution profile """
+
+    def test_image_tasks_have_own_queue(self):
+        """Test to verify long image retrieval does not share queue with other tasks."""
+        router = current_app.amqp.router
+        for task in (retrieve_image_task, retrieve_images_task):
+            self.assertEqual(router.route({}, task.name)['queue'].name, 'images')
+        self.assertEqual(router.route({}, 'CarplateAPI.celery.debug_task')['queue'].name, 'default')
+
+    def test_execution_profile(self):
+        """Test to verify image tasks store no results, are acknowledged late and have time limits."""
+        self.assertTrue(retrieve_image_task.ignore_result)
+        self.assertTrue(retrieve_image_task.acks_late)
+        self.assertEqual(retrieve_image_task.soft_time_limit, 300)
+        self.assertEqual(current_app.conf.worker_prefetch_multiplier, 1)
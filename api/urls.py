@@ -14,8 +14,13 @@ urlpatterns = [
     re_path('^app/delete/(?P<pk>.*)$', views.AppDelete.as_view(), name='app-delete'),
     re_path('^app/create$', views.AppCreate.as_view(), name='app-create'),
     re_path('^api$', views.RegistrationList.as_view(), name='registration-list'),
+    re_path('^api/bulk$', views.RegistrationBulk.as_view(), name='registration-bulk'),
     path('api/<int:pk>', views.RegistrationDetail.as_view(), name='registration-detail'),
+    re_path('^api/changes$', views.RegistrationChanges.as_view(), name='registration-changes'),
+    re_path('^api/plates/search$', views.RegistrationFuzzySearch.as_view(), name='registration-fuzzy-search'),
+    re_path('^api/plates$', views.RegistrationBatchLookup.as_view(), name='registration-batch-lookup'),
     re_path(r'^api/plate/(?P<plate>.*)/$', views.RegistrationDetailFind.as_view(), name='registration-detail-find'),
+    re_path('^metrics$', views.prometheus_metrics, name='metrics'),
     re_path(r'^docs/', get_swagger_view(title='Car Plate API documentation'), name='api-documentation'),
     path('', views.api_root),
 ]
@@ -0,0 +1,21 @@
+# api/utils.py
+
+from itertools import islice
+
+
+def chunked(iterable, size):
+    """Splits iterable into lists of at most size elements without materializing it.
+
+    Args:
+        iterable: any iterable, e.g. queryset iterator or parsed request rows
+        size (int): maximum number of elements in single chunk
+
+    Returns:
+        generator: lists of elements
+    """
+
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
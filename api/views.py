@@ -1,25 +1,49 @@
 # api/views.py
 
-from django.shortcuts import (get_object_or_404, redirect, render,
-                              render_to_response)
+from collections.abc import Iterable
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Subquery
+from django.http import Http404, HttpResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
+from django.utils.dateparse import parse_datetime
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import filters, generics
+from rest_framework import filters, generics, status
 from rest_framework.decorators import api_view
+from rest_framework.exceptions import ParseError, ValidationError
+from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
 from rest_framework.reverse import reverse
 from rest_framework.views import APIView
 
-from .forms import RegistrationForm
-from .models import Registration
-from .serializers import RegistrationSerializer
+from . import fuzzy, metrics
+from .bulk import delete_registrations, import_registrations, select_registrations, update_registrations
+from .cache import list_cache, plate_cache
+from .changes import CursorExpired, changes_since
+from .conditional import ConditionalGetMixin
+from .forms import RegistrationFilterForm, RegistrationForm
+from .models import Registration, RegistrationChange
+from .pagination import RegistrationCursorPagination, paginate_without_count
+from .parsers import CSVParser, NDJSONParser
+from .plate_index import plate_index
+from .serializers import (FuzzySearchSerializer, PlateBatchSerializer, RegistrationBulkUpdateSerializer, RegistrationRowSerializer,
+                          RegistrationSelectionSerializer, RegistrationSerializer)
+from .streaming import STREAM_CONTENT_TYPES, stream_response
+from .utils import chunked
 
 # Create your views here.
 
 
-class RegistrationList(generics.ListCreateAPIView):
+class RegistrationList(ConditionalGetMixin, generics.ListCreateAPIView):
     """
     get:
-        List all existing or create new car plate registration
+        List all existing or create new car plate registration.
+        Pass page_size (and then cursor from "next" link) to page through results,
+        or stream=ndjson / stream=csv to stream all matching rows.
+        Send ETag of previous response in If-None-Match header to get 304 Not Modified if nothing has changed.
 
     post:
         Create new car plate registration.
@@ -30,10 +54,84 @@ class RegistrationList(generics.ListCreateAPIView):
     serializer_class = RegistrationSerializer
     filter_backends = (filters.SearchFilter, DjangoFilterBackend)
     search_fields = ('plate',)
-    filter_fields = ('plate', 'owner')
+    filter_fields = ('plate', 'owner', 'plate_type')
+    pagination_class = RegistrationCursorPagination
+
+    def get_validators(self, request) -> tuple:
+        # Every change of any registration (deletes included) is recorded in change log, so its head and
+        # the latest modified timestamp, both read from index, version all lists without scanning them
+        head = RegistrationChange.objects.order_by('-id').values('id')[:1]
+        state = Registration.objects.order_by('-modified').values('modified').annotate(head=Subquery(head)).first()
+        if state is None:
+            return None, None
+        return self.make_validators(request.accepted_media_type, f"{state['head']}:{request.get_full_path()}",
+                                    state['modified'])
+
+    def list(self, request, *args, **kwargs):
+        # Rows are read as plain values and serialized by fast read-only serializer
+        queryset = RegistrationRowSerializer.prepare(self.filter_queryset(self.get_queryset()))
+
+        stream_format = request.query_params.get('stream')
+        if stream_format is not None:
+            if stream_format not in STREAM_CONTENT_TYPES:
+                raise ValidationError({'stream': f"Supported formats: {', '.join(STREAM_CONTENT_TYPES)}"})
+            return stream_response(queryset, RegistrationRowSerializer, stream_format, self.get_serializer_context())
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.get_row_serializer(page).data)
+        return Response(self.get_row_serializer(queryset).data)
+
+    def get_row_serializer(self, rows):
+        return RegistrationRowSerializer(rows, many=True, context=self.get_serializer_context())
+
+
+class RegistrationBulk(APIView):
+    """
+    post:
+        Import many car plate registrations at once.
+        Accepts JSON array, newline delimited JSON (application/x-ndjson) or CSV with header row (text/csv).
+        Returns number of created registrations and validation errors for rejected rows.
 
+    patch:
+        Update owner and/or car model of registrations selected by ids, plates or filter, e.g.
+        {"filter": {"car_model": "Super Car"}, "set": {"car_model": "Hyper Car"}}.
+        Returns number of updated registrations and of registrations waiting for new car image.
+
+    delete:
+        Delete registrations selected by ids, plates or filter, e.g. {"ids": [1, 2, 3]}.
+        Returns number of deleted registrations.
 
-class RegistrationDetail(generics.RetrieveUpdateDestroyAPIView):
+    """
+
+    parser_classes = (JSONParser, NDJSONParser, CSVParser)
+
+    def post(self, request):
+        rows = request.data
+        if isinstance(rows, (dict, str)) or not isinstance(rows, Iterable):
+            raise ParseError("Expected a list of registrations")
+
+        report = import_registrations(rows)
+        response_status = status.HTTP_201_CREATED if report['created'] else status.HTTP_400_BAD_REQUEST
+        return Response(report, status=response_status)
+
+    @staticmethod
+    def selection(serializer):
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        return select_registrations(data.get('ids'), data.get('plates'), data.get('filter'))
+
+    def patch(self, request):
+        serializer = RegistrationBulkUpdateSerializer(data=request.data)
+        queryset = self.selection(serializer)
+        return Response(update_registrations(queryset, serializer.validated_data['set']))
+
+    def delete(self, request):
+        queryset = self.selection(RegistrationSelectionSerializer(data=request.data))
+        return Response(delete_registrations(queryset))
+
+
+class RegistrationDetail(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     get:
         Retrieve car plate registration details
@@ -53,7 +151,7 @@ class RegistrationDetail(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = RegistrationSerializer
 
 
-class RegistrationDetailFind(generics.RetrieveUpdateDestroyAPIView):
+class RegistrationDetailFind(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
 
     """View for Registration Details where plate is passed as argument in URL.
 
@@ -69,25 +167,149 @@ class RegistrationDetailFind(generics.RetrieveUpdateDestroyAPIView):
 
     queryset = Registration.objects.all()
     serializer_class = RegistrationSerializer
+    lookup_field = 'plate'
     lookup_url_kwarg = 'plate'
 
     def get_object(self):
-        return Registration.objects.get(plate=self.kwargs['plate'])
+        plate = self.kwargs['plate']
+        if not plate_index.might_contain(plate):
+            raise Http404("No Registration matches the given query.")  # Certainly not registered, skip database
+        obj = get_object_or_404(self.get_queryset(), plate=plate)
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    def get_data(self):
+        """Returns serialized registration, served from plate cache when possible."""
+
+        if not hasattr(self, '_data'):
+            # Serialized without request, so cached media URLs do not carry host of the first requester
+            context = {'format': self.format_kwarg, 'view': self}
+            self._data = plate_cache.get_or_load(
+                self.kwargs['plate'], lambda: dict(RegistrationSerializer(self.get_object(), context=context).data))
+        return self._data
+
+    def get_validators(self, request):
+        # Cached payload already holds modified timestamp, so cached polls do not query database at all
+        return self.make_validators(request.accepted_media_type, 1, parse_datetime(self.get_data()['modified']))
+
+    def retrieve(self, request, *args, **kwargs):
+        return Response(RegistrationSerializer.absolute_urls(self.get_data(), request))
 
     # def get_queryset(self):
     #     return Registration.objects.get(plate=self.kwargs['plate'])
 
 
+class RegistrationBatchLookup(APIView):
+    """
+    get:
+        Look up many plates at once, e.g. /api/plates?plate=ABC123&plate=XYZ789.
+        Returns registration details keyed by normalized plate, null for plates which are not registered.
+
+    post:
+        Look up plates passed as JSON array or {"plates": [...]}, for batches too long for query string.
+
+    """
+
+    def get(self, request):
+        return self.lookup(request, {'plates': request.query_params.getlist('plate')})
+
+    def post(self, request):
+        data = request.data
+        return self.lookup(request, {'plates': data} if isinstance(data, list) else data)
+
+    def lookup(self, request, data):
+        """Serves cached plates from plate cache and loads the rest with one query per database batch."""
+
+        serializer = PlateBatchSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        results = dict.fromkeys(plate_cache.normalize(plate) for plate in serializer.validated_data['plates'])
+        results.update(plate_cache.get_many(results))
+
+        missing = plate_index.candidates([plate for plate, data in results.items() if data is None])
+        context = {'format': self.format_kwarg, 'view': self}  # Relative media URLs, see get_data() of plate lookup
+        loaded = {}
+        # Plate column holds normalized values, so IN lookup uses its unique index. Batches are split
+        # only by backend limits of query parameters (999 on SQLite), i.e. single query on Postgres
+        for batch in chunked(missing, connection.ops.bulk_batch_size(['plate'], missing)):
+            registrations = Registration.objects.filter(plate__in=batch)
+            loaded.update((item['plate'], dict(item))
+                          for item in RegistrationSerializer(registrations, many=True, context=context).data)
+        plate_cache.set_many(loaded)
+        results.update(loaded)
+        return Response({plate: data and RegistrationSerializer.absolute_urls(data, request)
+                         for plate, data in results.items()})
+
+
+class RegistrationFuzzySearch(APIView):
+    """
+    get:
+        Find registrations by partial or misread plate, e.g. /api/plates/search?q=AB0I23&limit=10.
+        Characters plate readers confuse (0/O/D/Q, 1/I/L, 2/Z, 5/S, 6/G, 8/B) count as small mistakes.
+        Returns registrations with their similarity score from 0 to 1, the most similar first.
+
+    """
+
+    def get(self, request):
+        serializer = FuzzySearchSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        query = serializer.validated_data['q']
+        results = fuzzy.search(query, serializer.validated_data['limit'])
+
+        rows = RegistrationRowSerializer.prepare(Registration.objects.filter(pk__in=[pk for pk, *_ in results]))
+        data = {row['id']: row for row in RegistrationRowSerializer(rows, many=True,
+                                                                    context={'request': request}).data}
+        return Response({'query': query, 'results': [dict(data[pk], score=score) for pk, _, score in results
+                                                     if pk in data]})
+
+
+class RegistrationChanges(APIView):
+    """
+    get:
+        Changes of registrations since cursor, for replicas syncing incrementally, e.g. /api/changes?since=1234.
+        Upserts carry current registration data, deletes are tombstones with registration id and plate only.
+        Start with since=0 (after copying full list from /api), then follow cursor of every response.
+        Responds 410 Gone if changes following cursor were pruned, the list has to be copied again.
+
+    """
+
+    def get(self, request):
+        try:
+            since = max(int(request.query_params.get('since', 0)), 0)
+            limit = min(max(int(request.query_params.get('limit', settings.CARPLATE_CHANGE_FEED['PAGE_SIZE'])), 1),
+                        settings.CARPLATE_CHANGE_FEED['PAGE_SIZE'])
+        except ValueError:
+            raise ValidationError({'since': ["Cursor and limit must be integers."]})
+
+        try:
+            changes, cursor = changes_since(since, limit, context={'request': request})
+        except CursorExpired as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_410_GONE)
+        next_url = reverse('registration-changes', request=request) + '?' + urlencode({'since': cursor})
+        return Response({'cursor': cursor, 'next': next_url, 'changes': changes})
+
+
 class AppList(APIView):
 
     def get(self, request):
-        queryset = Registration.objects.all()
-        if queryset:
-            response = render_to_response('registration_list.html', {'registrations': queryset})
-        else:
-            response = render(request=request, template_name='registration_list.html')
+        form = RegistrationFilterForm(request.GET)
+        params = {name: value for name, value in form.cleaned_data.items() if value} if form.is_valid() else {}
+        page = params.pop('page', 1)
 
-        return response
+        rows = list_cache.get_or_render(dict(params, page=page), lambda: self.render_rows(params, page))
+        return render(request=request, template_name='registration_list.html', context={'form': form, 'rows': rows})
+
+    @staticmethod
+    def render_rows(params, page):
+        """Renders table rows of single page, fetching only displayed columns."""
+
+        form = RegistrationFilterForm(params)
+        form.is_valid()
+        queryset = form.filter(Registration.objects.only('id', 'plate', 'owner', 'car_model', 'image'))
+        context = {
+            'page': paginate_without_count(queryset, page, settings.CARPLATE_APP_PAGE_SIZE),
+            'query': urlencode(params),
+        }
+        return render_to_string('registration_rows.html', context)
 
 
 class AppDetails(APIView):
@@ -154,3 +376,10 @@ def api_root(request):
         'api': reverse('registration-list', request=request),
 
     })
+
+
+def prometheus_metrics(request):
+    """Request, task and cache metrics of all web and Celery processes in Prometheus text format."""
+    if not settings.CARPLATE_METRICS['ENABLED']:
+        raise Http404("Metrics are disabled")
+    return HttpResponse(metrics.registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
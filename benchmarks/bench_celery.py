@@ -0,0 +1,144 @@
+"""
+Compares Celery defaults (single queue, prefetch multiplier 4, early acknowledgement, stored results)
+with the routing and execution profile from project settings, using in-memory broker and workers
+running in threads of the benchmark process. Workers share SQLite file database, or throw-away
+Postgres database with BENCHMARK_DB=postgres.
+
+Burst of image retrieval tasks, each simulating crawl with --crawl-ms sleep, is queued first,
+followed by quick tasks standing for any other work. Every profile gets two single process workers:
+with defaults both consume the one queue, with project profile one consumes images queue and the
+other default queue. Reported are latency of quick tasks from sending to completion and time to
+drain the image burst. Crawler rate limit is disabled, as nothing is crawled.
+
+Usage:
+    python -m benchmarks.bench_celery --images 200 --quick 50 --crawl-ms 20
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import threading
+import time
+from contextlib import ExitStack
+
+from celery import shared_task
+
+from benchmarks.common import populate, setup_django, shared_database, use_sqlite_file, write_results
+
+DEFAULTS = {  # Celery defaults overridden by project settings
+    'CELERY_TASK_DEFAULT_QUEUE': 'celery',
+    'CELERY_TASK_ROUTES': {},
+    'CELERY_TASK_ACKS_LATE': False,
+    'CELERY_TASK_REJECT_ON_WORKER_LOST': None,
+    'CELERY_WORKER_PREFETCH_MULTIPLIER': 4,
+    'CELERY_TASK_IGNORE_RESULT': False,
+}
+PROFILES = ('defaults', 'project')
+
+_done = {}
+_done_lock = threading.Lock()
+
+
+@shared_task(name='benchmarks.quick_task')
+def quick_task(index):
+    with _done_lock:
+        _done[index] = time.perf_counter()
+
+
+def percentile(values: list, share: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def run_profile(profile: str, images: int, quick: int, crawl_ms: int, timeout: float = 600) -> dict:
+    """Runs workload in current process with given profile and returns its timings."""
+
+    use_sqlite_file()
+    setup_django()
+
+    from celery import current_app
+    from celery.contrib.testing.worker import start_worker
+    from django.test import override_settings
+
+    from api.models import Registration
+    from api.tasks import retrieve_image_task
+
+    current_app.conf.update(CELERY_BROKER_TRANSPORT_OPTIONS={'polling_interval': 0.005})  # In-memory broker polls
+    if profile == 'defaults':
+        current_app.conf.update(DEFAULTS)
+    queues = ([current_app.conf.task_default_queue] * 2 if profile == 'defaults'
+              else ['images', current_app.conf.task_default_queue])
+    provider = {'BACKEND': f'{__name__}.SlowProvider', 'OPTIONS': {'delay': crawl_ms / 1000}}
+
+    with shared_database(), override_settings(CARPLATE_IMAGE_PROVIDER=provider, CARPLATE_IMAGE_VARIANTS={}), \
+            ExitStack() as workers:
+        plates = populate(images, car_models=images)  # Every registration crawls for its own car model
+        Registration.objects.update(retrieve_image=True)
+        for index, queue in enumerate(queues):
+            workers.enter_context(start_worker(current_app, perform_ping_check=False, queues=[queue],
+                                               hostname=f'{profile}{index}@benchmark'))
+
+        started = time.perf_counter()
+        for plate in plates:
+            retrieve_image_task.delay(plate)
+        sent = {}
+        for index in range(quick):
+            sent[index] = time.perf_counter()
+            quick_task.delay(index)
+
+        while len(_done) < quick or Registration.objects.filter(retrieve_image=True).exists():
+            if time.perf_counter() - started > timeout:
+                raise RuntimeError(f"{profile} profile did not complete within {timeout} seconds")
+            time.sleep(0.01)
+        drained = time.perf_counter() - started
+
+    latencies = [(_done[index] - sent[index]) * 1000 for index in range(quick)]
+    return {
+        'quick_p50_ms': percentile(latencies, 0.5),
+        'quick_p95_ms': percentile(latencies, 0.95),
+        'quick_max_ms': max(latencies),
+        'images_drained_s': drained,
+        'prefetch_multiplier': current_app.conf.worker_prefetch_multiplier,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--images', type=int, default=200, help='image retrieval tasks in burst')
+    parser.add_argument('--quick', type=int, default=50, help='quick tasks sent after the burst')
+    parser.add_argument('--crawl-ms', type=int, default=20, help='simulated crawl duration')
+    parser.add_argument('--profile', choices=PROFILES, help='run single profile in this process')
+    parser.add_argument('--output', help='write JSON results to this file instead of stdout')
+    arguments = parser.parse_args()
+
+    if arguments.profile:
+        result = run_profile(arguments.profile, arguments.images, arguments.quick, arguments.crawl_ms)
+        print(json.dumps(result))
+        return
+
+    # Celery configuration is fixed once tasks are routed, so every profile runs in its own process
+    results = {'images': arguments.images, 'quick': arguments.quick, 'crawl_ms': arguments.crawl_ms, 'profiles': {}}
+    for profile in PROFILES:
+        output = subprocess.run([sys.executable, '-m', 'benchmarks.bench_celery', '--profile', profile,
+                                 '--images', str(arguments.images), '--quick', str(arguments.quick),
+                                 '--crawl-ms', str(arguments.crawl_ms)],
+                                stdout=subprocess.PIPE, check=True, universal_newlines=True).stdout
+        results['profiles'][profile] = json.loads(output.strip().splitlines()[-1])
+    write_results(results, arguments.output)
+
+
+class SlowProvider:
+
+    """Image provider simulating crawl which finds nothing, see CARPLATE_IMAGE_PROVIDER."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    def fetch(self, car_model):
+        time.sleep(self.delay)
+        return None
+
+
+if __name__ == '__main__':
+    main()
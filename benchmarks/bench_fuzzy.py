@@ -0,0 +1,72 @@
+"""
+Compares plate search of list endpoint (plate contains query) with fuzzy plate search backed by
+trigram index of folded plates in database and by in-memory index, for misread and partial plates.
+Reported are timings and share of queries whose registered plate was the top result.
+
+Usage:
+    python -m benchmarks.bench_fuzzy --rows 100000
+    BENCHMARK_DB=postgres python -m benchmarks.bench_fuzzy --rows 1000000
+"""
+
+import random
+
+from benchmarks.common import argument_parser, benchmark_database, measure, populate, setup_django, write_results
+
+MISREADINGS = {'0': 'O', 'O': '0', '1': 'I', 'I': '1', '2': 'Z', '5': 'S', '8': 'B', 'B': '8', 'D': '0'}
+
+
+def misread(plate: str) -> str:
+    """Replaces one character plate reader could confuse, e.g. ABC120 -> ABC12O."""
+
+    positions = [index for index, character in enumerate(plate) if character in MISREADINGS]
+    if not positions:
+        return plate
+    index = random.choice(positions)
+    return plate[:index] + MISREADINGS[plate[index]] + plate[index + 1:]
+
+
+def main():
+    parser = argument_parser(__doc__, rows=100000)
+    parser.add_argument('--queries', type=int, default=100, help='number of distinct queries of every kind')
+    arguments = parser.parse_args()
+    setup_django()
+    random.seed(0)
+
+    from django.conf import settings
+    from django.test import override_settings
+
+    from api import fuzzy
+    from api.models import Registration
+
+    with benchmark_database() as connection:
+        plates = populate(arguments.rows)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE api_registration')
+
+        sample = random.sample(plates, arguments.queries)
+        queries = {'misread': [(misread(plate), plate) for plate in sample],
+                   'partial': [(plate[1:5], plate) for plate in sample]}
+        results = {'vendor': connection.vendor, 'rows': arguments.rows, 'cases': {}}
+        for kind, pairs in queries.items():
+            iterator = iter(pairs * arguments.repeat)
+            results['cases'][f'{kind}_contains'] = {'timing': measure(
+                lambda: list(Registration.objects.filter(plate__icontains=next(iterator)[0])[:10]), arguments.repeat)}
+
+            for backend in ('database', 'memory'):
+                with override_settings(CARPLATE_FUZZY_SEARCH=dict(settings.CARPLATE_FUZZY_SEARCH,
+                                                                  BACKEND=backend, REFRESH_INTERVAL=3600)):
+                    fuzzy.search('AAA000', 1)  # Builds memory index
+                    found = sum(bool(result) and result[0][1] == plate
+                                for result, plate in ((fuzzy.search(query, 10), plate) for query, plate in pairs))
+                    iterator = iter(pairs * arguments.repeat)
+                    results['cases'][f'{kind}_fuzzy_{backend}'] = {
+                        'timing': measure(lambda: fuzzy.search(next(iterator)[0], 10), arguments.repeat),
+                        'top_hit_rate': found / len(pairs),
+                    }
+
+    write_results(results, arguments.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Compares plate lookups compiled as UPPER(plate) expressions (how CICharField used to query)
+with normalized lookups on the stored value, which can use plain and trigram indexes.
+
+Usage:
+    python -m benchmarks.bench_plate_lookup --rows 100000
+    BENCHMARK_DB=postgres python -m benchmarks.bench_plate_lookup --rows 1000000
+"""
+
+import random
+
+from benchmarks.common import (argument_parser, benchmark_database, measure,
+                               populate, setup_django, write_results)
+
+
+def cases(plates):
+    from django.db.models import Value
+    from django.db.models.functions import Upper
+
+    from api.models import Registration
+
+    upper = Registration.objects.annotate(upper_plate=Upper('plate'))
+    plate = random.choice(plates)
+    return {
+        'exact_upper_expression': lambda: upper.filter(upper_plate=Upper(Value(plate.lower()))),
+        'exact_normalized': lambda: Registration.objects.filter(plate__iexact=plate.lower()),
+        'prefix_upper_expression': lambda: upper.filter(upper_plate__startswith=plate[:3]),
+        'prefix_normalized': lambda: Registration.objects.filter(plate__istartswith=plate[:3].lower()),
+        'contains_upper_expression': lambda: upper.filter(upper_plate__contains=plate[2:5]),
+        'contains_normalized': lambda: Registration.objects.filter(plate__icontains=plate[2:5].lower()),
+    }
+
+
+def main():
+    arguments = argument_parser(__doc__, rows=100000).parse_args()
+    setup_django()
+    random.seed(0)
+
+    with benchmark_database() as connection:
+        plates = populate(arguments.rows)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE api_registration')
+
+        results = {'vendor': connection.vendor, 'rows': arguments.rows, 'cases': {}}
+        for name, queryset in cases(plates).items():
+            results['cases'][name] = {
+                'plan': queryset().explain(),
+                'timing': measure(lambda: list(queryset()[:100]), arguments.repeat),
+            }
+
+    write_results(results, arguments.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Compares RegistrationSerializer (DRF ModelSerializer over model instances) with RegistrationRowSerializer
+(.values() rows) used by list endpoint. Each case fetches rows, serializes them and renders JSON.
+
+Usage:
+    python -m benchmarks.bench_serializers --sizes 10000 100000
+"""
+
+from benchmarks.common import (argument_parser, benchmark_database, measure,
+                               populate, setup_django, write_results)
+
+
+def cases(size):
+    from rest_framework.renderers import JSONRenderer
+    from rest_framework.test import APIRequestFactory
+
+    from api.models import Registration
+    from api.serializers import RegistrationRowSerializer, RegistrationSerializer
+
+    context = {'request': APIRequestFactory().get('/api')}
+    queryset = Registration.objects.all()[:size]
+    rows = RegistrationRowSerializer.prepare(Registration.objects.all())[:size]
+    renderer = JSONRenderer()
+    return {
+        'model_serializer': lambda: renderer.render(RegistrationSerializer(queryset, many=True, context=context).data),
+        'row_serializer': lambda: renderer.render(RegistrationRowSerializer(rows, many=True, context=context).data),
+    }
+
+
+def main():
+    parser = argument_parser(__doc__, rows=0)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000], help='number of serialized rows')
+    parser.set_defaults(repeat=5)
+    arguments = parser.parse_args()
+    setup_django()
+
+    with benchmark_database() as connection:
+        populate(max(arguments.sizes))
+        from api.models import Registration
+        Registration.objects.update(image='images/404.jpg')  # Image and variant URLs are part of every row
+
+        results = {'vendor': connection.vendor, 'cases': {}}
+        for size in arguments.sizes:
+            timings = {name: measure(case, arguments.repeat) for name, case in cases(size).items()}
+            timings['speedup'] = timings['model_serializer']['mean_ms'] / timings['row_serializer']['mean_ms']
+            results['cases'][size] = timings
+
+    write_results(results, arguments.output)
+
+
+if __name__ == '__main__':
+    main()
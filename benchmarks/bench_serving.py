@@ -0,0 +1,143 @@
+"""
+Compares requests per second of development server (runserver, DEBUG on, new database connection
+per request) with production serving profile (gunicorn.conf.py, DEBUG off, persistent connections)
+and with async read endpoints served by uvicorn (CarplateAPI/asgi.py).
+Both servers run against the same populated database and are loaded by the same client processes.
+
+Usage:
+    python -m benchmarks.bench_serving --rows 100000 --duration 10 --clients 8
+    BENCHMARK_DB=postgres python -m benchmarks.bench_serving --rows 100000
+"""
+
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+from benchmarks.common import (argument_parser, populate, setup_django, shared_database,
+                               use_sqlite_file, write_results)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROFILES = {
+    'development': {
+        'env': {'DJANGO_DEBUG': '1', 'DJANGO_CONN_MAX_AGE': '0'},
+        'command': lambda port, workers: [sys.executable, 'manage.py', 'runserver', f'127.0.0.1:{port}', '--noreload'],
+    },
+    'production': {
+        'env': {'DJANGO_DEBUG': '0', 'DJANGO_CONN_MAX_AGE': '600'},
+        'command': lambda port, workers: [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+                                          '--bind', f'127.0.0.1:{port}', '--workers', str(workers),
+                                          'CarplateAPI.wsgi:application'],
+    },
+    'asgi': {
+        'env': {'DJANGO_DEBUG': '0', 'DJANGO_CONN_MAX_AGE': '600'},
+        'command': lambda port, workers: [sys.executable, '-m', 'uvicorn', '--port', str(port),
+                                          '--workers', str(workers), '--no-access-log',
+                                          'CarplateAPI.asgi:application'],
+    },
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def server(profile: str, database: str, workers: int):
+    """Starts server of given profile and waits until it answers."""
+
+    port = free_port()
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE='benchmarks.settings', BENCHMARK_DB_NAME=database,
+               **PROFILES[profile]['env'])
+    process = subprocess.Popen(PROFILES[profile]['command'](port, workers), cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f'http://127.0.0.1:{port}'
+    try:
+        for _ in range(300):
+            try:
+                urllib.request.urlopen(url + '/api?page_size=1').read()
+                break
+            except OSError:
+                if process.poll() is not None:
+                    raise RuntimeError(f"{profile} server exited with status {process.returncode}")
+                time.sleep(0.1)
+        yield url
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def load(urls: list, duration: float) -> list:
+    """Requests random URLs for duration seconds, returns latency of each request in milliseconds."""
+
+    timings = []
+    deadline = time.perf_counter() + duration
+    while True:
+        started = time.perf_counter()
+        if started > deadline:
+            return timings
+        urllib.request.urlopen(random.choice(urls)).read()
+        timings.append((time.perf_counter() - started) * 1000)
+
+
+def run_case(urls: list, clients: int, duration: float) -> dict:
+    with ProcessPoolExecutor(clients) as executor:
+        futures = [executor.submit(load, urls, duration) for _ in range(clients)]
+        timings = sorted(timing for future in futures for timing in future.result())
+    return {
+        'requests': len(timings),
+        'requests_per_second': len(timings) / duration,
+        'p50_ms': timings[len(timings) // 2],
+        'p95_ms': timings[int(len(timings) * 0.95)],
+    }
+
+
+def cases(url: str, plates: list, pks: list) -> dict:
+    return {
+        'api_detail': [f'{url}/api/{pk}' for pk in pks],
+        'plate_lookup': [f'{url}/api/plate/{plate}/' for plate in plates],
+        'api_list_page': [f'{url}/api?page_size=100'],
+        'app_list_page': [f'{url}/app?page={page}' for page in range(1, 21)],
+    }
+
+
+def main():
+    parser = argument_parser(__doc__, rows=100000)
+    parser.add_argument('--duration', type=float, default=10, help='seconds every case is measured for')
+    parser.add_argument('--clients', type=int, default=8, help='concurrent client processes')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='gunicorn worker processes')
+    arguments = parser.parse_args()
+    random.seed(0)
+
+    use_sqlite_file()
+    setup_django()
+
+    from django.db import connection
+
+    from api.models import Registration
+
+    with shared_database() as database:
+        plates = random.sample(populate(arguments.rows), 1000)
+        pks = list(Registration.objects.filter(plate__in=plates).values_list('pk', flat=True))
+        connection.close()
+
+        results = {'vendor': connection.vendor, 'rows': arguments.rows, 'clients': arguments.clients,
+                   'workers': arguments.workers, 'profiles': {}}
+        for profile in PROFILES:
+            with server(profile, database, arguments.workers) as url:
+                results['profiles'][profile] = {name: run_case(urls, arguments.clients, arguments.duration)
+                                                for name, urls in cases(url, plates, pks).items()}
+
+    write_results(results, arguments.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+import argparse
+import json
+import os
+import shutil
+import string
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from itertools import product
+
+import django
+
+
+def setup_django():
+    """Configures Django with benchmark settings unless other settings were explicitly requested."""
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+    django.setup()
+
+
+@contextmanager
+def benchmark_database():
+    """Creates and migrates throw-away database, the same way Django test runner does."""
+
+    from django.db import connection
+
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def use_sqlite_file():
+    """Makes benchmark settings use SQLite file instead of in-memory database, so that other threads
+    and processes (servers, Celery workers) can connect to it. Must be called before setup_django()."""
+
+    if os.environ.get('BENCHMARK_DB', 'sqlite') != 'postgres':
+        os.environ['BENCHMARK_DB_NAME'] = os.path.join(tempfile.mkdtemp(), 'db.sqlite3')
+
+
+@contextmanager
+def shared_database():
+    """Database other threads and processes can connect to: SQLite file set up by use_sqlite_file(),
+    or throw-away Postgres database."""
+
+    from django.core.management import call_command
+    from django.db import connection
+
+    if connection.vendor != 'sqlite':
+        with benchmark_database() as connection:
+            yield connection.settings_dict['NAME']
+        return
+
+    database = connection.settings_dict['NAME']
+    call_command('migrate', verbosity=0)
+    try:
+        yield database
+    finally:
+        connection.close()
+        shutil.rmtree(os.path.dirname(database), ignore_errors=True)
+
+
+def make_plates(count: int) -> list:
+    """Generates unique plates in XXX000 format."""
+
+    letters = (''.join(chars) for chars in product(string.ascii_uppercase, repeat=3))
+    return [f"{prefix}{number:03d}" for prefix, _ in zip(letters, range((count + 999) // 1000))
+            for number in range(1000)][:count]
+
+
+def populate(count: int, car_models: int = 100, chunk_size: int = 5000) -> list:
+    """Inserts count registrations with bulk_create and returns their plates."""
+
+    from api.models import Registration
+    from api.utils import chunked
+
+    plates = make_plates(count)
+    for chunk in chunked(enumerate(plates), chunk_size):
+        instances = [Registration(plate=plate, owner='John Doe', car_model=f'CAR MODEL{index % car_models}',
+                                  retrieve_image=False)
+                     for index, plate in chunk]
+        for instance in instances:
+            instance.normalize()
+        Registration.objects.bulk_create(instances)
+    return plates
+
+
+def measure(function, repeat: int, setup=None) -> dict:
+    """Calls function repeat times and returns timing summary in milliseconds.
+    Optional setup is called before every call and is not measured."""
+
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+
+    timings.sort()
+    return {
+        'repeat': repeat,
+        'mean_ms': sum(timings) / repeat,
+        'p50_ms': timings[repeat // 2],
+        'p95_ms': timings[min(repeat - 1, int(repeat * 0.95))],
+        'max_ms': timings[-1],
+    }
+
+
+def argument_parser(description: str, rows: int) -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--rows', type=int, default=rows, help='number of registrations to generate')
+    parser.add_argument('--repeat', type=int, default=200, help='number of measured calls per case')
+    parser.add_argument('--output', help='write JSON results to this file instead of stdout')
+    return parser
+
+
+def write_results(results: dict, output: str = None) -> None:
+    text = json.dumps(results, indent=2, sort_keys=True)
+    if output:
+        with open(output, 'w') as file:
+            file.write(text + '\n')
+    else:
+        print(text)
@@ -0,0 +1,228 @@
+"""
+Benchmark suite covering API latency, write throughput and image pipeline, used to catch
+performance regressions. Runs offline: throw-away database, in-memory Celery broker and
+local directory image provider fed with generated images instead of internet search.
+
+Results are written as JSON. Pass results of previous run to --compare to get relative change
+of every case; command exits with status 1 if any case got slower by more than --threshold.
+
+Usage:
+    python -m benchmarks.run --output baseline.json
+    python -m benchmarks.run --compare baseline.json --threshold 0.2
+    BENCHMARK_DB=postgres python -m benchmarks.run --rows 1000000 --output postgres.json
+"""
+
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+from contextlib import contextmanager
+
+from benchmarks.common import (argument_parser, benchmark_database, make_plates,
+                               measure, populate, setup_django, write_results)
+
+CAR_MODELS = 100
+
+
+def make_images(directory: str, car_models: int) -> None:
+    """Generates distinct image for every car model created by populate()."""
+
+    from PIL import Image
+
+    for index in range(car_models):
+        color = (index * 37 % 256, index * 67 % 256, index * 97 % 256)
+        Image.new('RGB', (1024, 768), color).save(os.path.join(directory, f'CAR_MODEL{index}.jpg'), quality=90)
+
+
+@contextmanager
+def offline_environment():
+    """Points media root and image provider to temporary directories."""
+
+    from django.test import override_settings
+
+    media_root, images = tempfile.mkdtemp(), tempfile.mkdtemp()
+    make_images(images, CAR_MODELS)
+    provider = {'BACKEND': 'api.providers.LocalDirectoryProvider', 'OPTIONS': {'directory': images}}
+    try:
+        with override_settings(MEDIA_ROOT=media_root, CARPLATE_IMAGE_PROVIDER=provider):
+            yield
+    finally:
+        shutil.rmtree(media_root, ignore_errors=True)
+        shutil.rmtree(images, ignore_errors=True)
+
+
+def api_cases(plates: list) -> dict:
+    from django.test import Client
+
+    from api.cache import plate_cache
+    from api.models import Registration
+
+    client = Client()
+    pks = list(Registration.objects.values_list('pk', flat=True)[:1000])
+
+    def get(url, params=None):
+        response = client.get(url, params)
+        assert response.status_code == 200, response.status_code
+        return response
+
+    return {
+        'api_list_page': (lambda: get('/api', {'page_size': 100}), None, None),
+        'api_list_filtered': (lambda: get('/api', {'search': random.choice(plates)[:4]}), None, None),
+        'api_detail': (lambda: get(f'/api/{random.choice(pks)}'), None, None),
+        'plate_lookup_uncached': (lambda: get(f'/api/plate/{random.choice(plates)}/'), plate_cache.clear, None),
+        'plate_lookup_cached': (lambda: get(f'/api/plate/{plates[0]}/'), None, None),
+        'app_list_page': (lambda: get('/app', {'page': random.randint(1, 20)}), None, None),
+    }
+
+
+def write_cases(plates: list, bulk_size: int) -> dict:
+    from api.bulk import import_registrations
+    from api.models import Registration
+
+    instance = Registration.objects.get(plate=plates[0])
+    owners = iter(['John Doe', 'Jane Roe'] * 10 ** 6)
+    new_plates = (plate for plate in make_plates(len(plates) + 10 ** 6)[len(plates):])
+    rows = []
+
+    def save():
+        instance.owner = next(owners)
+        instance.save()
+
+    def create():
+        Registration.objects.create(plate=next(new_plates), owner='John Doe', car_model='CAR MODEL0')
+
+    def prepare_import():
+        Registration.objects.filter(plate__in=[row['plate'] for row in rows]).delete()
+        rows[:] = [{'plate': next(new_plates), 'owner': 'John Doe', 'car_model': f'CAR MODEL{index % CAR_MODELS}'}
+                   for index in range(bulk_size)]
+
+    return {
+        'registration_save': (save, None, 1),
+        'registration_create': (create, None, 1),
+        'bulk_import': (lambda: import_registrations(rows), prepare_import, bulk_size),
+    }
+
+
+def validation_cases(plates: list) -> dict:
+    from api.models import Registration
+
+    sample = random.sample(plates, min(1000, len(plates)))
+    field = Registration._meta.get_field('plate')
+    instances = [Registration(plate=plate, owner='John Doe', car_model='Car Model') for plate in sample]
+
+    def validate_plates():
+        for plate in sample:
+            field.run_validators(plate)
+
+    def clean_registrations():
+        for instance in instances:
+            instance.clean_fields(exclude=('image', 'retrieve_image'))
+
+    return {
+        'plate_validation': (validate_plates, None, len(sample)),
+        'registration_clean_fields': (clean_registrations, None, len(instances)),
+    }
+
+
+def image_pipeline_case(plates: list, task_count: int) -> dict:
+    """Every measured run downloads, stores and resizes one image per car model and assigns it
+    to all waiting registrations, as eager Celery tasks."""
+
+    from celery import current_app
+    from django.conf import settings
+
+    from api.models import CachedImage, Registration
+    from api.tasks import retrieve_image_task
+
+    sample = plates[:task_count]
+
+    def reset():
+        shutil.rmtree(os.path.join(settings.MEDIA_ROOT, 'images'), ignore_errors=True)
+        CachedImage.objects.exclude(car_model='404').delete()
+        Registration.objects.filter(plate__in=sample).update(image='', retrieve_image=True)
+
+    def run():
+        current_app.conf.update(CELERY_TASK_ALWAYS_EAGER=True)  # Settings are namespaced, see CarplateAPI/celery.py
+        try:
+            for plate in sample:
+                retrieve_image_task.delay(plate)
+        finally:
+            current_app.conf.update(CELERY_TASK_ALWAYS_EAGER=False)
+
+    return {'retrieve_image_task': (run, reset, len(sample))}
+
+
+def summarize(cases: dict, repeat: int) -> dict:
+    results = {}
+    for name, (function, setup, items) in cases.items():
+        timing = measure(function, repeat, setup)
+        if items:
+            timing['items'] = items
+            timing['items_per_second'] = items / (timing['mean_ms'] / 1000)
+        results[name] = timing
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Returns description of cases whose mean time grew by more than threshold (e.g. 0.2 = 20%)."""
+
+    regressions = []
+    for name, timing in sorted(results['cases'].items()):
+        previous = baseline['cases'].get(name)
+        if previous is None:
+            continue
+        change = timing['mean_ms'] / previous['mean_ms'] - 1
+        timing['change'] = change
+        if change > threshold:
+            regressions.append(f"{name}: {previous['mean_ms']:.2f} ms -> {timing['mean_ms']:.2f} ms ({change:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argument_parser(__doc__, rows=100000)
+    parser.set_defaults(repeat=50)
+    parser.add_argument('--bulk-size', type=int, default=5000, help='rows imported by single bulk import')
+    parser.add_argument('--tasks', type=int, default=200, help='image retrieval tasks per measured run')
+    parser.add_argument('--pipeline-repeat', type=int, default=5, help='measured runs of image pipeline')
+    parser.add_argument('--compare', help='JSON results of previous run')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed slowdown when comparing')
+    arguments = parser.parse_args()
+    setup_django()
+    random.seed(0)
+
+    import django
+
+    with benchmark_database() as connection, offline_environment():
+        plates = populate(arguments.rows, car_models=CAR_MODELS)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE api_registration')
+
+        cases = {}
+        for group in (api_cases(plates), write_cases(plates, arguments.bulk_size), validation_cases(plates)):
+            cases.update(summarize(group, arguments.repeat))
+        cases.update(summarize(image_pipeline_case(plates, arguments.tasks), arguments.pipeline_repeat))
+
+        results = {
+            'environment': {'python': platform.python_version(), 'django': django.get_version(),
+                            'vendor': connection.vendor, 'rows': arguments.rows, 'repeat': arguments.repeat},
+            'cases': cases,
+        }
+
+    regressions = []
+    if arguments.compare:
+        with open(arguments.compare) as file:
+            regressions = compare(results, json.load(file), arguments.threshold)
+        results['regressions'] = regressions
+
+    write_results(results, arguments.output)
+    for regression in regressions:
+        print(f"Regression: {regression}", file=sys.stderr)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+"""
+Django settings used by benchmarks.
+
+Benchmarks run offline: SQLite by default (set BENCHMARK_DB=postgres to use database from
+project settings), in-memory Celery broker and no file logging. Tasks are queued, not run,
+unless benchmark switches Celery to eager mode.
+
+BENCHMARK_DB_NAME points to database shared with servers and workers started by the benchmark,
+see common.use_sqlite_file(); DJANGO_DEBUG and DJANGO_CONN_MAX_AGE select the serving profile.
+"""
+
+import os
+
+from CarplateAPI import settings as project_settings
+from CarplateAPI.settings import *  # noqa: F401,F403
+
+if os.environ.get('BENCHMARK_DB', 'sqlite') != 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('BENCHMARK_DB_NAME', ':memory:'),
+            'CONN_MAX_AGE': int(os.environ.get('DJANGO_CONN_MAX_AGE', 0)),
+        }
+    }
+elif 'BENCHMARK_DB_NAME' in os.environ:
+    DATABASES = {'default': dict(project_settings.DATABASES['default'], NAME=os.environ['BENCHMARK_DB_NAME'])}
+
+DEBUG = os.environ.get('DJANGO_DEBUG') == '1'
+ALLOWED_HOSTS = ['*']
+
+CELERY_BROKER_URL = 'memory://'
+CELERY_RESULT_BACKEND = 'cache+memory://'
+CELERY_TASK_ALWAYS_EAGER = False
+CELERY_TASK_EAGER_PROPAGATES = True
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'root': {'level': 'WARNING'},
+}
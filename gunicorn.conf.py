@@ -0,0 +1,42 @@
+"""
+Gunicorn configuration of production serving profile, see docker-compose.prod.yml.
+
+Usage:
+    gunicorn -c gunicorn.conf.py CarplateAPI.wsgi:application
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+# Requests mostly wait for database, so every process runs several threads.
+# Each thread keeps its own persistent database connection (CONN_MAX_AGE)
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Seconds, bulk import of the largest body nginx accepts (client_max_body_size 50m)
+# has to fit in, see also proxy_read_timeout of /api/bulk in nginx/carplate.conf
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 300))
+graceful_timeout = timeout
+keepalive = 5  # Seconds, nginx reuses upstream connections
+
+# Restarting workers now and then bounds memory growth of in-process caches
+max_requests = 10000
+max_requests_jitter = 1000
+
+accesslog = '-'
+errorlog = '-'
+
+
+def post_worker_init(worker):
+    # Plate membership index is built before the worker accepts requests, not by its first plate lookup
+    from django.db import connection
+
+    from api.plate_index import plate_index
+
+    if plate_index.config['ENABLED']:
+        plate_index.build()
+        plate_index.start()  # Follows changes of other processes in background
+        connection.close()  # Requests are served by other threads with their own connections